@@ -0,0 +1,3 @@
+"""
+Offline benchmarks of the deploy path and of the parameter routines.
+"""
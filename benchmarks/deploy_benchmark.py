@@ -0,0 +1,165 @@
+"""
+End-to-end deploy benchmark against the local Fabric stub.
+
+The repository is copied to a scratch directory checked out on the benchmarked
+branch, the stub is started, and each stage script runs in its own process with
+pyfabricops redirected to the stub (see benchmarks.redirect). For every stage the
+wall time, the number of API calls, the 429s and the bytes sent and received are
+reported, so a regression in the deploy path shows up without a tenant.
+
+Examples:
+    ```
+    python -m benchmarks.deploy_benchmark --latency 0.05 --lro-polls 1 --output bench_deploy.json
+    python -m benchmarks.deploy_benchmark --stages deploy_project --repeat 2 --throttle-every 25
+    ```
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.fabric_stub import FabricStub
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_STAGES = ('project_start', 'placeholders_to_parameters', 'deploy_project', 'export_workpace')
+
+# Credentials read by the 'env' auth provider, never sent anywhere but the stub
+STUB_ENVIRONMENT = {
+    'FAB_CLIENT_ID': 'stub-client-id',
+    'FAB_CLIENT_SECRET': 'stub-client-secret',
+    'FAB_TENANT_ID': 'stub-tenant-id',
+}
+
+IGNORED_PATHS = ('.git', '__pycache__', '.venv', 'venv', '.pytest_cache')
+
+
+def prepare_workdir(branch: str) -> str:
+    """
+    Copy the repository to a scratch git repository checked out on `branch`.
+    """
+    workdir = tempfile.mkdtemp(prefix='pf_deploy_benchmark_')
+    shutil.copytree(ROOT_PATH, workdir, dirs_exist_ok=True, ignore=shutil.ignore_patterns(*IGNORED_PATHS))
+
+    git = ['git', '-c', 'user.name=benchmark', '-c', 'user.email=benchmark@localhost']
+    for command in (['init', '-q'], ['checkout', '-q', '-b', branch], ['add', '-A'], ['commit', '-q', '-m', 'benchmark']):
+        subprocess.run(git + command, cwd=workdir, check=True, capture_output=True)
+
+    # The token cache lives in the temp directory, keep stub tokens away from the real one
+    os.makedirs(os.path.join(workdir, '.tmp'), exist_ok=True)
+    return workdir
+
+
+def _control(stub: FabricStub, path: str, method: str = 'GET') -> dict:
+    request = urllib.request.Request(f'{stub.url}{path}', method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def run_stage(stub: FabricStub, workdir: str, stage: str, arguments: list, verbose: bool = False) -> dict:
+    """
+    Run one stage script against the stub and collect its statistics.
+    """
+    environment = dict(os.environ, **STUB_ENVIRONMENT)
+    environment['TMPDIR'] = environment['TEMP'] = environment['TMP'] = os.path.join(workdir, '.tmp')
+    environment['PYTHONPATH'] = os.pathsep.join([workdir, ROOT_PATH])
+
+    _control(stub, '/_reset', method='POST')
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.redirect', stub.url, f'scripts.{stage}', *arguments],
+        cwd=workdir,
+        env=environment,
+        capture_output=not verbose,
+        text=True,
+    )
+    wall_time = time.perf_counter() - start
+    stats = _control(stub, '/_stats')
+
+    if process.returncode and not verbose:
+        print(process.stdout[-2000:])
+        print(process.stderr[-2000:])
+
+    return {
+        'stage': stage,
+        'returncode': process.returncode,
+        'wall_time': round(wall_time, 3),
+        'calls': stats['calls'],
+        'throttled': stats['throttled'],
+        'bytes_sent': stats['bytes_received'],
+        'bytes_received': stats['bytes_sent'],
+        'unmatched': stats['unmatched'],
+        'routes': stats['routes'],
+    }
+
+
+def print_report(results: list):
+    print(f"{'stage':<30} {'exit':>4} {'wall s':>8} {'calls':>6} {'429':>4} {'sent KB':>9} {'recv KB':>9}")
+    for result in results:
+        print(
+            f"{result['stage']:<30} {result['returncode']:>4} {result['wall_time']:>8.2f} {result['calls']:>6} "
+            f"{result['throttled']:>4} {result['bytes_sent'] / 1024:>9.1f} {result['bytes_received'] / 1024:>9.1f}"
+        )
+        for route, calls in sorted(result['unmatched'].items()):
+            print(f"{'':<4}unmatched route {route} x{calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the deploy scripts against a local Fabric stub.')
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES), help='Comma separated scripts to run, in order')
+    parser.add_argument('--branch', default='dev', help='Branch the scratch copy is checked out on')
+    parser.add_argument('--repeat', type=int, default=1, help='Run the stages this many times on the same tenant')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--lro-polls', type=int, default=1)
+    parser.add_argument('--throttle-every', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--deploy-args', default='', help="Extra arguments of deploy_project, e.g. '--max-workers 8'")
+    parser.add_argument('--output', help='Write the results, with per-route detail, to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch copy')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the scripts')
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    workdir = prepare_workdir(args.branch)
+
+    results = []
+    try:
+        with FabricStub(
+            latency=args.latency,
+            jitter=args.jitter,
+            lro_polls=args.lro_polls,
+            throttle_every=args.throttle_every,
+            retry_after=args.retry_after,
+        ) as stub:
+            for run in range(1, args.repeat + 1):
+                for stage in stages:
+                    arguments = args.deploy_args.split() if stage == 'deploy_project' else []
+                    result = run_stage(stub, workdir, stage, arguments, verbose=args.verbose)
+                    result['run'] = run
+                    results.append(result)
+    finally:
+        if args.keep:
+            print(f"Scratch copy kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'settings': vars(args), 'results': results}, file, indent=4)
+        print(f"Results saved to {args.output}")
+
+    if any(result['returncode'] for result in results):
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
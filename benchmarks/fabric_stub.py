@@ -0,0 +1,610 @@
+"""
+Local stand-in for the Fabric and Power BI REST APIs used by the pf.* calls.
+
+Workspaces, folders, role assignments, items and their definitions are kept in
+memory, so project_start, deploy_project and export_workpace can run end to end
+without a tenant. Every request can be delayed, item definition calls can be
+turned into long-running operations (202 + Location, polled until Succeeded),
+and every Nth request can be throttled with a 429 and Retry-After, to see how
+the deploy path behaves under the conditions of a real tenant.
+
+Every request is counted per route with the bytes received and sent; the
+statistics are served at GET /_stats and cleared with POST /_reset.
+
+Examples:
+    ```
+    python -m benchmarks.fabric_stub --port 8765 --latency 0.05 --lro-polls 1 --throttle-every 20
+    ```
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# Collection segment of the Fabric API to its item type; 'items' holds every type
+COLLECTION_TYPES = {
+    'dataPipelines': 'DataPipeline',
+    'dataflows': 'Dataflow',
+    'environments': 'Environment',
+    'lakehouses': 'Lakehouse',
+    'notebooks': 'Notebook',
+    'reports': 'Report',
+    'semanticModels': 'SemanticModel',
+    'warehouses': 'Warehouse',
+}
+
+# Power BI collections backed by Fabric items
+POWERBI_COLLECTION_TYPES = {
+    'datasets': 'SemanticModel',
+    'reports': 'Report',
+    'dataflows': 'Dataflow',
+}
+
+CAPACITY_ID = '00000000-0000-0000-0000-00000000ca9a'
+
+GUID_PATTERN = re.compile(r'^[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$')
+
+
+class StubError(Exception):
+    def __init__(self, status: int, error_code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error_code = error_code
+
+
+class FabricState:
+    """
+    In-memory tenant: workspaces with their folders, role assignments and items.
+    """
+
+    def __init__(self, lro_polls: int = 1):
+        self.lock = threading.Lock()
+        self.lro_polls = lro_polls
+        self.workspaces = {}
+        self.operations = {}
+
+    # Workspaces
+
+    def workspace(self, workspace_id: str) -> dict:
+        workspace = self.workspaces.get(workspace_id)
+        if workspace is None:
+            raise StubError(404, 'WorkspaceNotFound', f'Workspace {workspace_id} not found.')
+        return workspace
+
+    def find_workspace(self, name: str) -> dict:
+        for workspace in self.workspaces.values():
+            if workspace['displayName'] == name:
+                return workspace
+        return None
+
+    def create_workspace(self, body: dict) -> dict:
+        if self.find_workspace(body.get('displayName')):
+            raise StubError(409, 'WorkspaceNameAlreadyExists', f"Workspace {body.get('displayName')} already exists.")
+        workspace_id = str(uuid.uuid4())
+        self.workspaces[workspace_id] = {
+            'id': workspace_id,
+            'displayName': body.get('displayName'),
+            'description': body.get('description', ''),
+            'type': 'Workspace',
+            'capacityId': body.get('capacityId'),
+            'folders': {},
+            'roleAssignments': {},
+            'items': {},
+        }
+        return self.workspaces[workspace_id]
+
+    # Items
+
+    def item(self, workspace: dict, item_id: str) -> dict:
+        item = workspace['items'].get(item_id)
+        if item is None:
+            raise StubError(404, 'ItemNotFound', f'Item {item_id} not found.')
+        return item
+
+    def create_item(self, workspace: dict, item_type: str, body: dict) -> dict:
+        item_type = item_type or body.get('type')
+        for item in workspace['items'].values():
+            if item['type'] == item_type and item['displayName'] == body.get('displayName'):
+                raise StubError(409, 'ItemDisplayNameAlreadyInUse', f"{item_type} {body.get('displayName')} already exists.")
+
+        item_id = str(uuid.uuid4())
+        item = {
+            'id': item_id,
+            'type': item_type,
+            'displayName': body.get('displayName'),
+            'description': body.get('description', ''),
+            'workspaceId': workspace['id'],
+            'definition': body.get('definition'),
+        }
+        if body.get('folderId'):
+            item['folderId'] = body['folderId']
+        if item_type == 'Lakehouse':
+            item['properties'] = {
+                'oneLakeTablesPath': f"https://onelake.dfs.fabric.microsoft.com/{workspace['id']}/{item_id}/Tables",
+                'oneLakeFilesPath': f"https://onelake.dfs.fabric.microsoft.com/{workspace['id']}/{item_id}/Files",
+                'sqlEndpointProperties': {
+                    'connectionString': f"{workspace['id'][:8]}.datawarehouse.fabric.microsoft.com",
+                    'id': str(uuid.uuid4()),
+                    'provisioningStatus': 'Success',
+                },
+            }
+        workspace['items'][item_id] = item
+        return item
+
+    # Long-running operations
+
+    def start_operation(self, result: dict = None) -> str:
+        operation_id = str(uuid.uuid4())
+        self.operations[operation_id] = {'polls_left': self.lro_polls, 'result': result}
+        return operation_id
+
+    def poll_operation(self, operation_id: str) -> dict:
+        operation = self.operations.get(operation_id)
+        if operation is None:
+            raise StubError(404, 'OperationNotFound', f'Operation {operation_id} not found.')
+        if operation['polls_left'] > 0:
+            operation['polls_left'] -= 1
+            return {'id': operation_id, 'status': 'Running', 'percentComplete': 50}
+        return {'id': operation_id, 'status': 'Succeeded', 'percentComplete': 100}
+
+
+def _public(entity: dict) -> dict:
+    """
+    Strip the nested state of a workspace or item before returning it.
+    """
+    return {key: value for key, value in entity.items() if key not in ('folders', 'roleAssignments', 'items', 'definition')}
+
+
+def route_key(method: str, path: str) -> str:
+    """
+    Route of a request for the statistics, with IDs replaced, e.g. 'GET /v1/workspaces/{id}/items'.
+    """
+    segments = ['{id}' if GUID_PATTERN.match(segment) else segment for segment in path.split('/')]
+    if len(segments) > 1 and segments[1] == 'login':
+        segments = segments[:2] + ['{tenant}'] + segments[3:]
+    return f"{method} {'/'.join(segments)}"
+
+
+class Stats:
+    """
+    Request counters per route.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.perf_counter()
+            self.routes = defaultdict(lambda: {'calls': 0, 'bytes_received': 0, 'bytes_sent': 0, 'throttled': 0})
+            self.unmatched = defaultdict(int)
+            self.requests = 0
+
+    def record(self, route: str, bytes_received: int, bytes_sent: int, throttled: bool, matched: bool):
+        with self.lock:
+            entry = self.routes[route]
+            entry['calls'] += 1
+            entry['bytes_received'] += bytes_received
+            entry['bytes_sent'] += bytes_sent
+            entry['throttled'] += int(throttled)
+            if not matched:
+                self.unmatched[route] += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            routes = {route: dict(entry) for route, entry in sorted(self.routes.items())}
+            return {
+                'elapsed': time.perf_counter() - self.started,
+                'calls': sum(entry['calls'] for entry in routes.values()),
+                'bytes_received': sum(entry['bytes_received'] for entry in routes.values()),
+                'bytes_sent': sum(entry['bytes_sent'] for entry in routes.values()),
+                'throttled': sum(entry['throttled'] for entry in routes.values()),
+                'unmatched': dict(self.unmatched),
+                'routes': routes,
+            }
+
+
+class FabricStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def stub(self) -> 'FabricStub':
+        return self.server.stub
+
+    def log_message(self, format, *args):
+        if self.stub.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        route = route_key(method, url.path)
+
+        if url.path.startswith('/_'):
+            self._control(method, url.path)
+            return
+
+        stub = self.stub
+        if stub.latency or stub.jitter:
+            time.sleep(stub.latency + random.uniform(0, stub.jitter))
+
+        throttled = stub.should_throttle(url.path)
+        matched = True
+        if throttled:
+            status, body, headers = 429, {
+                'errorCode': 'RequestBlocked',
+                'message': 'Request is blocked by the upstream service until the Retry-After.',
+            }, {'Retry-After': str(stub.retry_after)}
+        else:
+            try:
+                body = json.loads(raw_body) if raw_body and 'json' in (self.headers.get('Content-Type') or 'json') else {}
+            except ValueError:
+                body = {}
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                with stub.state.lock:
+                    status, body, headers = stub.dispatch(method, url.path, query, body)
+            except StubError as error:
+                status, body, headers = error.status, {'errorCode': error.error_code, 'message': str(error)}, {}
+                matched = error.error_code != 'EntityNotFound'
+
+        bytes_sent = self._send(status, body, headers)
+        stub.stats.record(route, len(raw_body), bytes_sent, throttled, matched)
+
+    def _control(self, method: str, path: str):
+        if path == '/_stats':
+            self._send(200, self.stub.stats.snapshot(), {})
+        elif path == '/_reset' and method == 'POST':
+            self.stub.stats.reset()
+            self._send(200, {}, {})
+        else:
+            self._send(404, {'errorCode': 'EntityNotFound', 'message': path}, {})
+
+    def _send(self, status: int, body, headers: dict) -> int:
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        return len(data)
+
+
+class FabricStub:
+    """
+    Threaded HTTP server answering like the Fabric, Power BI and token endpoints.
+
+    Paths served:
+        /login/<tenant>/oauth2/v2.0/token   (login.microsoftonline.com)
+        /v1/...                              (api.fabric.microsoft.com)
+        /v1.0/myorg/...                      (api.powerbi.com)
+
+    Args:
+        port (int): Port to listen on, 0 for any free port
+        latency (float): Seconds added to every request
+        jitter (float): Maximum random seconds added on top of latency
+        lro_polls (int): Number of 'Running' answers before a long-running operation succeeds
+        throttle_every (int): Answer every Nth API request with 429, 0 to never throttle
+        retry_after (int): Retry-After seconds sent with a 429
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        lro_polls: int = 1,
+        throttle_every: int = 0,
+        retry_after: int = 1,
+        verbose: bool = False,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self.state = FabricState(lro_polls=lro_polls)
+        self.stats = Stats()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), FabricStubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FabricStub':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+        return False
+
+    def should_throttle(self, path: str) -> bool:
+        # Token requests are never throttled by the API gateway
+        if not self.throttle_every or path.startswith('/login/'):
+            return False
+        with self._counter_lock:
+            self._counter += 1
+            return self._counter % self.throttle_every == 0
+
+    def dispatch(self, method: str, path: str, query: dict, body: dict) -> tuple:
+        """
+        Answer a request. Returns (status, body, headers).
+        """
+        segments = [segment for segment in path.split('/') if segment]
+
+        if segments[:1] == ['login'] and segments[-1:] == ['token']:
+            return 200, {
+                'token_type': 'Bearer',
+                'expires_in': 3599,
+                'ext_expires_in': 3599,
+                'access_token': f'stub-{uuid.uuid4()}',
+            }, {}
+
+        if segments[:1] == ['v1']:
+            return self._fabric(method, segments[1:], query, body)
+
+        if segments[:2] == ['v1.0', 'myorg']:
+            return self._powerbi(method, segments[2:], query, body)
+
+        raise StubError(404, 'EntityNotFound', f'No route for {method} {path}.')
+
+    def _accepted(self, result: dict = None) -> tuple:
+        """
+        Answer with a long-running operation, or directly when LROs are disabled.
+        """
+        if self.state.lro_polls < 0:
+            return 200, result, {}
+        operation_id = self.state.start_operation(result)
+        return 202, None, {
+            'Location': f'{self.url}/v1/operations/{operation_id}',
+            'x-ms-operation-id': operation_id,
+            'Retry-After': '1',
+        }
+
+    def _fabric(self, method: str, segments: list, query: dict, body: dict) -> tuple:
+        state = self.state
+
+        if segments == ['capacities'] and method == 'GET':
+            return 200, {'value': [{
+                'id': CAPACITY_ID, 'displayName': 'stub', 'sku': 'F2', 'region': 'Local', 'state': 'Active',
+            }]}, {}
+
+        if segments[:1] == ['operations'] and len(segments) >= 2:
+            if segments[2:] == ['result'] and segments[1] in state.operations:
+                return 200, state.operations[segments[1]]['result'], {}
+            status = state.poll_operation(segments[1])
+            headers = {} if status['status'] == 'Succeeded' else {'Retry-After': '1'}
+            if status['status'] == 'Succeeded':
+                headers['Location'] = f'{self.url}/v1/operations/{segments[1]}/result'
+            return 200, status, headers
+
+        if segments[:1] != ['workspaces']:
+            raise StubError(404, 'EntityNotFound', f"No route for {method} /v1/{'/'.join(segments)}.")
+
+        if len(segments) == 1:
+            if method == 'GET':
+                return 200, {'value': [_public(workspace) for workspace in state.workspaces.values()]}, {}
+            if method == 'POST':
+                return 201, _public(state.create_workspace(body)), {}
+
+        workspace = state.workspace(segments[1])
+
+        if len(segments) == 2:
+            if method == 'GET':
+                return 200, _public(workspace), {}
+            if method == 'PATCH':
+                workspace.update({key: body[key] for key in ('displayName', 'description') if key in body})
+                return 200, _public(workspace), {}
+            if method == 'DELETE':
+                del state.workspaces[workspace['id']]
+                return 200, None, {}
+
+        collection = segments[2]
+
+        if collection == 'assignToCapacity' and method == 'POST':
+            workspace['capacityId'] = body.get('capacityId')
+            return 202, None, {}
+
+        if collection == 'unassignFromCapacity' and method == 'POST':
+            workspace['capacityId'] = None
+            return 202, None, {}
+
+        if collection == 'roleAssignments':
+            assignments = workspace['roleAssignments']
+            if len(segments) == 3 and method == 'GET':
+                return 200, {'value': list(assignments.values())}, {}
+            if len(segments) == 3 and method == 'POST':
+                assignment_id = body.get('principal', {}).get('id') or str(uuid.uuid4())
+                assignments[assignment_id] = {'id': assignment_id, **body}
+                return 201, assignments[assignment_id], {}
+            if len(segments) == 4 and method in ('PATCH', 'DELETE'):
+                if method == 'DELETE':
+                    assignments.pop(segments[3], None)
+                    return 200, None, {}
+                assignments.setdefault(segments[3], {'id': segments[3]}).update(body)
+                return 200, assignments[segments[3]], {}
+
+        if collection == 'folders':
+            folders = workspace['folders']
+            if len(segments) == 3 and method == 'GET':
+                return 200, {'value': list(folders.values())}, {}
+            if len(segments) == 3 and method == 'POST':
+                for folder in folders.values():
+                    if folder['displayName'] == body.get('displayName') and folder.get('parentFolderId') == body.get('parentFolderId'):
+                        raise StubError(409, 'FolderDisplayNameAlreadyInUse', f"Folder {body.get('displayName')} already exists.")
+                folder_id = str(uuid.uuid4())
+                folders[folder_id] = {'id': folder_id, 'displayName': body.get('displayName'), 'workspaceId': workspace['id']}
+                if body.get('parentFolderId'):
+                    folders[folder_id]['parentFolderId'] = body['parentFolderId']
+                return 201, folders[folder_id], {}
+            if len(segments) == 4:
+                folder = folders.get(segments[3])
+                if folder is None:
+                    raise StubError(404, 'FolderNotFound', f'Folder {segments[3]} not found.')
+                if method == 'GET':
+                    return 200, folder, {}
+                if method == 'PATCH':
+                    folder.update({key: body[key] for key in ('displayName',) if key in body})
+                    return 200, folder, {}
+                if method == 'DELETE':
+                    del folders[segments[3]]
+                    return 200, None, {}
+
+        if collection == 'items' or collection in COLLECTION_TYPES:
+            item_type = COLLECTION_TYPES.get(collection)
+
+            if len(segments) == 3 and method == 'GET':
+                wanted = item_type or query.get('type')
+                items = [
+                    _public(item) for item in workspace['items'].values()
+                    if wanted is None or item['type'] == wanted
+                ]
+                return 200, {'value': items}, {}
+
+            if len(segments) == 3 and method == 'POST':
+                item = state.create_item(workspace, item_type, body)
+                if body.get('definition'):
+                    return self._accepted(_public(item))
+                return 201, _public(item), {}
+
+            item = state.item(workspace, segments[3])
+
+            if len(segments) == 4:
+                if method == 'GET':
+                    return 200, _public(item), {}
+                if method == 'PATCH':
+                    item.update({key: body[key] for key in ('displayName', 'description') if key in body})
+                    return 200, _public(item), {}
+                if method == 'DELETE':
+                    del workspace['items'][item['id']]
+                    return 200, None, {}
+
+            action = segments[4]
+            if action == 'getDefinition' and method == 'POST':
+                return self._accepted({'definition': item.get('definition') or {'parts': []}})
+            if action == 'updateDefinition' and method == 'POST':
+                item['definition'] = body.get('definition')
+                return self._accepted()
+            if action == 'move' and method == 'POST':
+                item['folderId'] = body.get('targetFolder')
+                return 200, _public(item), {}
+            if action == 'jobs' and method == 'POST':
+                return 202, None, {'Location': f'{self.url}/v1/operations/{state.start_operation()}'}
+
+        raise StubError(404, 'EntityNotFound', f"No route for {method} /v1/{'/'.join(segments)}.")
+
+    def _powerbi(self, method: str, segments: list, query: dict, body: dict) -> tuple:
+        state = self.state
+
+        if segments == ['groups'] and method == 'GET':
+            groups = [
+                {'id': workspace['id'], 'name': workspace['displayName'], 'isOnDedicatedCapacity': bool(workspace['capacityId'])}
+                for workspace in state.workspaces.values()
+            ]
+            name_filter = re.search(r"name eq '([^']*)'", query.get('$filter', ''))
+            if name_filter:
+                groups = [group for group in groups if group['name'] == name_filter.group(1)]
+            return 200, {'value': groups}, {}
+
+        if segments[:1] != ['groups'] or len(segments) < 3 or segments[2] not in POWERBI_COLLECTION_TYPES:
+            # Actions (Default.UpdateParameters, Rebind, TakeOver, ...) are accepted as no-ops
+            if method == 'POST':
+                return 200, {}, {}
+            raise StubError(404, 'EntityNotFound', f"No route for {method} /v1.0/myorg/{'/'.join(segments)}.")
+
+        workspace = state.workspace(segments[1])
+        item_type = POWERBI_COLLECTION_TYPES[segments[2]]
+        items = [item for item in workspace['items'].values() if item['type'] == item_type]
+
+        if len(segments) == 3 and method == 'GET':
+            return 200, {'value': [{'id': item['id'], 'name': item['displayName']} for item in items]}, {}
+
+        item = state.item(workspace, segments[3])
+        if len(segments) == 4 and method == 'GET':
+            return 200, {'id': item['id'], 'name': item['displayName']}, {}
+        if segments[4:] == ['parameters'] and method == 'GET':
+            return 200, {'value': item.get('parameters', [])}, {}
+        if method == 'POST':
+            if segments[4:] == ['Default.UpdateParameters']:
+                item['parameters'] = [
+                    {'name': detail.get('name'), 'currentValue': detail.get('newValue')}
+                    for detail in body.get('updateDetails', [])
+                ]
+            return 200, {}, {}
+
+        raise StubError(404, 'EntityNotFound', f"No route for {method} /v1.0/myorg/{'/'.join(segments)}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the Fabric REST API.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Maximum random seconds added to the latency')
+    parser.add_argument('--lro-polls', type=int, default=1, help="'Running' answers before an operation succeeds, -1 to disable LROs")
+    parser.add_argument('--throttle-every', type=int, default=0, help='Answer every Nth request with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds of a 429')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    stub = FabricStub(
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        lro_polls=args.lro_polls,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+        verbose=args.verbose,
+    )
+    print(f"Fabric stub listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
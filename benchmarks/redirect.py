@@ -0,0 +1,55 @@
+"""
+Send the requests made by pyfabricops to a local Fabric stub instead of the cloud.
+
+Every requests call goes through requests.Session.request, so patching it
+redirects the Fabric, Power BI and token endpoints whatever module built the URL.
+
+Examples:
+    ```
+    python -m benchmarks.redirect http://127.0.0.1:8765 scripts.deploy_project --max-workers 8
+    ```
+"""
+import runpy
+import sys
+
+import requests
+
+
+# Cloud endpoint to its path prefix on the stub
+ENDPOINTS = {
+    'https://api.fabric.microsoft.com': '',
+    'https://api.powerbi.com': '',
+    'https://login.microsoftonline.com': '/login',
+}
+
+
+def install(base_url: str):
+    """
+    Redirect every request to a cloud endpoint to `base_url`.
+    """
+    request = requests.sessions.Session.request
+
+    def _request(self, method, url, *args, **kwargs):
+        for endpoint, prefix in ENDPOINTS.items():
+            if url.startswith(endpoint):
+                url = f'{base_url}{prefix}{url[len(endpoint):]}'
+                break
+        return request(self, method, url, *args, **kwargs)
+
+    requests.sessions.Session.request = _request
+
+
+def main():
+    if len(sys.argv) < 3:
+        print('Usage: python -m benchmarks.redirect <stub url> <module> [args...]')
+        exit(2)
+
+    base_url, module = sys.argv[1].rstrip('/'), sys.argv[2]
+    install(base_url)
+
+    sys.argv = [module] + sys.argv[3:]
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,609 @@
+"""
+Local benchmark of the TransformAndLoad notebook.
+
+AdventureWorks-shaped sources are generated as the dbo.*.parquet files listed
+in pipeline_parameters.json, FactInternetSales scaled from 1x to 1000x its
+60,398 rows, and the code cells of the notebook run against a local Spark
+session with Delta, the lakehouse paths pointing to a scratch directory instead
+of abfss://. A full load runs first, then, with --delta-fraction, an
+incremental load of fact rows appended for the next order day.
+
+Every table is loaded and maintained under its own Spark job group, so for each
+table the wall time, the shuffle bytes read and written (from the Spark
+monitoring API) and the files of the resulting Delta table are reported.
+
+Needs pyspark, delta-spark and a Java runtime.
+
+Examples:
+    ```
+    python -m benchmarks.transform_benchmark --scales 1,10,100 --output bench_transform.json
+    python -m benchmarks.transform_benchmark --scales 1000 --driver-memory 8g --delta-fraction 0.001
+    ```
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+import urllib.request
+from collections import namedtuple
+
+from delta import configure_spark_with_delta_pip
+from delta.tables import DeltaTable
+from pyspark.sql import SparkSession
+
+from benchmarks.utils_benchmark import _commit
+from scripts.notebook import CELL_MARKER_PATTERN
+from scripts.table_specs import embed_table_specs
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+NOTEBOOK_PATH = os.path.join(ROOT_PATH, 'src', 'PF_002_Live', 'Engineering', 'TransformAndLoad.Notebook', 'notebook-content.py')
+SPEC_PATH = os.path.join(ROOT_PATH, 'pipeline_parameters.json')
+
+DEFAULT_SCALES = (1, 10, 100)
+
+# Row counts of AdventureWorksDW; only the fact is scaled
+FACT_ROWS = 60398
+CUSTOMERS = 18484
+GEOGRAPHIES = 655
+PRODUCTS = 606
+SUBCATEGORIES = 37
+CATEGORIES = 4
+
+# Order dates of the fact are spread over ORDER_DAYS days from ORDER_START, appended rows fall on the day after
+ORDER_START = '2010-12-29'
+ORDER_DAYS = 1127
+LINES_PER_ORDER = 2
+DATE_START = '2005-01-01'
+DATE_END = '2014-12-31'
+
+# Rows per generated parquet file of the fact
+ROWS_PER_FILE = 2000000
+
+# Lakehouse locations set by the parameters cell, relative to the lakehouse
+LAKEHOUSE_PATHS = {
+    'files_path': 'Files/Raw',
+    'tables_path': 'Tables',
+}
+
+# Notebook functions timed per table: name to (position of the table name argument, stage)
+TRACKED_FUNCTIONS = {
+    'load_table': (1, 'load'),
+    'maintain_table': (0, 'maintenance'),
+}
+
+FIRST_NAMES = ('Jon', 'Eugene', 'Ruben', 'Christy', 'Elizabeth', 'Julio', 'Janet', 'Marco', 'Rob', 'Shannon')
+MIDDLE_NAMES = ('V', 'L', 'C', 'A', 'M')
+LAST_NAMES = ('Yang', 'Huang', 'Torres', 'Zhu', 'Johnson', 'Ruiz', 'Alvarez', 'Mehta', 'Verhoff', 'Carlson')
+EDUCATIONS = ('Bachelors', 'Partial College', 'High School', 'Partial High School', 'Graduate Degree')
+OCCUPATIONS = ('Professional', 'Management', 'Skilled Manual', 'Clerical', 'Manual')
+CITIES = ('Rockhampton', 'Seattle', 'Bothell', 'Paris', 'Berlin', 'London', 'Calgary', 'Lebanon', 'Beverly Hills', 'Sydney')
+COUNTRIES = (('AU', 'Australia'), ('CA', 'Canada'), ('DE', 'Germany'), ('FR', 'France'), ('GB', 'United Kingdom'), ('US', 'United States'))
+COLORS = ('Black', 'Silver', 'Red', 'White', 'Blue', 'Multi', 'Yellow', 'Grey', 'Silver/Black')
+SIZES = ('38', '40', '42', '44', '48', '52', '58', '60', '62', 'S', 'M', 'L', 'XL')
+SUBCATEGORY_NAMES = ('Mountain Bikes', 'Road Bikes', 'Touring Bikes', 'Handlebars', 'Bottom Brackets', 'Brakes', 'Chains')
+CATEGORY_NAMES = ('Bikes', 'Components', 'Clothing', 'Accessories')
+
+# A code cell of the notebook; title is the heading of the markdown cell above it
+NotebookCell = namedtuple('NotebookCell', ['title', 'parameters', 'source'])
+
+
+def _pick(values: tuple, seed: str) -> str:
+    """
+    SQL expression picking one of `values` from the hash `seed`.
+    """
+    quoted = ', '.join("'" + value.replace("'", "\\'") + "'" for value in values)
+    return f'element_at(array({quoted}), cast(pmod({seed}, {len(values)}) + 1 as int))'
+
+
+def generate_customers(spark):
+    return spark.range(CUSTOMERS, numPartitions=1).selectExpr(
+        'cast(id + 11000 as int) AS CustomerKey',
+        f'cast(pmod(hash(id, 1), {GEOGRAPHIES}) + 1 as int) AS GeographyKey',
+        "concat('AW', lpad(cast(id + 11000 as string), 8, '0')) AS CustomerAlternateKey",
+        f'{_pick(FIRST_NAMES, "hash(id, 2)")} AS FirstName',
+        f'CASE WHEN pmod(id, 3) = 0 THEN NULL ELSE {_pick(MIDDLE_NAMES, "hash(id, 3)")} END AS MiddleName',
+        f'{_pick(LAST_NAMES, "hash(id, 4)")} AS LastName',
+        "date_add(DATE'1940-01-01', cast(pmod(hash(id, 5), 20000) as int)) AS BirthDate",
+        "CASE WHEN pmod(hash(id, 6), 2) = 0 THEN 'M' ELSE 'S' END AS MaritalStatus",
+        "CASE WHEN pmod(hash(id, 7), 2) = 0 THEN 'M' ELSE 'F' END AS Gender",
+        "concat('customer', cast(id as string), '@adventure-works.com') AS EmailAddress",
+        'cast(10000 * (pmod(hash(id, 8), 17) + 1) as decimal(19,4)) AS YearlyIncome',
+        'cast(pmod(hash(id, 9), 6) as tinyint) AS TotalChildren',
+        'cast(pmod(hash(id, 10), 6) as tinyint) AS NumberChildrenAtHome',
+        f'{_pick(EDUCATIONS, "hash(id, 11)")} AS EnglishEducation',
+        f'{_pick(EDUCATIONS, "hash(id, 11)")} AS SpanishEducation',
+        f'{_pick(EDUCATIONS, "hash(id, 11)")} AS FrenchEducation',
+        f'{_pick(OCCUPATIONS, "hash(id, 12)")} AS EnglishOccupation',
+        f'{_pick(OCCUPATIONS, "hash(id, 12)")} AS SpanishOccupation',
+        f'{_pick(OCCUPATIONS, "hash(id, 12)")} AS FrenchOccupation',
+        'cast(pmod(hash(id, 13), 2) as string) AS HouseOwnerFlag',
+        'cast(pmod(hash(id, 14), 5) as tinyint) AS NumberCarsOwned',
+        "concat(cast(pmod(hash(id, 15), 9000) + 1 as string), ' Main Street') AS AddressLine1",
+        "concat('1 (11) 500 555-0', lpad(cast(pmod(id, 1000) as string), 3, '0')) AS Phone",
+        "date_add(DATE'2011-01-19', cast(pmod(hash(id, 16), 1100) as int)) AS DateFirstPurchase",
+    )
+
+
+def generate_geographies(spark):
+    country = f'cast(pmod(id, {len(COUNTRIES)}) + 1 as int)'
+    codes = ', '.join(f"'{code}'" for code, _ in COUNTRIES)
+    names = ', '.join(f"'{name}'" for _, name in COUNTRIES)
+    return spark.range(GEOGRAPHIES, numPartitions=1).selectExpr(
+        'cast(id + 1 as int) AS GeographyKey',
+        f'{_pick(CITIES, "hash(id, 1)")} AS City',
+        "concat('S', cast(pmod(id, 70) as string)) AS StateProvinceCode",
+        "concat('State ', cast(pmod(id, 70) as string)) AS StateProvinceName",
+        f'element_at(array({codes}), {country}) AS CountryRegionCode',
+        f'element_at(array({names}), {country}) AS EnglishCountryRegionName',
+        f'element_at(array({names}), {country}) AS SpanishCountryRegionName',
+        f'element_at(array({names}), {country}) AS FrenchCountryRegionName',
+        'lpad(cast(pmod(hash(id, 2), 99999) as string), 5, \'0\') AS PostalCode',
+        'cast(pmod(id, 10) + 1 as int) AS SalesTerritoryKey',
+    )
+
+
+def generate_products(spark):
+    return spark.range(PRODUCTS, numPartitions=1).selectExpr(
+        'cast(id + 1 as int) AS ProductKey',
+        "concat('AR-', lpad(cast(id as string), 4, '0')) AS ProductAlternateKey",
+        f'CASE WHEN pmod(id, 3) = 0 THEN NULL ELSE cast(pmod(hash(id, 1), {SUBCATEGORIES}) + 1 as int) END AS ProductSubcategoryKey',
+        "concat('Product ', cast(id + 1 as string)) AS EnglishProductName",
+        "concat('Producto ', cast(id + 1 as string)) AS SpanishProductName",
+        "concat('Produit ', cast(id + 1 as string)) AS FrenchProductName",
+        'cast(pmod(hash(id, 2), 200000) / 100.0 as decimal(19,4)) AS StandardCost',
+        f'{_pick(COLORS, "hash(id, 3)")} AS Color',
+        f'CASE WHEN pmod(id, 4) = 0 THEN NULL ELSE {_pick(SIZES, "hash(id, 4)")} END AS Size',
+        "concat('Model ', cast(pmod(id, 119) as string)) AS ModelName",
+        # Thumbnails of a few KB, like the GIFs of AdventureWorks
+        "unhex(repeat('474946383961', 1000)) AS LargePhoto",
+        "concat('Description of product ', cast(id + 1 as string)) AS EnglishDescription",
+        "'Current' AS Status",
+    )
+
+
+def generate_subcategories(spark):
+    return spark.range(SUBCATEGORIES, numPartitions=1).selectExpr(
+        'cast(id + 1 as int) AS ProductSubcategoryKey',
+        'cast(id + 1 as int) AS ProductSubcategoryAlternateKey',
+        f"concat({_pick(SUBCATEGORY_NAMES, 'id')}, ' ', cast(id + 1 as string)) AS EnglishProductSubcategoryName",
+        f"concat({_pick(SUBCATEGORY_NAMES, 'id')}, ' ', cast(id + 1 as string)) AS SpanishProductSubcategoryName",
+        f"concat({_pick(SUBCATEGORY_NAMES, 'id')}, ' ', cast(id + 1 as string)) AS FrenchProductSubcategoryName",
+        f'cast(pmod(id, {CATEGORIES}) + 1 as int) AS ProductCategoryKey',
+    )
+
+
+def generate_categories(spark):
+    return spark.range(CATEGORIES, numPartitions=1).selectExpr(
+        'cast(id + 1 as int) AS ProductCategoryKey',
+        'cast(id + 1 as int) AS ProductCategoryAlternateKey',
+        f'{_pick(CATEGORY_NAMES, "id")} AS EnglishProductCategoryName',
+        f'{_pick(CATEGORY_NAMES, "id")} AS SpanishProductCategoryName',
+        f'{_pick(CATEGORY_NAMES, "id")} AS FrenchProductCategoryName',
+    )
+
+
+def generate_dates(spark):
+    return spark.sql(f"SELECT explode(sequence(DATE'{DATE_START}', DATE'{DATE_END}')) AS d").coalesce(1).selectExpr(
+        "cast(date_format(d, 'yyyyMMdd') as int) AS DateKey",
+        'd AS FullDateAlternateKey',
+        'cast(dayofweek(d) as tinyint) AS DayNumberOfWeek',
+        "date_format(d, 'EEEE') AS EnglishDayNameOfWeek",
+        "date_format(d, 'EEEE') AS SpanishDayNameOfWeek",
+        "date_format(d, 'EEEE') AS FrenchDayNameOfWeek",
+        'cast(dayofmonth(d) as tinyint) AS DayNumberOfMonth',
+        'cast(dayofyear(d) as smallint) AS DayNumberOfYear',
+        'cast(weekofyear(d) as tinyint) AS WeekNumberOfYear',
+        "date_format(d, 'MMMM') AS EnglishMonthName",
+        "date_format(d, 'MMMM') AS SpanishMonthName",
+        "date_format(d, 'MMMM') AS FrenchMonthName",
+        'cast(month(d) as tinyint) AS MonthNumberOfYear',
+        'cast(quarter(d) as tinyint) AS CalendarQuarter',
+        'cast(year(d) as smallint) AS CalendarYear',
+        'cast(CASE WHEN month(d) <= 6 THEN 1 ELSE 2 END as tinyint) AS CalendarSemester',
+        'cast(pmod(quarter(d) + 1, 4) + 1 as tinyint) AS FiscalQuarter',
+        'cast(year(add_months(d, 6)) as smallint) AS FiscalYear',
+        'cast(CASE WHEN month(d) > 6 THEN 1 ELSE 2 END as tinyint) AS FiscalSemester',
+    )
+
+
+def generate_sales(spark, start: int, end: int, orders: int, day: int = None):
+    """
+    Fact rows `start` to `end`, LINES_PER_ORDER lines per order, each line a different product.
+    Order dates are spread evenly over ORDER_DAYS for `orders` orders, or all fall on `day`.
+    """
+    day_expression = str(day) if day is not None else f'cast(floor(order_id * {ORDER_DAYS} / {orders}) as int)'
+    partitions = max(1, (end - start) // ROWS_PER_FILE)
+
+    return spark.range(start, end, numPartitions=partitions).selectExpr(
+        f'floor(id / {LINES_PER_ORDER}) AS order_id',
+        f'cast(pmod(id, {LINES_PER_ORDER}) + 1 as tinyint) AS line',
+    ).selectExpr(
+        'order_id',
+        'line',
+        f"date_add(DATE'{ORDER_START}', {day_expression}) AS order_date",
+        f'cast(pmod(cast(hash(order_id) as bigint) + line * 7, {PRODUCTS}) + 1 as int) AS product_key',
+    ).selectExpr(
+        'product_key AS ProductKey',
+        "cast(date_format(order_date, 'yyyyMMdd') as int) AS OrderDateKey",
+        "cast(date_format(date_add(order_date, 12), 'yyyyMMdd') as int) AS DueDateKey",
+        "cast(date_format(date_add(order_date, 7), 'yyyyMMdd') as int) AS ShipDateKey",
+        f'cast(pmod(hash(order_id, 1), {CUSTOMERS}) + 11000 as int) AS CustomerKey',
+        'cast(1 as int) AS PromotionKey',
+        'cast(100 as int) AS CurrencyKey',
+        'cast(pmod(hash(order_id, 2), 10) + 1 as int) AS SalesTerritoryKey',
+        "concat('SO', cast(order_id + 43697 as string)) AS SalesOrderNumber",
+        'line AS SalesOrderLineNumber',
+        'cast(1 as tinyint) AS RevisionNumber',
+        'cast(1 as smallint) AS OrderQuantity',
+        'cast((pmod(hash(product_key, 3), 350000) + 229) / 100.0 as decimal(19,4)) AS UnitPrice',
+        'cast(0 as double) AS UnitPriceDiscountPct',
+        'cast((pmod(hash(product_key, 3), 350000) + 229) * 0.006 as decimal(19,4)) AS ProductStandardCost',
+        'cast((pmod(hash(product_key, 3), 350000) + 229) / 100.0 as decimal(19,4)) AS SalesAmount',
+        'cast((pmod(hash(product_key, 3), 350000) + 229) * 0.0008 as decimal(19,4)) AS TaxAmt',
+        'cast((pmod(hash(product_key, 3), 350000) + 229) * 0.00025 as decimal(19,4)) AS Freight',
+        'cast(order_date as timestamp) AS OrderDate',
+        'cast(date_add(order_date, 12) as timestamp) AS DueDate',
+        'cast(date_add(order_date, 7) as timestamp) AS ShipDate',
+    )
+
+
+# Source table to its generator; the fact is generated apart as it is scaled
+DIMENSION_GENERATORS = {
+    'DimCustomer': generate_customers,
+    'DimDate': generate_dates,
+    'DimGeography': generate_geographies,
+    'DimProduct': generate_products,
+    'DimProductCategory': generate_categories,
+    'DimProductSubcategory': generate_subcategories,
+}
+
+FACT_TABLE = 'FactInternetSales'
+
+
+def source_paths(lakehouse_path: str, specs: list) -> dict:
+    files_path = f"{lakehouse_path}/{LAKEHOUSE_PATHS['files_path']}"
+    return {spec['source']['table']: f"{files_path}/{spec['destination']['filename']}" for spec in specs}
+
+
+def generate_sources(spark, lakehouse_path: str, specs: list, scale: int) -> int:
+    """
+    Write the sources listed in pipeline_parameters.json to the lakehouse.
+
+    Returns:
+        int: Rows of the fact
+    """
+    paths = source_paths(lakehouse_path, specs)
+    unknown = [table for table in paths if table not in DIMENSION_GENERATORS and table != FACT_TABLE]
+    if unknown:
+        raise ValueError(f"No generator for {', '.join(unknown)}")
+
+    for table, path in paths.items():
+        if table in DIMENSION_GENERATORS:
+            DIMENSION_GENERATORS[table](spark).write.mode('overwrite').parquet(path)
+
+    rows = FACT_ROWS * scale
+    generate_sales(spark, 0, rows, rows // LINES_PER_ORDER).write.mode('overwrite').parquet(paths[FACT_TABLE])
+
+    return rows
+
+
+def append_sales(spark, lakehouse_path: str, specs: list, rows: int, fraction: float) -> int:
+    """
+    Append `fraction` of the fact rows as new orders of the day after the last order day.
+
+    Returns:
+        int: Appended rows
+    """
+    # Whole orders only, so no order is split between the two loads
+    appended = max(LINES_PER_ORDER, round(rows * fraction / LINES_PER_ORDER) * LINES_PER_ORDER)
+    generate_sales(spark, rows, rows + appended, rows // LINES_PER_ORDER, day=ORDER_DAYS) \
+        .write.mode('append').parquet(source_paths(lakehouse_path, specs)[FACT_TABLE])
+    return appended
+
+
+def notebook_cells(path: str) -> list:
+    """
+    Code cells of a notebook-content.py file, in order, with the table specs embedded as when rendered.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        content = embed_table_specs(file.read(), SPEC_PATH)
+
+    markers = list(CELL_MARKER_PATTERN.finditer(content))
+    cells = []
+    title = None
+    for index, marker in enumerate(markers):
+        end = markers[index + 1].start() if index + 1 < len(markers) else len(content)
+        body = content[marker.end():end]
+        if marker.group(1) == 'MARKDOWN':
+            heading = re.search(r'^# #+ (.+)$', body, re.MULTILINE)
+            title = heading.group(1).strip() if heading else title
+        elif marker.group(1) in ('CELL', 'PARAMETERS CELL'):
+            cells.append(NotebookCell(title, marker.group(1) == 'PARAMETERS CELL', body))
+    return cells
+
+
+def notebook_parameters(lakehouse_path: str, load_mode: str, broadcast_threshold_mb: int) -> dict:
+    """
+    Values injected after the parameters cell, as a pipeline run of the notebook does.
+    """
+    parameters = {
+        'load_mode': load_mode,
+        'broadcast_threshold_mb': broadcast_threshold_mb,
+        'lakehouse_abfss': lakehouse_path,
+    }
+    parameters.update({name: f'{lakehouse_path}/{path}' for name, path in LAKEHOUSE_PATHS.items()})
+    return parameters
+
+
+def _group(run_label: str, stage: str, name: str) -> str:
+    return f'{run_label}|{stage}|{name}'
+
+
+def _set_group(spark, group: str):
+    context = spark.sparkContext
+    if group:
+        context.setJobGroup(group, group)
+    else:
+        context.setLocalProperty('spark.jobGroup.id', None)
+
+
+def _tracked(function, position: int, stage: str, spark, run_label: str, timings: dict):
+    """
+    Wrap a notebook function so the jobs it runs, in whatever thread, are grouped per table and timed.
+    """
+    def wrapper(*args, **kwargs):
+        table = args[position] if len(args) > position else kwargs.get('table_name')
+        previous = spark.sparkContext.getLocalProperty('spark.jobGroup.id')
+        _set_group(spark, _group(run_label, stage, table))
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[(stage, table)] = timings.get((stage, table), 0.0) + time.perf_counter() - start
+            _set_group(spark, previous)
+
+    wrapper.tracked = True
+    return wrapper
+
+
+def run_notebook(spark, cells: list, parameters: dict, run_label: str) -> tuple:
+    """
+    Run the code cells in one namespace, each cell under the job group of its title.
+
+    Returns:
+        tuple: (stage, table) to seconds of the tracked functions, and cell title to seconds
+    """
+    namespace = {'spark': spark, '__name__': '__main__'}
+    timings = {}
+    cell_times = {}
+    try:
+        for cell in cells:
+            _set_group(spark, _group(run_label, 'cell', cell.title))
+            start = time.perf_counter()
+            exec(compile(cell.source, f'{NOTEBOOK_PATH} ({cell.title})', 'exec'), namespace)
+            if cell.parameters:
+                namespace.update(parameters)
+            cell_times[cell.title] = cell_times.get(cell.title, 0.0) + time.perf_counter() - start
+
+            for name, (position, stage) in TRACKED_FUNCTIONS.items():
+                function = namespace.get(name)
+                if function is not None and not getattr(function, 'tracked', False):
+                    namespace[name] = _tracked(function, position, stage, spark, run_label, timings)
+    finally:
+        _set_group(spark, None)
+
+    return timings, cell_times
+
+
+def _monitoring(spark, path: str):
+    url = spark.sparkContext.uiWebUrl
+    if not url:
+        return None
+    with urllib.request.urlopen(f'{url}/api/v1/applications/{spark.sparkContext.applicationId}{path}') as response:
+        return json.load(response)
+
+
+def job_metrics(spark, run_label: str) -> dict:
+    """
+    Sum the stage metrics of the jobs of a run per job group.
+
+    Returns:
+        dict: (stage, name) of the group to its jobs, shuffle, input and output bytes; empty without the Spark UI
+    """
+    # Listener events arrive asynchronously, wait for the last jobs to be recorded as done
+    jobs = []
+    for _ in range(50):
+        jobs = _monitoring(spark, '/jobs')
+        if jobs is None:
+            return {}
+        if not any(job['status'] == 'RUNNING' for job in jobs):
+            break
+        time.sleep(0.1)
+
+    attempts = {}
+    for stage in _monitoring(spark, '/stages'):
+        if stage['status'] != 'SKIPPED':
+            attempts.setdefault(stage['stageId'], []).append(stage)
+
+    metrics = {}
+    for job in jobs:
+        group = job.get('jobGroup') or ''
+        if not group.startswith(f'{run_label}|'):
+            continue
+        _, stage, name = group.split('|', 2)
+        entry = metrics.setdefault(
+            (stage, name),
+            {'jobs': 0, 'shuffle_read_bytes': 0, 'shuffle_write_bytes': 0, 'input_bytes': 0, 'output_bytes': 0},
+        )
+        entry['jobs'] += 1
+        for stage_id in job['stageIds']:
+            for attempt in attempts.get(stage_id, []):
+                entry['shuffle_read_bytes'] += attempt.get('shuffleReadBytes', 0)
+                entry['shuffle_write_bytes'] += attempt.get('shuffleWriteBytes', 0)
+                entry['input_bytes'] += attempt.get('inputBytes', 0)
+                entry['output_bytes'] += attempt.get('outputBytes', 0)
+    return metrics
+
+
+def table_files(spark, lakehouse_path: str, table: str) -> dict:
+    """
+    Files of the current version of a Delta table, and every parquet file left in its folder.
+    """
+    table_path = f"{lakehouse_path}/{LAKEHOUSE_PATHS['tables_path']}/{table}"
+    if not DeltaTable.isDeltaTable(spark, table_path):
+        return {'files': 0, 'bytes': 0, 'files_on_disk': 0}
+
+    detail = DeltaTable.forPath(spark, table_path).detail().first()
+    files_on_disk = sum(
+        1
+        for _, _, files in os.walk(table_path)
+        for file_name in files
+        if file_name.endswith('.parquet')
+    )
+    return {'files': detail['numFiles'], 'bytes': detail['sizeInBytes'], 'files_on_disk': files_on_disk}
+
+
+def benchmark_load(spark, cells: list, specs: list, lakehouse_path: str, scale: int, load_mode: str, threshold: int) -> dict:
+    """
+    Run the notebook once and collect the statistics of every table it loads.
+    """
+    run_label = f'{scale}x-{load_mode}'
+    parameters = notebook_parameters(lakehouse_path, load_mode, threshold)
+
+    start = time.perf_counter()
+    timings, cell_times = run_notebook(spark, cells, parameters, run_label)
+    wall_time = time.perf_counter() - start
+    metrics = job_metrics(spark, run_label)
+
+    tables = []
+    for spec in specs:
+        if 'transform' not in spec:
+            continue
+        table = spec['transform'].get('target', spec['source']['table'])
+        result = {
+            'table': table,
+            'load_s': round(timings.get(('load', table), 0.0), 3),
+            'maintenance_s': round(timings.get(('maintenance', table), 0.0), 3),
+            **table_files(spark, lakehouse_path, table),
+        }
+        for key in ('jobs', 'shuffle_read_bytes', 'shuffle_write_bytes', 'input_bytes', 'output_bytes'):
+            result[key] = sum(metrics.get((stage, table), {}).get(key, 0) for stage in ('load', 'maintenance'))
+        tables.append(result)
+
+    return {
+        'scale': scale,
+        'load_mode': load_mode,
+        'wall_s': round(wall_time, 3),
+        'cells': {title: round(seconds, 3) for title, seconds in cell_times.items()},
+        'cell_jobs': {name: entry for (stage, name), entry in metrics.items() if stage == 'cell'},
+        'tables': tables,
+    }
+
+
+def create_session(master: str, driver_memory: str, shuffle_partitions: int):
+    builder = SparkSession.builder \
+        .master(master) \
+        .appName('transform_benchmark') \
+        .config('spark.driver.memory', driver_memory) \
+        .config('spark.sql.shuffle.partitions', str(shuffle_partitions)) \
+        .config('spark.sql.extensions', 'io.delta.sql.DeltaSparkSessionExtension') \
+        .config('spark.sql.catalog.spark_catalog', 'org.apache.spark.sql.delta.catalog.DeltaCatalog') \
+        .config('spark.databricks.delta.allowArbitraryProperties.enabled', 'true') \
+        .config('spark.ui.retainedJobs', '100000') \
+        .config('spark.ui.retainedStages', '100000')
+    # delta.parquet.vorder.enabled is a Fabric table property, unknown to open source Delta, hence arbitrary properties
+    return configure_spark_with_delta_pip(builder).getOrCreate()
+
+
+def print_report(run: dict):
+    print(f"\n{run['scale']}x {run['load_mode']}: {run['wall_s']:.2f} s")
+    print(f"{'table':<20} {'load s':>8} {'maint s':>8} {'shuffle MB':>11} {'input MB':>9} {'files':>6} {'on disk':>8} {'size MB':>8}")
+    for table in run['tables']:
+        print(
+            f"{table['table']:<20} {table['load_s']:>8.2f} {table['maintenance_s']:>8.2f} "
+            f"{(table['shuffle_read_bytes'] + table['shuffle_write_bytes']) / 1024 / 1024:>11.1f} "
+            f"{table['input_bytes'] / 1024 / 1024:>9.1f} {table['files']:>6} {table['files_on_disk']:>8} "
+            f"{table['bytes'] / 1024 / 1024:>8.1f}"
+        )
+
+
+def run(scales: list, delta_fraction: float, threshold: int, master: str, driver_memory: str, shuffle_partitions: int, keep: bool) -> dict:
+    with open(SPEC_PATH, 'r') as file:
+        specs = json.load(file)
+    cells = notebook_cells(NOTEBOOK_PATH)
+
+    spark = create_session(master, driver_memory, shuffle_partitions)
+    runs = []
+    try:
+        for scale in scales:
+            lakehouse_path = tempfile.mkdtemp(prefix=f'pf_transform_benchmark_{scale}x_')
+            try:
+                start = time.perf_counter()
+                rows = generate_sources(spark, lakehouse_path, specs, scale)
+                print(f"\n{scale}x: {rows} fact rows generated in {time.perf_counter() - start:.2f} s in {lakehouse_path}")
+
+                result = benchmark_load(spark, cells, specs, lakehouse_path, scale, 'full', threshold)
+                result['fact_rows'] = rows
+                runs.append(result)
+                print_report(result)
+
+                if delta_fraction:
+                    appended = append_sales(spark, lakehouse_path, specs, rows, delta_fraction)
+                    result = benchmark_load(spark, cells, specs, lakehouse_path, scale, 'incremental', threshold)
+                    result['fact_rows'] = appended
+                    runs.append(result)
+                    print_report(result)
+            finally:
+                if keep:
+                    print(f"Lakehouse kept in {lakehouse_path}")
+                else:
+                    shutil.rmtree(lakehouse_path, ignore_errors=True)
+        spark_version = spark.version
+    finally:
+        spark.stop()
+
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'spark': spark_version,
+        'runs': runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the TransformAndLoad notebook on a local Spark session.')
+    parser.add_argument('--scales', default=','.join(str(scale) for scale in DEFAULT_SCALES), help='Comma separated multiples of the fact rows, 1 to 1000')
+    parser.add_argument('--delta-fraction', type=float, default=0.01, help='Fact rows appended for the incremental load, as a fraction; 0 skips it')
+    parser.add_argument('--broadcast-threshold-mb', type=int, default=64, help='broadcast_threshold_mb of the notebook')
+    parser.add_argument('--master', default='local[*]')
+    parser.add_argument('--driver-memory', default='4g')
+    parser.add_argument('--shuffle-partitions', type=int, default=200, help='spark.sql.shuffle.partitions, 200 as on Fabric')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated lakehouse of every scale')
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+    results = run(
+        scales,
+        args.delta_fraction,
+        args.broadcast_threshold_mb,
+        args.master,
+        args.driver_memory,
+        args.shuffle_partitions,
+        args.keep,
+    )
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""
+Microbenchmarks of the extract/replace routines of scripts/utils.py.
+
+Synthetic items are generated at several scale points (pipelines with 10 to
+10,000 Copy activities, mashup.pq files with 10 to 1,000 data destinations,
+notebooks with up to 5,000 parameters) and every routine is timed on them:
+extraction, placeholder insertion and restoration, plus the streaming variants
+for pipelines. Peak memory is measured with tracemalloc in a separate run, so
+it does not distort the timings.
+
+Results are written as JSON and can be compared with the results of another
+commit.
+
+Examples:
+    ```
+    python -m benchmarks.utils_benchmark --output bench_utils.json
+    git checkout other-commit && python -m benchmarks.utils_benchmark --compare bench_utils.json
+    python -m benchmarks.utils_benchmark --artifacts pipeline --scales 10000 --repeat 3
+    ```
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import namedtuple
+
+from scripts import utils
+
+
+SCALES = {
+    'pipeline': (10, 100, 1000, 10000),
+    'mashup': (10, 100, 1000),
+    'notebook': (10, 100, 1000, 5000),
+}
+
+# Copy activities per ForEach container of the generated pipelines
+ACTIVITIES_PER_CONTAINER = 10
+
+ITEM_NAME = 'Benchmark'
+
+# A routine to time; fresh is the file restored before each run of routines rewriting it in place
+Routine = namedtuple('Routine', ['name', 'run', 'path', 'fresh'])
+
+
+def _guid(seed: int, index: int) -> str:
+    return str(uuid.UUID(int=(seed << 64) + index))
+
+
+def _copy_activity(index: int) -> dict:
+    return {
+        'name': f'Copy{index}',
+        'type': 'Copy',
+        'dependsOn': [],
+        'policy': {'timeout': '0.12:00:00', 'retry': 0, 'retryIntervalInSeconds': 30},
+        'typeProperties': {
+            'source': {
+                'type': 'SqlServerSource',
+                'queryTimeout': '02:00:00',
+                'datasetSettings': {
+                    'annotations': [],
+                    'type': 'SqlServerTable',
+                    'typeProperties': {'schema': 'dbo', 'table': f'Table{index}', 'database': f'Database{index % 7}'},
+                    'externalReferences': {'connection': _guid(1, index)},
+                },
+            },
+            'sink': {
+                'type': 'ParquetSink',
+                'datasetSettings': {
+                    'annotations': [],
+                    'linkedService': {
+                        'name': 'MainStorage',
+                        'properties': {
+                            'annotations': [],
+                            'type': 'Lakehouse',
+                            'typeProperties': {
+                                'workspaceId': _guid(2, 0),
+                                'artifactId': _guid(3, 0),
+                                'rootFolder': 'Files',
+                            },
+                        },
+                    },
+                    'typeProperties': {'location': {'type': 'LakehouseLocation', 'fileName': f'dbo.Table{index}.parquet'}},
+                },
+            },
+            'enableStaging': False,
+        },
+    }
+
+
+def generate_pipeline(path: str, copy_activities: int):
+    """
+    Write a pipeline-content.json with `copy_activities` Copy activities nested in ForEach containers.
+    """
+    containers = []
+    for start in range(0, copy_activities, ACTIVITIES_PER_CONTAINER):
+        indexes = range(start, min(start + ACTIVITIES_PER_CONTAINER, copy_activities))
+        containers.append({
+            'name': f'ForEach{start // ACTIVITIES_PER_CONTAINER}',
+            'type': 'ForEach',
+            'dependsOn': [],
+            'typeProperties': {
+                'items': {'value': '@pipeline().parameters.tables', 'type': 'Expression'},
+                'activities': [_copy_activity(index) for index in indexes],
+            },
+        })
+
+    with open(path, 'w') as file:
+        json.dump({'properties': {'activities': containers}}, file, indent=2)
+
+
+def generate_mashup(path: str, destinations: int):
+    """
+    Write a mashup.pq with `destinations` queries, each with a lakehouse data destination.
+    """
+    members = ['[StagingDefinition = [Kind = "FastCopy"]]\nsection Section1;']
+    for index in range(destinations):
+        members.append(
+            f'shared Query{index} = let\n'
+            f'  Source = Sql.Database("server{index % 5}.database.windows.net", "Database{index % 7}"),\n'
+            f'  Navigation = Source{{[Schema = "dbo", Item = "Table{index}"]}}[Data]\n'
+            f'in\n'
+            f'  Navigation;'
+        )
+        members.append(
+            f'shared Query{index}_DataDestination = let\n'
+            f'  Pattern = Lakehouse.Contents([CreateNavigationProperties = false, EnableFolding = false]),\n'
+            f'  Navigation_1 = Pattern{{[workspaceId = "{_guid(2, index % 3)}"]}}[Data],\n'
+            f'  Navigation_2 = Navigation_1{{[lakehouseId = "{_guid(3, index % 3)}"]}}[Data],\n'
+            f'  TableNavigation = Navigation_2{{[Id = "Table{index}", ItemKind = "Table"]}}?[Data]?\n'
+            f'in\n'
+            f'  TableNavigation;'
+        )
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(members) + '\n')
+
+
+def generate_notebook(path: str, parameters: int):
+    """
+    Write a notebook-content.py whose PARAMETERS CELL holds `parameters` literal assignments.
+    """
+    lines = []
+    for index in range(parameters):
+        kind = index % 4
+        if kind == 0:
+            lines.append(f'name_{index} = "value-{index}"')
+        elif kind == 1:
+            lines.append(f'count_{index} = {index}')
+        elif kind == 2:
+            lines.append(f'enabled_{index} = {index % 8 == 2}')
+        else:
+            # Computed values are not parameters
+            lines.append(f'path_{index} = f"abfss://{{name_{index - 3}}}@onelake.dfs.fabric.microsoft.com/Tables"')
+
+    metadata = '# METADATA ********************\n\n# META {\n# META   "language": "python"\n# META }\n'
+    content = (
+        '# Fabric notebook source\n\n'
+        + metadata
+        + '\n# PARAMETERS CELL ********************\n\n'
+        + '\n'.join(lines)
+        + '\n\n'
+        + metadata
+        + '\n# CELL ********************\n\n'
+        + 'df = spark.read.parquet(f"{path_3}/Raw")\ndf.write.mode("overwrite").save("Tables/Benchmark")\n\n'
+        + metadata
+    )
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def _write(path: str, content: str, encoding: str = None):
+    with open(path, 'w', encoding=encoding) as file:
+        file.write(content)
+
+
+def pipeline_routines(directory: str, scale: int) -> list:
+    original = os.path.join(directory, 'pipeline-content.json')
+    generate_pipeline(original, scale)
+    variables = utils._extract_data_pipeline_variables(original)
+
+    placeholders = os.path.join(directory, 'pipeline-placeholders.json')
+    _write(placeholders, utils._replace_data_pipeline_variables_with_placeholders(original, variables))
+
+    work = os.path.join(directory, 'pipeline-work.json')
+
+    return [
+        Routine('extract', lambda: utils._extract_data_pipeline_variables(original), original, None),
+        Routine('to_placeholders', lambda: utils._replace_data_pipeline_variables_with_placeholders(original, variables), original, None),
+        Routine('to_variables', lambda: utils._replace_data_pipeline_placeholders_with_variables(placeholders, variables), placeholders, None),
+        Routine('stream_extract', lambda: utils._stream_data_pipeline_variables(original), original, None),
+        Routine(
+            'stream_to_placeholders',
+            lambda: utils._stream_data_pipeline_variables_with_placeholders(work, variables),
+            original,
+            lambda: shutil.copyfile(original, work),
+        ),
+        Routine(
+            'stream_to_variables',
+            lambda: utils._stream_data_pipeline_placeholders_with_variables(work, variables),
+            placeholders,
+            lambda: shutil.copyfile(placeholders, work),
+        ),
+    ]
+
+
+def mashup_routines(directory: str, scale: int) -> list:
+    original = os.path.join(directory, 'mashup.pq')
+    generate_mashup(original, scale)
+    variables = utils._extract_dataflow_gen2_variables(original)
+
+    placeholders = os.path.join(directory, 'mashup-placeholders.pq')
+    _write(placeholders, utils._replace_dataflow_gen2_parameters_with_placeholders(original, variables, ITEM_NAME), 'utf-8')
+
+    return [
+        Routine('extract', lambda: utils._extract_dataflow_gen2_variables(original), original, None),
+        Routine('to_placeholders', lambda: utils._replace_dataflow_gen2_parameters_with_placeholders(original, variables, ITEM_NAME), original, None),
+        Routine('to_variables', lambda: utils._replace_dataflow_gen2_placeholders_with_parameters(placeholders, variables, ITEM_NAME), placeholders, None),
+    ]
+
+
+def notebook_routines(directory: str, scale: int) -> list:
+    original = os.path.join(directory, 'notebook-content.py')
+    generate_notebook(original, scale)
+    variables = utils._extract_parameters_notebook(original)
+
+    placeholders = os.path.join(directory, 'notebook-placeholders.py')
+    _write(placeholders, utils._replace_notebook_parameters_with_placeholders(original, variables, ITEM_NAME), 'utf-8')
+
+    return [
+        Routine('extract', lambda: utils._extract_parameters_notebook(original), original, None),
+        Routine('to_placeholders', lambda: utils._replace_notebook_parameters_with_placeholders(original, variables, ITEM_NAME), original, None),
+        Routine('to_variables', lambda: utils._replace_notebook_placeholders_with_parameters(placeholders, variables, ITEM_NAME), placeholders, None),
+    ]
+
+
+ARTIFACT_ROUTINES = {
+    'pipeline': pipeline_routines,
+    'mashup': mashup_routines,
+    'notebook': notebook_routines,
+}
+
+
+def measure(routine: Routine, repeat: int) -> dict:
+    """
+    Time a routine `repeat` times, then measure its peak memory in one more traced run.
+    """
+    timings = []
+    for _ in range(repeat):
+        if routine.fresh:
+            routine.fresh()
+        start = time.perf_counter()
+        routine.run()
+        timings.append(time.perf_counter() - start)
+
+    if routine.fresh:
+        routine.fresh()
+    tracemalloc.start()
+    try:
+        routine.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'peak_bytes': peak,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(artifacts: list, scales: list, repeat: int) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory(prefix='pf_utils_benchmark_') as directory:
+        for artifact in artifacts:
+            for scale in SCALES[artifact]:
+                if scales and scale not in scales:
+                    continue
+
+                scale_directory = os.path.join(directory, f'{artifact}_{scale}')
+                os.makedirs(scale_directory)
+
+                for routine in ARTIFACT_ROUTINES[artifact](scale_directory, scale):
+                    result = {
+                        'artifact': artifact,
+                        'routine': routine.name,
+                        'scale': scale,
+                        'size_bytes': os.path.getsize(routine.path),
+                        **measure(routine, repeat),
+                    }
+                    results.append(result)
+                    print(
+                        f"{artifact:<9} {routine.name:<23} {scale:>6} {result['size_bytes'] / 1024:>10.1f} KB "
+                        f"{result['median_s'] * 1000:>10.2f} ms {result['peak_bytes'] / 1024 / 1024:>8.2f} MB"
+                    )
+
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare median times with a baseline run.
+
+    Returns:
+        list: (artifact, routine, scale, ratio) of the routines slower than threshold times the baseline
+    """
+    baseline_results = {
+        (result['artifact'], result['routine'], result['scale']): result
+        for result in baseline['results']
+    }
+
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    regressions = []
+    for result in current['results']:
+        key = (result['artifact'], result['routine'], result['scale'])
+        if key not in baseline_results:
+            continue
+        ratio = result['median_s'] / max(baseline_results[key]['median_s'], 1e-9)
+        memory_ratio = result['peak_bytes'] / max(baseline_results[key]['peak_bytes'], 1)
+        flag = '  <-- slower' if ratio > threshold else ''
+        print(f"{key[0]:<9} {key[1]:<23} {key[2]:>6} time x{ratio:>6.2f} memory x{memory_ratio:>6.2f}{flag}")
+        if ratio > threshold:
+            regressions.append((*key, ratio))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extract/replace routines of scripts/utils.py.')
+    parser.add_argument('--artifacts', default=','.join(SCALES), help='Comma separated artifacts: pipeline, mashup, notebook')
+    parser.add_argument('--scales', default='', help='Comma separated scale points to run, defaults to all')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per routine')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of another commit to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    artifacts = [artifact.strip() for artifact in args.artifacts.split(',') if artifact.strip()]
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+
+    results = run(artifacts, scales, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+        print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
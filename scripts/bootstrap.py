@@ -1,24 +1,162 @@
 # scripts/bootstrap.py
-from dotenv import load_dotenv
-import pyfabricops as pf
-import os
+"""
+Project settings shared by every script.
+
+The static settings are plain module constants. The settings that cost something
+(pf, which imports pyfabricops and configures auth and logging, and branch,
+workspace_suffix and workspace_name, which read git and branches.json) are
+computed on first access and memoised, so a script only pays for what it uses:
+`from scripts.bootstrap import project_path, config_path` never imports pyfabricops.
 
-# loading .env
-load_dotenv()
+The branch and suffix are also cached on disk in the git directory, keyed by the
+content of HEAD and the modification time of branches.json, so later runs on the
+same checkout skip them. As with pf.get_workspace_suffix, a branch missing from
+branches.json raises pyfabricops.ResourceNotFoundError.
+"""
+import json
+import os
+import subprocess
 
-# common settings
-pf.set_auth_provider('env')
-pf.setup_logging(level='info', format_style='minimal')
+from scripts import tracing
 
 # project specific settings
 root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 project_path               = 'src'
 workspace_path             = 'PF_002_Live'
-branch                     = pf.get_current_branch()
 workspace_alias            = "PF_002_Live"
-workspace_suffix           = pf.get_workspace_suffix(
-    branch=branch,
-    path=os.path.join(root_path, 'branches.json')
-)
-workspace_name             = f'{workspace_alias}{workspace_suffix}'
 config_path                = os.path.join(project_path, 'config.json')
+cache_path                 = os.path.join(root_path, '.pf_cache')
+manifest_path              = os.path.join(cache_path, 'manifest.json')
+branches_path              = os.path.join(root_path, 'branches.json')
+
+BOOTSTRAP_CACHE_FILE = 'pf_bootstrap.json'
+
+HEAD_REF_PREFIX = 'ref: refs/heads/'
+
+
+def _git_dir() -> str:
+    """
+    Locate the git directory of the repository, following the .git file of worktrees.
+    """
+    path = os.path.join(root_path, '.git')
+    if os.path.isfile(path):
+        with open(path, 'r') as file:
+            content = file.read().strip()
+        if content.startswith('gitdir:'):
+            return os.path.normpath(os.path.join(root_path, content[len('gitdir:'):].strip()))
+    return path if os.path.isdir(path) else None
+
+
+def _read_head(git_dir: str) -> str:
+    if git_dir is None:
+        return None
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), 'r') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def _load_pf():
+    with tracing.span('import pyfabricops'):
+        from dotenv import load_dotenv
+        import pyfabricops as pf
+
+    pf = tracing.instrument(pf)
+
+    # One keep-alive connection pool for every API call of the process
+    from scripts.http_session import share_session
+    share_session()
+
+    # loading .env
+    load_dotenv()
+
+    # common settings
+    pf.set_auth_provider('env')
+    pf.setup_logging(level='info', format_style='minimal')
+
+    return pf
+
+
+def _resource_not_found(message: str):
+    """
+    Raise the error pf.get_workspace_suffix raises, importing pyfabricops only on this path.
+    """
+    from pyfabricops import ResourceNotFoundError
+    raise ResourceNotFoundError(message)
+
+
+@tracing.traced
+def _resolve_branch() -> dict:
+    """
+    Resolve the branch and its workspace suffix, from the on-disk cache when HEAD
+    and branches.json did not change since the last run.
+    """
+    try:
+        branches_stat = os.stat(branches_path)
+    except OSError:
+        _resource_not_found(f'Dict not found at {branches_path}')
+
+    git_dir = _git_dir()
+    head = _read_head(git_dir)
+    key = {'head': head, 'branches_mtime': branches_stat.st_mtime_ns, 'branches_size': branches_stat.st_size}
+    cache_path = os.path.join(git_dir, BOOTSTRAP_CACHE_FILE) if git_dir else None
+
+    if cache_path and head and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as file:
+                cached = json.load(file)
+            if cached.get('key') == key:
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    if head and head.startswith(HEAD_REF_PREFIX):
+        branch = head[len(HEAD_REF_PREFIX):]
+    else:
+        # Detached HEAD, or no repository: same answer as pf.get_current_branch()
+        try:
+            branch = subprocess.run(
+                ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=root_path,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            branch = 'main'
+
+    with open(branches_path, 'r') as file:
+        branches = json.load(file)
+    if branch not in branches:
+        _resource_not_found('The branch is not configured in branches dictionary.')
+
+    resolved = {'key': key, 'branch': branch, 'workspace_suffix': branches[branch]}
+
+    if cache_path and head:
+        try:
+            with open(cache_path, 'w') as file:
+                json.dump(resolved, file)
+        except OSError:
+            pass
+
+    return resolved
+
+
+def __getattr__(name: str):
+    """
+    Compute the lazy settings on first access and keep them as module attributes,
+    so this is only called once per setting.
+    """
+    if name == 'pf':
+        globals()['pf'] = _load_pf()
+    elif name in ('branch', 'workspace_suffix'):
+        resolved = _resolve_branch()
+        globals().update(branch=resolved['branch'], workspace_suffix=resolved['workspace_suffix'])
+    elif name == 'workspace_name':
+        suffix = globals()['workspace_suffix'] if 'workspace_suffix' in globals() else __getattr__('workspace_suffix')
+        globals()['workspace_name'] = f'{workspace_alias}{suffix}'
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return globals()[name]
@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+from scripts.tracing import span
+
+
+@contextmanager
+def atomic_write(path: str, encoding: str = None):
+    """
+    Open a temporary file next to `path` for writing and move it over `path` on success,
+    so readers never see a partially written file.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as file:
+            yield file
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+# Parsed config per path with the (mtime, size) it was read or written with, shared by the
+# sessions of a process; any other writer (e.g. pyfabricops) changes the stat and forces a re-read
+_parsed_configs = {}
+
+
+def _stat_key(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigSession:
+    """
+    Batched access to the multi-branch config.json.
+
+    The config is loaded once when the session opens, shared by every export/replace
+    call through workspace views, and written back once, atomically, when the session
+    closes and only if a section actually changed.
+
+    Examples:
+        ```python
+        with ConfigSession('src/config.json') as config:
+            export_data_pipeline_variables_to_config(..., session=config)
+            export_notebook_variables(..., session=config)
+        ```
+    """
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self.config = None
+        self.dirty = set()
+
+    def __enter__(self):
+        self.load()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.flush()
+        elif self.dirty:
+            # The shared parsed config holds changes that were never written
+            _parsed_configs.pop(os.path.abspath(self.config_path), None)
+        return False
+
+    def load(self):
+        """
+        Read config.json, discarding any pending change.
+        The file is only parsed again when it changed since this process last read or wrote it.
+        """
+        path = os.path.abspath(self.config_path)
+        cached = _parsed_configs.get(path)
+        if cached and not self.dirty and cached[0] == _stat_key(path):
+            self.config = cached[1]
+            return
+
+        with span('ConfigSession.load', path=self.config_path) as span_args, open(self.config_path, 'r') as file:
+            self.config = json.load(file)
+            span_args['bytes'] = file.tell()
+        _parsed_configs[path] = (_stat_key(path), self.config)
+        self.dirty.clear()
+
+    def workspace(self, branch: str, workspace_alias: str) -> 'WorkspaceConfig':
+        """
+        Get a view over the config of a workspace in a branch.
+        """
+        return WorkspaceConfig(self, branch, workspace_alias)
+
+    def merge(self, base: dict, changed: dict, keys: tuple = ()):
+        """
+        Apply the values that differ between two versions of the config, e.g. what a
+        pyfabricops call saved to a copy of config.json, and mark their sections dirty.
+
+        Args:
+            base (dict): The config as it was before the change
+            changed (dict): The config after the change
+        """
+        target = self.config
+        for key in keys:
+            target = target[key]
+
+        for key, value in changed.items():
+            if isinstance(value, dict) and isinstance(base.get(key), dict) and isinstance(target.get(key), dict):
+                self.merge(base[key], value, keys + (key,))
+            elif key not in base or base[key] != value:
+                target[key] = value
+                self.dirty.add((keys + (key,))[:3])
+
+    def flush(self):
+        """
+        Write config.json back if any section changed.
+        """
+        if not self.dirty:
+            return
+
+        with span('ConfigSession.flush', path=self.config_path) as span_args, atomic_write(self.config_path) as file:
+            json.dump(self.config, file, indent=4)
+            span_args['bytes'] = file.tell()
+        _parsed_configs[os.path.abspath(self.config_path)] = (_stat_key(self.config_path), self.config)
+
+        sections = ', '.join('.'.join(section) for section in sorted(self.dirty))
+        print(f"Config saved to {self.config_path} ({sections}).")
+        self.dirty.clear()
+
+
+class WorkspaceConfig:
+    """
+    View over config[branch][workspace_alias] bound to a ConfigSession.
+    """
+
+    def __init__(self, session: ConfigSession, branch: str, workspace_alias: str):
+        self.session = session
+        self.branch = branch
+        self.workspace_alias = workspace_alias
+
+    @property
+    def data(self) -> dict:
+        return self.session.config[self.branch][self.workspace_alias]
+
+    def get(self, *keys, default=None):
+        """
+        Get a nested value, e.g. get('notebooks', 'TransformAndLoad', 'variables').
+        """
+        value = self.data
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def set(self, *keys, value):
+        """
+        Set a nested value, creating the intermediate sections, and mark its
+        section dirty when the value changed.
+        """
+        section = self.data
+        for key in keys[:-1]:
+            section = section.setdefault(key, {})
+
+        if section.get(keys[-1]) != value:
+            section[keys[-1]] = value
+            self.session.dirty.add((self.branch, self.workspace_alias, keys[0]))
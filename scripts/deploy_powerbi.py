@@ -1,4 +1,5 @@
 # scripts/deploy_powerbi.py
+from scripts import tracing
 from scripts.bootstrap import (
     branch,
     config_path,
@@ -10,6 +11,9 @@ from scripts.bootstrap import (
     workspace_path,   
     workspace_suffix,
 )
+from scripts.tmdl import extract_semantic_models_parameters
+
+tracing.enable()
 
 pf.deploy_semantic_model(
     workspace_name,
@@ -33,7 +37,7 @@ pf.export_all_semantic_models(
 )
 
 # Export semantic models parameters
-pf.extract_semantic_models_parameters(
+extract_semantic_models_parameters(
     project_path=project_path,
     workspace_alias=workspace_alias,
     config_path=config_path,
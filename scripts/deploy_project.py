@@ -1,80 +1,266 @@
-# scripts/deploy_powerbi.py
-from pyfabricops import export_all_semantic_models
+# scripts/deploy_project.py
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from functools import partial
+
+from scripts import bootstrap, tracing
 from scripts.bootstrap import (
     branch,
     config_path,
     pf,
-    project_path, 
-    root_path,
     workspace_alias,
-    workspace_name,   
-    workspace_path,   
+    workspace_name,
+    workspace_path,
     workspace_suffix,
 )
-
-pf.deploy_all_data_pipelines(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
+from scripts.config_session import ConfigSession
+from scripts.discovery import item_folder
+from scripts.fingerprint import DEPLOYMENTS_SECTION, fingerprint_item
+from scripts.pbir import (
+    DEFINITION_FILE,
+    bind_definition,
+    dataset_name,
+    display_name,
+    find_part,
+    load_reports,
+    package_report,
+    parse_part,
 )
+from scripts.scheduler import ReadWriteLock, Task, build_dependency_graph, item_key, run_tasks
+from scripts.tmdl import extract_semantic_models_parameters
 
 
-pf.deploy_all_notebooks(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
+# pf functions deploy_report relies on, exported by pyfabricops from 0.3.3 to 0.8.1 at least
+REPORT_FUNCTIONS = ('resolve_workspace', 'resolve_report', 'create_report', 'update_report_definition')
 
-pf.export_all_notebooks(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
 
+def deploy_item(deploy, config_lock: ReadWriteLock, *args, **kwargs):
+    """
+    Run a pf.deploy_* function against a private copy of config.json, then merge what it
+    saved there (e.g. the ID of the item) into config.json. Only the merge holds the
+    config lock alone, so items deploy at the same time.
 
-pf.deploy_all_semantic_models(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
+    Args:
+        deploy: The pf.deploy_* function, called with args, kwargs and the config_path of the copy
+        config_lock (ReadWriteLock): Lock of config.json shared by the deploy tasks
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        private_path = os.path.join(directory, os.path.basename(config_path))
+        with config_lock.hold('read'):
+            shutil.copyfile(config_path, private_path)
+        with open(private_path, 'r') as file:
+            base = json.load(file)
 
+        deploy(*args, config_path=private_path, **kwargs)
 
-export_all_semantic_models(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-    excluded_starts=('Main',),
-)
+        with open(private_path, 'r') as file:
+            changed = json.load(file)
 
+    with config_lock.hold('write'), ConfigSession(config_path) as session:
+        session.merge(base, changed)
 
-pf.extract_semantic_models_parameters(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    config_path=config_path,
-    branch=branch,
-)
 
+def deploy_report(parts: list, workspace_folder: str, semantic_model_ids: dict):
+    """
+    Bind a loaded report to the semantic model of the branch and upload it,
+    without rewriting its definition.pbir on disk.
 
-pf.deploy_all_reports_cicd(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
+    Args:
+        parts (list): ReportPart tuples of the report, see scripts/pbir.py
+        workspace_folder (str): Folder of the report in the workspace, e.g. 'PowerBI/Import'
+        semantic_model_ids (dict): Semantic model ID to name, to resolve byConnection reports
+    """
+    name = display_name(parts)
+    definition = parse_part(find_part(parts, DEFINITION_FILE))
+    semantic_model = dataset_name(definition, semantic_model_ids)
+
+    with ConfigSession(config_path) as session:
+        workspace = session.workspace(branch, workspace_alias)
+        workspace_id = workspace.get('workspace_config', 'workspace_id')
+        folder_id = workspace.get('folders', workspace_folder)
+        semantic_model_id = workspace.get('semantic_models', semantic_model, 'id')
+
+    if semantic_model_id is None:
+        raise ValueError(f"No ID for the semantic model {semantic_model} of {name} in {config_path}.")
+
+    if workspace_id is None:
+        workspace_id = pf.resolve_workspace(workspace_name)
+        if workspace_id is None:
+            raise ValueError(f"Workspace {workspace_name} not found.")
+
+    item_definition = package_report(parts, bind_definition(definition, workspace_name, semantic_model, semantic_model_id))
+
+    report_id = pf.resolve_report(workspace_id, name)
+    if report_id is None:
+        pf.create_report(workspace_id, display_name=name, item_definition=item_definition, folder=folder_id, df=False)
+    else:
+        pf.update_report_definition(workspace_id, report_id, item_definition=item_definition, df=False)
+    print(f"Report {name} deployed, bound to {semantic_model}.")
+
+
+def main(max_workers: int = 4, force: bool = False, project_path: str = bootstrap.project_path):
+    """
+    Deploy the items whose definition changed to the workspace of the branch.
+
+    Args:
+        max_workers (int): Maximum number of items deployed at the same time
+        force (bool): Deploy every item, even when its definition is unchanged
+        project_path (str): Project holding the rendered items, e.g. a render overlay
+    """
+    common = dict(
+        project_path=project_path,
+        workspace_path=workspace_path,
+        config_path=config_path,
+        branch=branch,
+        workspace_suffix=workspace_suffix,
+    )
+
+    with ConfigSession(config_path) as session:
+        # Reports bound by connection reference the semantic model ID of any branch
+        semantic_model_ids = {
+            semantic_model['id']: name
+            for branch_config in session.config.values()
+            for name, semantic_model in branch_config.get(workspace_alias, {}).get('semantic_models', {}).items()
+            if semantic_model.get('id')
+        }
+        deployed = dict(session.workspace(branch, workspace_alias).get(DEPLOYMENTS_SECTION, default={}))
+
+    items, graph = build_dependency_graph(project_path, workspace_alias, semantic_model_ids)
+
+    # Only the items whose rendered definition changed since the last deploy to this workspace are uploaded
+    fingerprints = {item_key(item): fingerprint_item(item_folder(project_path, item)) for item in items}
+    changed = {key for key, fingerprint in fingerprints.items() if force or deployed.get(key) != fingerprint}
+
+    # Lakehouses are provisioned by project_start, they only order the items loading them
+    deploy_actions = {
+        'Lakehouse': None,
+        'DataPipeline': pf.deploy_data_pipeline,
+        'Notebook': pf.deploy_notebook,
+        'SemanticModel': pf.deploy_semantic_model,
+    }
+
+    # Dataflows have no deploy step yet, they stay in the graph only to order the items after them
+    undeployable = {
+        item_key(item) for item in items if item.item_type not in deploy_actions and item.item_type != 'Report'
+    }
+    for key in sorted(undeployable):
+        print(f"Warning: no deploy action for {key}, deploy it by hand.")
+
+    config_lock = ReadWriteLock()
+    deploy_kwargs = {key: value for key, value in common.items() if key != 'config_path'}
+
+    tasks = []
+    for item in items:
+        if item.item_type == 'Report':
+            continue
+        deploy = deploy_actions.get(item.item_type)
+        if deploy and item_key(item) not in changed:
+            print(f"{item_key(item)} is unchanged since the last deploy to {workspace_name}.")
+            deploy = None
+        tasks.append(Task(
+            name=item_key(item),
+            action=deploy and partial(
+                deploy_item, deploy, config_lock, workspace_name, display_name=item.name, **deploy_kwargs
+            ),
+            dependencies=graph[item_key(item)],
+            # deploy_item takes the config lock itself, only to merge the ID pf.deploy_* saved
+            config_access=None,
+        ))
+
+    notebooks = {item_key(item) for item in items if item.item_type == 'Notebook'}
+    semantic_models = {item_key(item) for item in items if item.item_type == 'SemanticModel'}
+
+    # Exports and parameter extraction rewrite config.json, so they run alone
+    tasks += [
+        Task(
+            name='export_all_notebooks',
+            action=partial(pf.export_all_notebooks, workspace_name, **common) if notebooks & changed else None,
+            dependencies=notebooks,
+            config_access='write',
+        ),
+        Task(
+            name='export_all_semantic_models',
+            action=(
+                partial(pf.export_all_semantic_models, workspace_name, excluded_starts=('Main',), **common)
+                if semantic_models & changed else None
+            ),
+            dependencies=semantic_models,
+            config_access='write',
+        ),
+        Task(
+            name='extract_semantic_models_parameters',
+            action=partial(
+                extract_semantic_models_parameters,
+                project_path=project_path,
+                workspace_alias=workspace_alias,
+                config_path=config_path,
+                branch=branch,
+            ) if semantic_models & changed else None,
+            dependencies={'export_all_semantic_models'},
+            config_access='write',
+        ),
+    ]
+
+    # Reports are rebound to the semantic model IDs exported above; a report is
+    # deployed again when it or its semantic model changed
+    redeployed = [
+        item for item in items
+        if item.item_type == 'Report' and ({item_key(item)} | graph[item_key(item)]) & changed
+    ]
+    missing = [function for function in REPORT_FUNCTIONS if not hasattr(pf, function)] if redeployed else []
+    if missing:
+        raise ValueError(f"The installed pyfabricops has no {', '.join(missing)}, needed to deploy reports.")
+
+    report_parts = load_reports([item_folder(project_path, item) for item in redeployed])
+    for item in items:
+        if item.item_type != 'Report':
+            continue
+        if item not in redeployed:
+            print(f"{item_key(item)} is unchanged since the last deploy to {workspace_name}.")
+        tasks.append(Task(
+            name=item_key(item),
+            action=partial(
+                deploy_report,
+                report_parts[item_folder(project_path, item)],
+                item.workspace_path.partition('/')[2],
+                semantic_model_ids,
+            ) if item in redeployed else None,
+            dependencies={'extract_semantic_models_parameters'} | graph[item_key(item)],
+            config_access='read',
+        ))
+
+    status = run_tasks(tasks, max_workers=max_workers, config_lock=config_lock)
+
+    # Record what is now deployed, after the exports which rewrote config.json
+    with ConfigSession(config_path) as session:
+        workspace = session.workspace(branch, workspace_alias)
+        for key, fingerprint in fingerprints.items():
+            if status.get(key) == 'succeeded' and key not in undeployable:
+                workspace.set(DEPLOYMENTS_SECTION, key, value=fingerprint)
+
+    failed = sorted(name for name, result in status.items() if result != 'succeeded')
+    if failed:
+        print(f"Deploy incomplete: {', '.join(failed)}.")
+        exit(1)
+
+
+if __name__ == '__main__':
+    tracing.enable()
+    parser = argparse.ArgumentParser(description='Deploy the project items to the branch workspace.')
+    parser.add_argument('--max-workers', type=int, default=4, help='Maximum number of items deployed at the same time')
+    parser.add_argument('--force', action='store_true', help='Deploy every item, even when its definition is unchanged')
+    parser.add_argument('--overlay', action='store_true', help='Render into a temporary overlay instead of deploying src as is')
+    args = parser.parse_args()
+
+    if args.overlay:
+        from scripts.render import render_overlay, write_back_overlay
 
+        with render_overlay(bootstrap.project_path, workspace_alias, config_path, branch) as overlay_path:
+            main(max_workers=args.max_workers, force=args.force, project_path=overlay_path)
+            # The exported items reach src as after a deploy without overlay, restore them next
+            write_back_overlay(overlay_path, bootstrap.project_path, workspace_alias)
+    else:
+        main(max_workers=args.max_workers, force=args.force)
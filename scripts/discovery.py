@@ -0,0 +1,314 @@
+"""
+Workspace-wide discovery and bulk processing of item parameters.
+
+Every item folder under src/<workspace> is discovered by its type suffix, the
+matching extract/replace routine of scripts.utils runs for all of them across a
+process pool, and the results are merged into config.json in a single write.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.config_session import ConfigSession
+from scripts.manifest import Manifest, hash_bytes, hash_variables
+from scripts.table_specs import embed_table_specs, read_table_specs
+from scripts.template import compile_notebook, compile_placeholders, render
+from scripts.tracing import traced
+from scripts.utils import (
+    _data_pipeline_placeholder_lookup,
+    _dataflow_gen2_placeholder_lookup,
+    _extract_data_pipeline_variables,
+    _extract_dataflow_gen2_variables,
+    _extract_parameters_notebook,
+    _replace_data_pipeline_placeholders_with_variables,
+    _replace_data_pipeline_variables_with_placeholders,
+    _replace_dataflow_gen2_parameters_with_placeholders,
+    _replace_dataflow_gen2_placeholders_with_parameters,
+    _replace_notebook_parameters_with_placeholders,
+    _notebook_placeholder_literals,
+    _replace_notebook_placeholders_with_parameters,
+    _report_substitution,
+)
+
+
+# A discovered item; path is the file holding its parameters (None when handled elsewhere)
+Item = namedtuple('Item', ['item_type', 'name', 'workspace_path', 'path'])
+
+# compile and lookup render a file from a compiled template, see scripts/template.py
+ItemHandler = namedtuple(
+    'ItemHandler',
+    ['section', 'file_name', 'encoding', 'extract', 'to_placeholders', 'to_variables', 'compile', 'lookup'],
+)
+
+# Item folder suffix to the routines handling its parameters
+ITEM_HANDLERS = {
+    'DataPipeline': ItemHandler(
+        section='data_pipelines',
+        file_name='pipeline-content.json',
+        encoding=None,
+        extract=_extract_data_pipeline_variables,
+        to_placeholders=lambda path, variables, name: _replace_data_pipeline_variables_with_placeholders(path, variables),
+        to_variables=lambda path, variables, name: _replace_data_pipeline_placeholders_with_variables(path, variables),
+        compile=compile_placeholders,
+        lookup=lambda variables, name: _data_pipeline_placeholder_lookup(variables),
+    ),
+    'Dataflow': ItemHandler(
+        section='dataflows',
+        file_name='mashup.pq',
+        encoding='utf-8',
+        extract=_extract_dataflow_gen2_variables,
+        to_placeholders=_replace_dataflow_gen2_parameters_with_placeholders,
+        to_variables=_replace_dataflow_gen2_placeholders_with_parameters,
+        compile=compile_placeholders,
+        lookup=_dataflow_gen2_placeholder_lookup,
+    ),
+    'Notebook': ItemHandler(
+        section='notebooks',
+        file_name='notebook-content.py',
+        encoding='utf-8',
+        extract=_extract_parameters_notebook,
+        to_placeholders=_replace_notebook_parameters_with_placeholders,
+        to_variables=_replace_notebook_placeholders_with_parameters,
+        compile=compile_notebook,
+        lookup=_notebook_placeholder_literals,
+    ),
+}
+
+# Item types discovered but whose parameters are handled by pyfabricops
+DELEGATED_ITEM_TYPES = ('SemanticModel',)
+
+# Discovered items per (project_path, workspace_alias, item_types), see clear_discovery_cache
+_discovered = {}
+
+REPLACE_MESSAGES = {
+    'to_placeholders': 'Variables replaced with placeholders',
+    'to_variables': 'Placeholders replaced with variables',
+}
+
+
+@traced
+def discover_items(project_path: str, workspace_alias: str, item_types: tuple = None) -> list:
+    """
+    Walk src/<workspace> and discover every item folder, e.g. CopyData.DataPipeline.
+
+    Args:
+        project_path (str): Path of the project, e.g. 'src'
+        workspace_alias (str): Workspace folder under the project
+        item_types (tuple): Item types to discover, defaults to all supported types
+
+    Returns:
+        list: Item tuples sorted by path
+    """
+    if item_types is None:
+        item_types = tuple(ITEM_HANDLERS) + DELEGATED_ITEM_TYPES
+
+    key = (os.path.abspath(project_path), workspace_alias, tuple(item_types))
+    if key in _discovered:
+        return list(_discovered[key])
+
+    items = []
+    for directory, subdirectories, _ in os.walk(os.path.join(project_path, workspace_alias)):
+        for subdirectory in list(subdirectories):
+            name, _, item_type = subdirectory.rpartition('.')
+            if not name or item_type not in item_types:
+                continue
+
+            # Item folders are never nested, so there is no need to walk into them
+            subdirectories.remove(subdirectory)
+
+            workspace_path = os.path.relpath(directory, project_path).replace(os.sep, '/')
+            handler = ITEM_HANDLERS.get(item_type)
+            path = os.path.join(directory, subdirectory, handler.file_name) if handler else None
+            if path is None or os.path.exists(path):
+                items.append(Item(item_type, name, workspace_path, path))
+
+    _discovered[key] = sorted(items, key=lambda item: (item.workspace_path, item.name, item.item_type))
+    return list(_discovered[key])
+
+
+def clear_discovery_cache():
+    """
+    Forget the discovered items, after a step that may add or remove item folders (e.g. an export).
+    """
+    _discovered.clear()
+
+
+def item_folder(project_path: str, item: Item) -> str:
+    """
+    Path of the folder of a discovered item, e.g. src/PF_002_Live/Engineering/CopyData.DataPipeline.
+    """
+    return os.path.join(project_path, item.workspace_path, f'{item.name}.{item.item_type}')
+
+
+def _manifest_key(item: Item) -> str:
+    """
+    Key of an item in the manifest, independent of the operating system.
+    """
+    return item.path.replace(os.sep, '/')
+
+
+def _process_item(action: str, item: Item, variables: list):
+    """
+    Run one extract/replace routine, in a worker process.
+    """
+    handler = ITEM_HANDLERS[item.item_type]
+    if action == 'extract':
+        return handler.extract(item.path)
+
+    if action == 'to_variables':
+        # Same output as handler.to_variables, from the cached template of the file
+        with open(item.path, 'r', encoding=handler.encoding) as file:
+            template = handler.compile(file.read())
+        result = render(template, handler.lookup(variables, item.name))
+        _report_substitution(item.path, result, 'placeholders')
+        return embed_table_specs(result.content) if item.item_type == 'Notebook' else result.content
+
+    return getattr(handler, action)(item.path, variables, item.name)
+
+
+def _run(action: str, items: list, variables: list, max_workers: int) -> list:
+    """
+    Run `action` for every item, across a process pool when there is more than one item.
+    """
+    if max_workers == 1 or len(items) <= 1:
+        return [_process_item(action, item, item_variables) for item, item_variables in zip(items, variables)]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_process_item, [action] * len(items), items, variables))
+
+
+@traced
+def export_all_variables(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+) -> list:
+    """
+    Extract the variables of every discovered item and save them to config in one write.
+
+    Returns:
+        list: The discovered items
+    """
+    items = discover_items(project_path, workspace_alias)
+    handled = [item for item in items if item.item_type in ITEM_HANDLERS]
+
+    results = _run('extract', handled, [None] * len(handled), max_workers)
+
+    with ConfigSession(config_path) as config:
+        workspace = config.workspace(branch, workspace_alias)
+        for item, variables in zip(handled, results):
+            if not variables:
+                print(f"No variables found in {item.name}.{item.item_type}.")
+                continue
+
+            workspace.set(ITEM_HANDLERS[item.item_type].section, item.name, 'variables', value=variables)
+            print(f"Variables from {item.name}.{item.item_type} extracted.")
+
+    return items
+
+
+@traced
+def _replace_all(
+    action: str,
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int,
+    manifest_path: str,
+) -> list:
+    items = discover_items(project_path, workspace_alias)
+    manifest = Manifest(manifest_path) if manifest_path else None
+
+    with ConfigSession(config_path) as config:
+        workspace = config.workspace(branch, workspace_alias)
+
+        handled = []
+        variables = []
+        hashes = []
+        for item in items:
+            if item.item_type not in ITEM_HANDLERS:
+                continue
+
+            item_variables = workspace.get(ITEM_HANDLERS[item.item_type].section, item.name, 'variables')
+            if not item_variables:
+                print(f"No variables found for {item.name}.{item.item_type} in {config_path}.")
+                continue
+
+            # Hashed as decoded text, like the rewritten content below, so line endings do not count
+            encoding = ITEM_HANDLERS[item.item_type].encoding
+            with open(item.path, 'r', encoding=encoding) as file:
+                content_hash = hash_bytes(file.read().encode(encoding or 'utf-8'))
+            variables_hash = hash_variables(item_variables)
+            if item.item_type == 'Notebook':
+                # The table specs embedded on the way to variables come from pipeline_parameters.json
+                variables_hash = hash_variables([item_variables, read_table_specs()])
+
+            # Neither the file nor its variables changed since this item was last rewritten this way
+            if manifest and manifest.is_current(_manifest_key(item), action, content_hash, variables_hash):
+                print(f"{item.path} is up to date.")
+                continue
+
+            handled.append(item)
+            variables.append(item_variables)
+            hashes.append((content_hash, variables_hash))
+
+    results = _run(action, handled, variables, max_workers)
+
+    for item, content, (content_hash, variables_hash) in zip(handled, results, hashes):
+        encoding = ITEM_HANDLERS[item.item_type].encoding
+        new_hash = hash_bytes(content.encode(encoding or 'utf-8'))
+
+        # Only write when the bytes actually differ, keeping mtimes and git status clean
+        if new_hash != content_hash:
+            with open(item.path, 'w', encoding=encoding) as file:
+                file.write(content)
+            print(f"{REPLACE_MESSAGES[action]} in {item.path}.")
+        else:
+            print(f"{item.path} is unchanged.")
+
+        if manifest:
+            manifest.record(_manifest_key(item), action, new_hash, variables_hash)
+
+    if manifest:
+        manifest.save()
+
+    return items
+
+
+def replace_all_placeholders_with_variables(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+    manifest_path: str = None,
+) -> list:
+    """
+    Replace the placeholders of every discovered item with the variables of the branch.
+    With a manifest_path, items already rewritten with the same variables are skipped.
+
+    Returns:
+        list: The discovered items
+    """
+    return _replace_all('to_variables', project_path, workspace_alias, config_path, branch, max_workers, manifest_path)
+
+
+def replace_all_variables_with_placeholders(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+    manifest_path: str = None,
+) -> list:
+    """
+    Replace the variables of every discovered item with placeholders.
+    With a manifest_path, items already rewritten with the same variables are skipped.
+
+    Returns:
+        list: The discovered items
+    """
+    return _replace_all('to_placeholders', project_path, workspace_alias, config_path, branch, max_workers, manifest_path)
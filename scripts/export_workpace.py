@@ -1,4 +1,5 @@
 # scripts/export_workspace.py
+from scripts import tracing
 from scripts.bootstrap import (
     branch,
     config_path,
@@ -11,41 +12,50 @@ from scripts.bootstrap import (
     workspace_suffix,
 )
 
-# Export the workspace to config
-pf.export_all_lakehouses(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
 
-pf.export_all_data_pipelines(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
+def main():
+    """
+    Export the workspace items to config.
+    """
+    # Export the workspace to config
+    pf.export_all_lakehouses(
+        workspace_name,
+        project_path=project_path,
+        workspace_path=workspace_path,
+        config_path=config_path,
+        branch=branch,
+        workspace_suffix=workspace_suffix,
+    )
 
+    pf.export_all_data_pipelines(
+        workspace_name,
+        project_path=project_path,
+        workspace_path=workspace_path,
+        config_path=config_path,
+        branch=branch,
+        workspace_suffix=workspace_suffix,
+    )
+
+    pf.export_all_semantic_models(
+        workspace_name,
+        project_path=project_path,
+        workspace_path=workspace_path,
+        config_path=config_path,
+        branch=branch,
+        workspace_suffix=workspace_suffix,
+        excluded_starts=('Main',)
+    )
+
+    pf.export_all_notebooks(
+        workspace_name,
+        project_path=project_path,
+        workspace_path=workspace_path,
+        config_path=config_path,
+        branch=branch,
+        workspace_suffix=workspace_suffix,
+    )
 
-pf.export_all_semantic_models(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-    excluded_starts=('Main',)
-)
 
-pf.export_all_notebooks(
-    workspace_name,
-    project_path=project_path,
-    workspace_path=workspace_path,
-    config_path=config_path,
-    branch=branch,
-    workspace_suffix=workspace_suffix,
-)
\ No newline at end of file
+if __name__ == '__main__':
+    tracing.enable()
+    main()
@@ -1,46 +1,40 @@
-# scripts/deploy_powerbi.py
+# scripts/extract_parameters.py
+from scripts import tracing
 from scripts.bootstrap import (
     branch,
     config_path,
-    pf,
-    project_path, 
-    root_path,
+    project_path,
     workspace_alias,
-    workspace_name,   
-    workspace_path,   
-    workspace_suffix,
 )
 
-from scripts.utils import (
-    export_data_pipeline_variables_to_config, 
-    export_notebook_variables,
-)
+from scripts.discovery import export_all_variables
+from scripts.tmdl import extract_semantic_models_parameters
 
-# Export data pipeline variables to config
-export_data_pipeline_variables_to_config(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    workspace_path=workspace_alias + '/Engineering',
-    data_pipeline_name='CopyData',
-    config_path=config_path,
-    branch=branch,
-) 
 
-# Export notebook variables
-export_notebook_variables(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    workspace_path=workspace_alias + '/Engineering',
-    notebook_name='TransformAndLoad',
-    config_path=config_path,
-    branch=branch,
-)
+def main(project_path: str = project_path):
+    """
+    Extract the variables of every item to config.
 
+    Args:
+        project_path (str): Project to extract from, e.g. a render overlay
+    """
+    # Export the variables of every data pipeline, dataflow and notebook to config
+    export_all_variables(
+        project_path=project_path,
+        workspace_alias=workspace_alias,
+        config_path=config_path,
+        branch=branch,
+    )
 
-# Export semantic models parameters
-pf.extract_semantic_models_parameters(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    config_path=config_path,
-    branch=branch,
-)
+    # Export semantic models parameters
+    extract_semantic_models_parameters(
+        project_path=project_path,
+        workspace_alias=workspace_alias,
+        config_path=config_path,
+        branch=branch,
+    )
+
+
+if __name__ == '__main__':
+    tracing.enable()
+    main()
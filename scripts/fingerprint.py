@@ -0,0 +1,60 @@
+"""
+Fingerprints of rendered item definitions.
+
+A fingerprint is the hash of every definition file of an item folder, after
+normalization, so that a redeploy can skip the items whose definition did not
+change since they were last deployed to the workspace of the branch. The last
+deployed fingerprints are kept in config.json under
+config[branch][workspace_alias]['deployments'].
+"""
+import hashlib
+import json
+import os
+
+
+# Bump when a change to the normalization changes the fingerprint of the same definition
+FINGERPRINT_VERSION = 1
+
+DEPLOYMENTS_SECTION = 'deployments'
+
+
+def _normalize(path: str) -> bytes:
+    """
+    Normalize a definition file so formatting-only differences give the same fingerprint.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if path.endswith(('.json', '.pbir', '.pbism', '.platform')):
+        try:
+            return json.dumps(json.loads(data), sort_keys=True, separators=(',', ':')).encode('utf-8')
+        except ValueError:
+            pass
+
+    # Line endings depend on the checkout, not on the definition
+    return data.replace(b'\r\n', b'\n')
+
+
+def fingerprint_item(folder: str) -> str:
+    """
+    Compute the fingerprint of an item folder.
+
+    Args:
+        folder (str): Path of the item folder, e.g. src/PF_002_Live/Engineering/CopyData.DataPipeline
+
+    Returns:
+        str: Hex digest over the relative paths and normalized content of every file
+    """
+    digest = hashlib.sha256(f'v{FINGERPRINT_VERSION}'.encode('utf-8'))
+
+    paths = []
+    for directory, _, files in os.walk(folder):
+        paths.extend(os.path.join(directory, file_name) for file_name in files)
+
+    for path in sorted(paths):
+        relative_path = os.path.relpath(path, folder).replace(os.sep, '/')
+        content = _normalize(path)
+        digest.update(f'\0{relative_path}\0{len(content)}\0'.encode('utf-8'))
+        digest.update(content)
+
+    return digest.hexdigest()
@@ -0,0 +1,83 @@
+"""
+Keep-alive HTTP sessions shared by every call to the requests module functions.
+
+pyfabricops sends each API call with requests.request / requests.post, which open
+a new session, and so a new TLS connection, every time. Once shared, every thread
+sends its calls through a session of its own, and all of these sessions mount the
+same connection pool, so connections are reused across threads for the life of the
+process. Requests sessions are not thread-safe, the pool is. The sessions keep no
+cookies, so nothing set by one host is sent to another, e.g. login.microsoftonline.com.
+"""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts import tracing
+
+
+# Connections kept per host, enough for the concurrent deploy tasks
+POOL_SIZE = 16
+
+_adapter = None
+_local = threading.local()
+
+# requests.request and requests.api.request before share_session replaced them
+_originals = None
+
+
+def _thread_session() -> requests.Session:
+    """
+    The session of the calling thread, mounting the shared connection pool.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        session.mount('https://', _adapter)
+        session.mount('http://', _adapter)
+        _local.session = session
+        _local.traced = False
+
+    # The session of the main thread is opened on import of pf, before the entry point enables tracing
+    if not _local.traced and tracing.enabled():
+        tracing.instrument_session(session)
+        _local.traced = True
+    return session
+
+
+def share_session() -> requests.Session:
+    """
+    Route requests.request and its shortcuts (get, post, ...) through the per-thread sessions,
+    until restore_requests is called.
+
+    Returns:
+        requests.Session: The session of the calling thread
+    """
+    global _adapter, _originals
+    if _originals is None:
+        _adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        _originals = (requests.request, requests.api.request)
+
+        def request(method, url, **kwargs):
+            return _thread_session().request(method=method, url=url, **kwargs)
+
+        # The shortcuts of requests.api look request up in their module at call time
+        requests.request = requests.api.request = request
+    return _thread_session()
+
+
+def restore_requests():
+    """
+    Put back the requests functions replaced by share_session and close the shared pool.
+    """
+    global _adapter, _originals, _local
+    if _originals is None:
+        return
+
+    requests.request, requests.api.request = _originals
+    _adapter.close()
+    _adapter = None
+    _originals = None
+    _local = threading.local()
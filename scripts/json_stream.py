@@ -0,0 +1,105 @@
+"""
+Incremental JSON event parser.
+
+Reads a JSON document in fixed-size chunks and yields one event per token with
+the raw text of that token, so callers can inspect values by their key path and
+write the document back byte for byte, except for the values they rewrite.
+Memory use is bounded by the chunk size, the longest token and the nesting depth.
+"""
+import json
+import re
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Strings use the unrolled-loop form so an unterminated string at the end of a chunk fails in linear time
+TOKEN_PATTERN = re.compile(r'''
+    (?P<whitespace>\s+)
+  | (?P<punctuation>[{}\[\]:,])
+  | (?P<string>"[^"\\]*(?:\\.[^"\\]*)*")
+  | (?P<literal>-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null)
+''', re.VERBOSE)
+
+# What may still follow a number at the end of the buffer: '12' then '.5', '1e' then '+3'...
+NUMBER_TAIL_PATTERN = re.compile(r'[0-9.eE+-]*\Z')
+
+
+def _iter_tokens(f, chunk_size: int):
+    """
+    Yield (kind, raw) for every token of the file, reading it chunk by chunk.
+    """
+    buffer = ''
+    position = 0
+    eof = False
+
+    while True:
+        match = TOKEN_PATTERN.match(buffer, position)
+
+        # A token touching the end of the buffer may continue in the next chunk; a number
+        # is also kept when only the start of its fraction or exponent is left after it
+        incomplete = match is None or (
+            match.lastgroup == 'whitespace' and match.end() == len(buffer)
+        ) or (
+            match.lastgroup == 'literal' and NUMBER_TAIL_PATTERN.match(buffer, match.end()) is not None
+        )
+        if incomplete and not eof:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        if match is None:
+            if position < len(buffer):
+                raise ValueError(f'Invalid JSON near: {buffer[position:position + 40]!r}')
+            return
+
+        position = match.end()
+        yield match.lastgroup, match.group()
+
+
+def iter_json_events(f, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Parse a JSON document incrementally.
+
+    Args:
+        f: Text file object opened for reading
+        chunk_size (int): Number of characters read at a time
+
+    Yields:
+        tuple: (event, path, raw) where event is one of 'start_map', 'end_map',
+            'start_array', 'end_array', 'key', 'scalar' or 'other' (whitespace,
+            colons and commas), path is the tuple of keys and indexes of the value
+            (None for 'other') and raw is the exact source text of the token
+    """
+    # Each frame is [container, key or index, expecting a key]
+    stack = []
+
+    for kind, raw in _iter_tokens(f, chunk_size):
+        if kind == 'whitespace' or raw == ':':
+            yield 'other', None, raw
+
+        elif raw == ',':
+            frame = stack[-1]
+            if frame[0] == '[':
+                frame[1] += 1
+            else:
+                frame[2] = True
+            yield 'other', None, raw
+
+        elif kind == 'punctuation' and raw in '{[':
+            yield ('start_map' if raw == '{' else 'start_array'), tuple(frame[1] for frame in stack), raw
+            stack.append([raw, None, True] if raw == '{' else [raw, 0, False])
+
+        elif kind == 'punctuation' and raw in '}]':
+            stack.pop()
+            yield ('end_map' if raw == '}' else 'end_array'), tuple(frame[1] for frame in stack), raw
+
+        elif kind == 'string' and stack and stack[-1][2]:
+            frame = stack[-1]
+            frame[1] = json.loads(raw) if '\\' in raw else raw[1:-1]
+            frame[2] = False
+            yield 'key', tuple(frame[1] for frame in stack[:-1]), raw
+
+        else:
+            yield 'scalar', tuple(frame[1] for frame in stack), raw
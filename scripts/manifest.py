@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+
+from scripts.config_session import atomic_write
+
+
+# Bump when a change to the extract/replace routines changes their output for the same input
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Hash file content.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_variables(variables) -> str:
+    """
+    Hash the variables slice of config.json used for an item, independently of key order.
+    """
+    return hash_bytes(json.dumps(variables, sort_keys=True).encode('utf-8'))
+
+
+class Manifest:
+    """
+    Record of the last placeholder rewrite of each item file.
+
+    For every item path and direction ('to_variables' or 'to_placeholders') the
+    manifest keeps the hash of the file as it was written and the hash of the
+    config variables used. When both still match, the file is already in the
+    target state and the rewrite is skipped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.items = {}
+        self.changed = False
+
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                manifest = json.load(file)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.items = manifest['items']
+
+    def is_current(self, item_path: str, action: str, content_hash: str, variables_hash: str) -> bool:
+        """
+        Check whether the item file is already the result of `action` with these variables.
+        """
+        entry = self.items.get(item_path, {}).get(action)
+        return entry == {'content': content_hash, 'variables': variables_hash}
+
+    def record(self, item_path: str, action: str, content_hash: str, variables_hash: str):
+        """
+        Record the state of the item file after `action`.
+        """
+        entry = {'content': content_hash, 'variables': variables_hash}
+        if self.items.get(item_path, {}).get(action) != entry:
+            self.items.setdefault(item_path, {})[action] = entry
+            self.changed = True
+
+    def save(self):
+        """
+        Write the manifest if any entry changed.
+        """
+        if not self.changed:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with atomic_write(self.path) as file:
+            json.dump({'version': MANIFEST_VERSION, 'items': dict(sorted(self.items.items()))}, file, indent=4)
+        self.changed = False
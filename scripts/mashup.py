@@ -0,0 +1,128 @@
+"""
+Tokenizer for Dataflow Gen2 mashup.pq (Power Query section documents).
+
+The document is tokenized once, left to right, with a pattern made of disjoint
+alternatives, so the cost stays linear whatever the number or size of queries.
+Each `shared` member is split at its top-level `;` and the destination ID fields
+(`workspaceId = "..."` etc.) found inside it are indexed with their exact offsets.
+"""
+import re
+from collections import namedtuple
+
+
+# Destination ID fields, mapped to the destination type they imply (None when they imply none)
+ID_KINDS = {
+    'workspaceId': None,
+    'lakehouseId': 'Lakehouse',
+    'warehouseId': 'Warehouse',
+    'semanticModelId': 'SemanticModel',
+}
+
+DESTINATION_SUFFIX = '_DataDestination'
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)
+  | (?P<string>"[^"]*(?:""[^"]*)*")
+  | (?P<quoted_identifier>\#"[^"]*(?:""[^"]*)*")
+  | (?P<identifier>\#?[A-Za-z_][\w.]*)
+  | (?P<open>[(\[{])
+  | (?P<close>[)\]}])
+  | (?P<semicolon>;)
+  | (?P<equals>=)
+  | (?P<other>[^\s"#/(\[{)\]};=A-Za-z_]+|[#/])
+''', re.VERBOSE)
+
+# A member of the section document, from `shared` to its closing `;`
+Member = namedtuple('Member', ['name', 'start', 'end', 'fields'])
+
+# An ID field of a member; start and end delimit the value inside the quotes
+Field = namedtuple('Field', ['kind', 'value', 'start', 'end'])
+
+
+def register_id_kind(name: str, destination_type: str = None):
+    """
+    Register a new destination ID field to be extracted and replaced.
+
+    Args:
+        name (str): Field name as written in mashup.pq, e.g. 'kqlDatabaseId'
+        destination_type (str): Destination type implied by the field, if any
+    """
+    ID_KINDS[name] = destination_type
+
+
+def _unquote(token: str) -> str:
+    """
+    Return the text of a M string or quoted identifier token.
+    """
+    return token[token.index('"') + 1:-1].replace('""', '"')
+
+
+def parse_members(content: str) -> list:
+    """
+    Split a mashup.pq document into its shared members in a single pass.
+
+    Args:
+        content (str): Content of the mashup.pq file
+
+    Returns:
+        list: Member tuples in document order, each with its ID fields
+    """
+    members = []
+
+    depth = 0
+    member = None
+    # Last two significant tokens, to recognise `<id kind> = "<value>"`
+    previous = (None, None)
+
+    for match in TOKEN_PATTERN.finditer(content):
+        kind = match.lastgroup
+        token = match.group()
+
+        if kind == 'comment':
+            continue
+
+        if member is None:
+            if kind == 'identifier' and token == 'shared' and depth == 0:
+                member = {'name': None, 'start': match.start(), 'fields': []}
+            elif kind == 'open':
+                depth += 1
+            elif kind == 'close':
+                depth = max(depth - 1, 0)
+            continue
+
+        if member['name'] is None and kind in ('identifier', 'quoted_identifier'):
+            member['name'] = token if kind == 'identifier' else _unquote(token)
+
+        elif kind == 'open':
+            depth += 1
+
+        elif kind == 'close':
+            depth = max(depth - 1, 0)
+
+        elif kind == 'semicolon' and depth == 0:
+            members.append(Member(member['name'], member['start'], match.end(), member['fields']))
+            member = None
+
+        elif kind == 'string' and previous[1] == '=' and previous[0] in ID_KINDS:
+            member['fields'].append(Field(previous[0], _unquote(token), match.start() + 1, match.end() - 1))
+
+        previous = (previous[1], token)
+
+    return members
+
+
+def index_destinations(members: list) -> dict:
+    """
+    Index the data destination members by the name of the query they belong to.
+
+    Args:
+        members (list): Members returned by parse_members
+
+    Returns:
+        dict: Query name to its destination Member
+    """
+    return {
+        member.name[:-len(DESTINATION_SUFFIX)]: member
+        for member in members
+        if member.name and member.name.endswith(DESTINATION_SUFFIX)
+    }
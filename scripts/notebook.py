@@ -0,0 +1,135 @@
+"""
+Parser for the PARAMETERS CELL of Fabric notebook-content.py files.
+
+The cell is parsed once with Python's ast module into typed assignments, each
+carrying the exact character offsets of its literal in the whole file, so
+values can be replaced by splicing instead of searching the file for text.
+"""
+import ast
+import re
+from collections import namedtuple
+
+
+# Cell markers of the Fabric notebook source format
+CELL_MARKER_PATTERN = re.compile(r'^# (PARAMETERS CELL|CELL|MARKDOWN|METADATA) \*+[ \t]*$', re.MULTILINE)
+
+# A literal assigned in the parameters cell; start and end delimit the literal in the file
+Assignment = namedtuple('Assignment', ['name', 'value', 'parameter_type', 'text', 'start', 'end'])
+
+
+def find_parameters_cell(content: str) -> tuple:
+    """
+    Locate the body of the PARAMETERS CELL.
+
+    Args:
+        content (str): Content of the notebook-content.py file
+
+    Returns:
+        tuple: (start, end) character offsets of the cell body, or None when there is no parameters cell
+    """
+    markers = list(CELL_MARKER_PATTERN.finditer(content))
+    for index, marker in enumerate(markers):
+        if marker.group(1) == 'PARAMETERS CELL':
+            end = markers[index + 1].start() if index + 1 < len(markers) else len(content)
+            return marker.end(), end
+    return None
+
+
+def _literal(node: ast.AST):
+    """
+    Return (value, parameter_type) for a supported literal node, or None.
+    """
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool):
+            return node.value, 'boolean'
+        if isinstance(node.value, (int, float)):
+            return node.value, 'numeric'
+        if isinstance(node.value, str):
+            return node.value, 'string'
+
+    # Negative numbers
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        literal = _literal(node.operand)
+        if literal and literal[1] == 'numeric':
+            return -literal[0], 'numeric'
+
+    # f-strings without any replacement field are plain strings
+    if isinstance(node, ast.JoinedStr) and all(isinstance(part, ast.Constant) for part in node.values):
+        return ''.join(part.value for part in node.values), 'string'
+
+    return None
+
+
+def _parse_statements(source: str, lines: list) -> list:
+    """
+    Parse the cell into its top-level statements.
+
+    A cell that is not valid Python as a whole, e.g. with %magic or !command lines
+    or an unfinished edit, is parsed line by line, keeping the lines that parse.
+    """
+    try:
+        return ast.parse(source).body
+    except SyntaxError as error:
+        print(f"Parameters cell is not valid Python ({error.msg}, line {error.lineno}), parsing it line by line.")
+
+    statements = []
+    for index, line in enumerate(lines):
+        try:
+            tree = ast.parse(line)
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            ast.increment_lineno(node, index)
+            statements.append(node)
+    return statements
+
+
+def parse_parameters(content: str) -> list:
+    """
+    Parse the PARAMETERS CELL into its top-level literal assignments.
+
+    Assignments whose value is computed (f-strings with replacement fields,
+    expressions, calls) are not parameters and are left out.
+
+    Args:
+        content (str): Content of the notebook-content.py file
+
+    Returns:
+        list: Assignment tuples in source order
+    """
+    cell = find_parameters_cell(content)
+    if cell is None:
+        return []
+
+    cell_start, cell_end = cell
+    source = content[cell_start:cell_end]
+    lines = source.splitlines(keepends=True)
+    nodes = _parse_statements(source, lines)
+
+    # ast columns are UTF-8 byte offsets, so they are converted to character offsets per line
+    line_starts = [cell_start]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line))
+
+    def _offset(lineno: int, col_offset: int) -> int:
+        line = lines[lineno - 1]
+        return line_starts[lineno - 1] + len(line.encode('utf-8')[:col_offset].decode('utf-8'))
+
+    assignments = []
+    for node in nodes:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)):
+            continue
+
+        literal = _literal(node.value)
+        if literal is None:
+            continue
+
+        start = _offset(node.value.lineno, node.value.col_offset)
+        end = _offset(node.value.end_lineno, node.value.end_col_offset)
+        value, parameter_type = literal
+
+        assignments.append(
+            Assignment(node.targets[0].id, value, parameter_type, content[start:end], start, end)
+        )
+
+    return assignments
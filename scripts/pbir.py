@@ -0,0 +1,231 @@
+"""
+Bulk loader and packager of PBIR reports.
+
+A report folder holds many small files (definition/report.json, pages/*/page.json,
+pages/*/visuals/*/visual.json, definition.pbir, ...). The files of every report
+are read at once, in batches on a thread pool, and kept in memory as base64
+parts with their hash; parsed JSON parts are cached by that hash. Deploying a
+report to an environment only swaps its definition.pbir part for one bound to
+the semantic model of that environment: nothing is rewritten on disk and the
+other parts are uploaded as loaded.
+
+Examples:
+    ```python
+    parts = load_reports([report_folder])[report_folder]
+    definition = parse_part(find_part(parts, DEFINITION_FILE))
+    item_definition = package_report(parts, bind_definition(definition, workspace_name, 'CustomerAnalysis', semantic_model_id))
+    ```
+"""
+import base64
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.tracing import traced
+
+
+DEFINITION_FILE = 'definition.pbir'
+PLATFORM_FILE = '.platform'
+
+# Local Power BI Desktop state, never part of a definition
+EXCLUDED_PATTERNS = ('*.pbi/localSettings.json', '*.pbi/cache.abf')
+
+DEFAULT_MAX_WORKERS = 8
+
+# Files read per thread pool task; report files are small, so one task per file costs more than the read
+BATCH_SIZE = 128
+
+CATALOG_PATTERN = re.compile(r'initial catalog=([^;]+)', re.IGNORECASE)
+
+# byConnection properties of a report bound to a semantic model of the service, as Power BI Desktop writes them
+BY_CONNECTION_DEFAULTS = {
+    'connectionString': None,
+    'pbiServiceModelId': None,
+    'pbiModelVirtualServerName': 'sobe_wowvirtualserver',
+    'pbiModelDatabaseName': None,
+    'name': 'EntityDataSource',
+    'connectionType': 'pbiServiceXmlaStyleLive',
+}
+
+# A file of a report; path is relative to the report folder with '/' separators, payload is base64
+ReportPart = namedtuple('ReportPart', ['path', 'payload', 'digest'])
+
+# Part digest to its parsed JSON
+_parsed_parts = {}
+_lock = threading.Lock()
+
+
+def _load_batch(files: list) -> list:
+    parts = []
+    for relative_path, path in files:
+        with open(path, 'rb') as file:
+            data = file.read()
+        parts.append(ReportPart(relative_path, base64.b64encode(data).decode('ascii'), hashlib.sha256(data).hexdigest()))
+    return parts
+
+
+def _iter_files(folder: str):
+    """
+    Yield (relative path, path) for the files of a report, excluded files left out.
+    """
+    prefix_length = len(os.path.join(folder, ''))
+    for directory, _, files in os.walk(folder):
+        relative_directory = directory[prefix_length:].replace(os.sep, '/')
+        for file_name in files:
+            relative_path = f'{relative_directory}/{file_name}' if relative_directory else file_name
+            if not any(fnmatch.fnmatch(relative_path, pattern) for pattern in EXCLUDED_PATTERNS):
+                yield relative_path, os.path.join(directory, file_name)
+
+
+@traced
+def load_reports(folders: list, max_workers: int = DEFAULT_MAX_WORKERS) -> dict:
+    """
+    Load the files of every report folder, all of them across one thread pool.
+
+    Args:
+        folders (list): Paths of .Report folders
+        max_workers (int): Maximum number of batches of files read at the same time
+
+    Returns:
+        dict: Folder to its ReportPart tuples, sorted by path
+    """
+    files = {folder: list(_iter_files(folder)) for folder in folders}
+    batches = [
+        (folder, folder_files[start:start + BATCH_SIZE])
+        for folder, folder_files in files.items()
+        for start in range(0, len(folder_files), BATCH_SIZE)
+    ]
+
+    loaded = {folder: [] for folder in folders}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for (folder, _), parts in zip(batches, executor.map(lambda batch: _load_batch(batch[1]), batches)):
+            loaded[folder].extend(parts)
+
+    for folder_parts in loaded.values():
+        folder_parts.sort(key=lambda part: part.path)
+    return loaded
+
+
+def parse_part(part: ReportPart) -> dict:
+    """
+    Parse a JSON part, once per content.
+    """
+    with _lock:
+        if part.digest in _parsed_parts:
+            return _parsed_parts[part.digest]
+
+    parsed = json.loads(base64.b64decode(part.payload))
+    with _lock:
+        _parsed_parts[part.digest] = parsed
+    return parsed
+
+
+def find_part(parts: list, path: str) -> ReportPart:
+    """
+    The part at `path`, relative to the report folder, or None.
+    """
+    return next((part for part in parts if part.path == path), None)
+
+
+def display_name(parts: list) -> str:
+    """
+    Display name of a report, from its .platform part.
+    """
+    platform = find_part(parts, PLATFORM_FILE)
+    return parse_part(platform).get('metadata', {}).get('displayName') if platform else None
+
+
+def dataset_name(definition: dict, semantic_model_ids: dict = None) -> str:
+    """
+    Name of the semantic model a definition.pbir is bound to.
+
+    Args:
+        definition (dict): Parsed definition.pbir
+        semantic_model_ids (dict): Semantic model ID to name, to resolve byConnection references
+
+    Returns:
+        str: Name of the semantic model, or None when it cannot be resolved
+    """
+    reference = definition.get('datasetReference', {})
+
+    by_path = reference.get('byPath')
+    if by_path and by_path.get('path'):
+        name, _, _ = os.path.basename(os.path.normpath(by_path['path'])).rpartition('.')
+        return name
+
+    by_connection = reference.get('byConnection') or {}
+    model_id = by_connection.get('pbiModelDatabaseName')
+    if model_id in (semantic_model_ids or {}):
+        return semantic_model_ids[model_id]
+
+    catalog = CATALOG_PATTERN.search(by_connection.get('connectionString') or '')
+    return catalog.group(1).strip().strip('"') if catalog else None
+
+
+def _connection_string(connection_string: str, options: dict) -> str:
+    """
+    Set `options` in a connection string, keeping its other options (e.g. access mode=readonly) in place.
+    """
+    remaining = {key.lower(): (key, value) for key, value in options.items()}
+    pairs = []
+    for pair in (connection_string or '').split(';'):
+        if '=' not in pair:
+            continue
+        key, value = pair.split('=', 1)
+        if key.strip().lower() in remaining:
+            value = remaining.pop(key.strip().lower())[1]
+        pairs.append(f'{key}={value}')
+    pairs += [f'{key}={value}' for key, value in remaining.values()]
+    return ';'.join(pairs)
+
+
+def bind_definition(definition: dict, workspace_name: str, semantic_model_name: str, semantic_model_id: str) -> bytes:
+    """
+    Content of a definition.pbir bound by connection to a semantic model of a workspace.
+
+    The $schema, version and other properties of the report's own definition.pbir
+    are kept, only its datasetReference is replaced. A byPath reference becomes a
+    full byConnection one; the properties of an existing byConnection reference and
+    the other options of its connection string are kept, with the ID of the model
+    in pbiModelDatabaseName.
+
+    Args:
+        definition (dict): Parsed definition.pbir of the report
+        workspace_name (str): Workspace holding the semantic model
+        semantic_model_name (str): Name of the semantic model
+        semantic_model_id (str): ID of the semantic model in that workspace
+    """
+    by_connection = {**BY_CONNECTION_DEFAULTS, **(definition.get('datasetReference', {}).get('byConnection') or {})}
+    by_connection['connectionString'] = _connection_string(by_connection['connectionString'], {
+        'Data Source': f'powerbi://api.powerbi.com/v1.0/myorg/{workspace_name}',
+        'initial catalog': semantic_model_name,
+        'integrated security': 'ClaimsToken',
+        'semanticmodelid': semantic_model_id,
+    })
+    by_connection['pbiModelDatabaseName'] = semantic_model_id
+
+    bound = dict(definition)
+    bound['datasetReference'] = {'byConnection': by_connection}
+    return json.dumps(bound, indent=2).encode('utf-8')
+
+
+def package_report(parts: list, definition: bytes) -> dict:
+    """
+    Item definition of a report for the Fabric API, with `definition` as its definition.pbir.
+
+    Returns:
+        dict: {'parts': [{'path', 'payload', 'payloadType'}, ...]}
+    """
+    payloads = {part.path: part.payload for part in parts}
+    payloads[DEFINITION_FILE] = base64.b64encode(definition).decode('ascii')
+    return {
+        'parts': [
+            {'path': path, 'payload': payload, 'payloadType': 'InlineBase64'}
+            for path, payload in payloads.items()
+        ],
+    }
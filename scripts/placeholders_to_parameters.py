@@ -1,47 +1,39 @@
-# scripts/deploy_powerbi.py
+# scripts/placeholders_to_parameters.py
+from scripts import tracing
 from scripts.bootstrap import (
     branch,
     config_path,
-    pf,
-    project_path, 
-    root_path,
+    manifest_path,
+    project_path,
     workspace_alias,
-    workspace_name,   
-    workspace_path,   
-    workspace_suffix,
 )
 
-from scripts.utils import (
-    replace_data_pipeline_placeholders_with_variables,
-    replace_notebook_placeholders_with_variables,
-)
+from scripts.discovery import replace_all_placeholders_with_variables
+from scripts.tmdl import replace_semantic_models_placeholders_with_parameters
 
-# Replace data pipeline variables to config
-replace_data_pipeline_placeholders_with_variables(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    workspace_path=workspace_alias + '/Engineering',
-    data_pipeline_name='CopyData',
-    config_path=config_path,
-    branch=branch,
-) 
 
+def main():
+    """
+    Render the items of the branch: replace placeholders with the variables from config.
+    """
+    # Replace the placeholders of every data pipeline, dataflow and notebook
+    replace_all_placeholders_with_variables(
+        project_path=project_path,
+        workspace_alias=workspace_alias,
+        config_path=config_path,
+        branch=branch,
+        manifest_path=manifest_path,
+    )
 
-# Replace notebook variables
-replace_notebook_placeholders_with_variables(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    workspace_path=workspace_alias + '/Engineering',
-    notebook_name='TransformAndLoad',
-    config_path=config_path,
-    branch=branch,
-)
+    # Replace the placeholders of every semantic model
+    replace_semantic_models_placeholders_with_parameters(
+        project_path=project_path,
+        workspace_alias=workspace_alias,
+        config_path=config_path,
+        branch=branch,
+    )
 
 
-# Replace semantic models with placeholders
-pf.replace_semantic_models_placeholders_with_parameters(
-    project_path=project_path,
-    workspace_alias=workspace_alias,
-    config_path=config_path,
-    branch=branch,
-)
+if __name__ == '__main__':
+    tracing.enable()
+    main()
@@ -1,3 +1,4 @@
+from scripts import tracing
 from scripts.bootstrap import (
     branch,
     config_path,
@@ -10,6 +11,8 @@ from scripts.bootstrap import (
     workspace_suffix,
 )
 
+tracing.enable()
+
 capacity_id = '7732a1eb-3893-4642-a85c-93fc3f35d076'
 
 workspace =pf.create_workspace(
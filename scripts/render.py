@@ -0,0 +1,309 @@
+"""
+Non-mutating render of the items of a branch.
+
+The workspace folder is copied to a temporary overlay and the placeholders are
+replaced with the variables of the branch in the overlay only, so the source
+tree is read once and never holds real IDs, even when a run dies half way.
+Deploys then read the overlay through project_path. The files written into the
+overlay after the render, e.g. definitions exported back from the workspace, are
+copied to the source tree by write_back_overlay, to be restored to placeholders
+like after a deploy from src.
+
+render_environments renders every branch of branches.json at once: each item
+file is read and compiled once (see scripts/template.py), then filled with the
+variables of each branch, one thread per environment.
+
+Examples:
+    ```python
+    with render_overlay('src', 'PF_002_Live', 'src/config.json', 'dev') as overlay_path:
+        deploy_project.main(project_path=overlay_path)
+    ```
+
+    ```
+    python -m scripts.render --output rendered   # rendered/<branch>/PF_002_Live/...
+    ```
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from scripts import tracing
+from scripts.config_session import ConfigSession
+from scripts.discovery import ITEM_HANDLERS, _run, discover_items
+from scripts.manifest import hash_bytes
+from scripts.table_specs import embed_table_specs
+from scripts.template import render
+from scripts.tmdl import replace_semantic_models_placeholders_with_parameters
+from scripts.tracing import traced
+from scripts.utils import _report_substitution
+
+DEFAULT_OUTPUT_PATH = 'rendered'
+
+# Overlay path to the hash of each of its files once rendered, see write_back_overlay
+_rendered = {}
+
+
+@traced
+def render_items(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    overlay_path: str,
+    max_workers: int = None,
+) -> list:
+    """
+    Write the rendered data pipelines, dataflows and notebooks of the project to the overlay.
+
+    Args:
+        project_path (str): Path of the source project, e.g. 'src'
+        workspace_alias (str): Workspace folder under the project
+        config_path (str): Path of config.json
+        branch (str): Branch whose variables are rendered
+        overlay_path (str): Project path of the overlay, holding a copy of the workspace folder
+
+    Returns:
+        list: The rendered items
+    """
+    items = discover_items(project_path, workspace_alias)
+
+    with ConfigSession(config_path) as config:
+        workspace = config.workspace(branch, workspace_alias)
+
+        handled = []
+        variables = []
+        for item in items:
+            if item.item_type not in ITEM_HANDLERS:
+                continue
+
+            item_variables = workspace.get(ITEM_HANDLERS[item.item_type].section, item.name, 'variables')
+            if not item_variables:
+                print(f"No variables found for {item.name}.{item.item_type} in {config_path}.")
+                continue
+
+            handled.append(item)
+            variables.append(item_variables)
+
+    # The source files are read by the routines, only the overlay is written
+    results = _run('to_variables', handled, variables, max_workers)
+
+    for item, content in zip(handled, results):
+        target = os.path.join(overlay_path, os.path.relpath(item.path, project_path))
+        with open(target, 'w', encoding=ITEM_HANDLERS[item.item_type].encoding) as file:
+            file.write(content)
+        print(f"Rendered {item.name}.{item.item_type}.")
+
+    return handled
+
+
+@contextmanager
+def render_overlay(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+):
+    """
+    Render the workspace of a branch into a temporary overlay, removed on exit.
+
+    Yields:
+        str: Project path of the overlay, to be used in place of project_path
+    """
+    overlay_path = tempfile.mkdtemp(prefix='pf_render_')
+    try:
+        _copy_workspace(project_path, workspace_alias, overlay_path)
+
+        render_items(project_path, workspace_alias, config_path, branch, overlay_path, max_workers=max_workers)
+        replace_semantic_models_placeholders_with_parameters(
+            overlay_path, workspace_alias, config_path, branch, max_workers=max_workers
+        )
+        _rendered[overlay_path] = _hash_files(overlay_path, workspace_alias)
+
+        yield overlay_path
+    finally:
+        _rendered.pop(overlay_path, None)
+        shutil.rmtree(overlay_path, ignore_errors=True)
+
+
+def _hash_files(project_path: str, workspace_alias: str) -> dict:
+    hashes = {}
+    for directory, _, files in os.walk(os.path.join(project_path, workspace_alias)):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            with open(path, 'rb') as file:
+                hashes[os.path.relpath(path, project_path)] = hash_bytes(file.read())
+    return hashes
+
+
+@traced
+def write_back_overlay(overlay_path: str, project_path: str, workspace_alias: str) -> list:
+    """
+    Copy the files added or changed in an overlay since it was rendered to the source project.
+
+    They hold the variables of the branch, as src does after a deploy without overlay,
+    so the restore step (scripts/parameters_to_placeholders.py) must run next.
+
+    Returns:
+        list: Paths of the copied files, relative to the project
+    """
+    rendered = _rendered[overlay_path]
+    copied = []
+    for relative_path, content_hash in sorted(_hash_files(overlay_path, workspace_alias).items()):
+        if rendered.get(relative_path) == content_hash:
+            continue
+        target = os.path.join(project_path, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(overlay_path, relative_path), target)
+        copied.append(relative_path)
+
+    print(f"{len(copied)} files written back from the overlay to {project_path}.")
+    return copied
+
+
+def _copy_workspace(project_path: str, workspace_alias: str, target_path: str):
+    shutil.copytree(
+        os.path.join(project_path, workspace_alias),
+        os.path.join(target_path, workspace_alias),
+        ignore=shutil.ignore_patterns('__pycache__'),
+    )
+
+
+@traced
+def compile_items(project_path: str, workspace_alias: str) -> list:
+    """
+    Read and compile the placeholders of every data pipeline, dataflow and notebook once.
+
+    Returns:
+        list: (item, template) pairs
+    """
+    compiled = []
+    for item in discover_items(project_path, workspace_alias):
+        handler = ITEM_HANDLERS.get(item.item_type)
+        if handler is None:
+            continue
+        with open(item.path, 'r', encoding=handler.encoding) as file:
+            compiled.append((item, handler.compile(file.read())))
+    return compiled
+
+
+@traced
+def _render_environment(compiled: list, workspace, project_path: str, config_path: str, output_path: str) -> dict:
+    """
+    Render the compiled items with the variables of one branch, and write them
+    to a copy of the workspace under output_path when it is given.
+    """
+    rendered = {}
+    encodings = {}
+    for item, template in compiled:
+        handler = ITEM_HANDLERS[item.item_type]
+        variables = workspace.get(handler.section, item.name, 'variables')
+        if not variables:
+            print(f"No variables found for {item.name}.{item.item_type} in {workspace.branch}.")
+            continue
+
+        result = render(template, handler.lookup(variables, item.name))
+        _report_substitution(f'{item.path} ({workspace.branch})', result, 'placeholders')
+        relative_path = os.path.relpath(item.path, project_path)
+        rendered[relative_path] = embed_table_specs(result.content) if item.item_type == 'Notebook' else result.content
+        encodings[relative_path] = handler.encoding
+
+    if output_path is None:
+        return rendered
+
+    shutil.rmtree(output_path, ignore_errors=True)
+    _copy_workspace(project_path, workspace.workspace_alias, output_path)
+    for relative_path, content in rendered.items():
+        with open(os.path.join(output_path, relative_path), 'w', encoding=encodings[relative_path]) as file:
+            file.write(content)
+    # Environments already render in parallel, so the semantic models of each are done in turn
+    replace_semantic_models_placeholders_with_parameters(
+        output_path, workspace.workspace_alias, config_path, workspace.branch, max_workers=1
+    )
+
+    print(f"Rendered {len(rendered)} items for {workspace.branch} in {output_path}.")
+    return rendered
+
+
+@traced
+def render_environments(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branches_path: str,
+    output_path: str = None,
+    branches: list = None,
+    max_workers: int = None,
+) -> dict:
+    """
+    Render the items of every environment in one pass.
+
+    Args:
+        project_path (str): Path of the source project, e.g. 'src'
+        workspace_alias (str): Workspace folder under the project
+        config_path (str): Path of config.json
+        branches_path (str): Path of branches.json, listing the environments
+        output_path (str): Directory receiving a rendered copy of the workspace per branch,
+            e.g. rendered/dev/PF_002_Live; nothing is written when None
+        branches (list): Branches to render, defaults to every branch of branches.json
+        max_workers (int): Maximum number of environments rendered at the same time
+
+    Returns:
+        dict: Branch to a dict of rendered file path, relative to the project, to its content
+    """
+    if branches is None:
+        with open(branches_path, 'r') as file:
+            branches = list(json.load(file))
+
+    with ConfigSession(config_path) as config:
+        environments = []
+        for branch in branches:
+            if workspace_alias not in config.config.get(branch, {}):
+                print(f"No {workspace_alias} configuration for {branch} in {config_path}, skipped.")
+                continue
+            environments.append(branch)
+
+        compiled = compile_items(project_path, workspace_alias)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                branch: executor.submit(
+                    _render_environment,
+                    compiled,
+                    config.workspace(branch, workspace_alias),
+                    project_path,
+                    config_path,
+                    os.path.join(output_path, branch) if output_path else None,
+                )
+                for branch in environments
+            }
+            return {branch: future.result() for branch, future in futures.items()}
+
+
+def main():
+    from scripts.bootstrap import branches_path, config_path, project_path, workspace_alias
+
+    parser = argparse.ArgumentParser(description='Render the items of every environment in one pass.')
+    parser.add_argument('--branches', nargs='+', help='Branches to render (default: every branch of branches.json)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='Directory receiving a rendered copy per branch')
+    parser.add_argument('--max-workers', type=int, help='Maximum number of environments rendered at the same time')
+    args = parser.parse_args()
+
+    render_environments(
+        project_path,
+        workspace_alias,
+        config_path,
+        branches_path,
+        output_path=args.output,
+        branches=args.branches,
+        max_workers=args.max_workers,
+    )
+
+
+if __name__ == '__main__':
+    tracing.enable()
+    main()
@@ -0,0 +1,132 @@
+# scripts/run.py
+"""
+Run several stages of the deploy flow in a single process.
+
+Each stage is the main() of its script. Running them in one process means
+pyfabricops is imported and authenticates once, API calls share one keep-alive
+connection pool (see scripts/http_session.py), config.json is only parsed again
+after something wrote it, and item folders are only discovered again after a
+stage that may add some.
+
+With --overlay the render stage writes into a temporary overlay instead of src
+(see scripts/render.py) and deploy and extract read the overlay. Restore then
+copies the files exported into the overlay back to src before replacing their
+variables with placeholders; without restore, the exports are discarded with
+the overlay.
+
+Examples:
+    ```
+    python -m scripts.run                           # render deploy extract restore
+    python -m scripts.run render deploy --force
+    python -m scripts.run extract restore
+    python -m scripts.run render deploy extract restore --overlay
+    ```
+"""
+import argparse
+import importlib
+import time
+from contextlib import ExitStack
+
+from scripts import tracing
+from scripts.discovery import clear_discovery_cache
+from scripts.http_session import restore_requests
+
+
+# Stage name to the script running it
+STAGES = {
+    'extract': 'scripts.extract_parameters',
+    'render': 'scripts.placeholders_to_parameters',
+    'deploy': 'scripts.deploy_project',
+    'export': 'scripts.export_workpace',
+    'restore': 'scripts.parameters_to_placeholders',
+}
+
+# The order of the CI workflow
+DEFAULT_STAGES = ('render', 'deploy', 'extract', 'restore')
+
+# Stages exporting from the workspace, which may write new item folders
+TREE_CHANGING_STAGES = ('deploy', 'export')
+
+
+def _run_stage(stage: str, max_workers: int, force: bool, overlay: bool, overlays: ExitStack, state: dict):
+    if overlay and stage == 'render':
+        from scripts.bootstrap import branch, config_path, project_path, workspace_alias
+        from scripts.render import render_overlay
+
+        state['project_path'] = overlays.enter_context(
+            render_overlay(project_path, workspace_alias, config_path, branch)
+        )
+        return
+
+    if overlay and stage == 'restore' and 'project_path' in state:
+        from scripts.bootstrap import project_path, workspace_alias
+        from scripts.render import write_back_overlay
+
+        write_back_overlay(state['project_path'], project_path, workspace_alias)
+        clear_discovery_cache()
+
+    # Scripts are imported when their stage runs, so unused stages cost nothing
+    script = importlib.import_module(STAGES[stage])
+    kwargs = {'project_path': state['project_path']} if 'project_path' in state and stage in ('deploy', 'extract') else {}
+
+    if stage == 'deploy':
+        script.main(max_workers=max_workers, force=force, **kwargs)
+    else:
+        script.main(**kwargs)
+
+
+def run_stages(stages: list, max_workers: int = 4, force: bool = False, overlay: bool = False) -> dict:
+    """
+    Run stages in order, stopping at the first one that fails.
+
+    Args:
+        stages (list): Stage names, keys of STAGES
+        max_workers (int): Maximum number of items deployed at the same time
+        force (bool): Deploy every item, even when its definition is unchanged
+        overlay (bool): Render into a temporary overlay, removed when the run ends
+
+    Returns:
+        dict: Stage name to its duration in seconds
+    """
+    durations = {}
+    state = {}
+    with ExitStack() as overlays:
+        # The stages share keep-alive sessions through the requests functions, put back once the run ends
+        overlays.callback(restore_requests)
+        for stage in stages:
+            print(f"=== {stage} ===")
+            start = time.perf_counter()
+            _run_stage(stage, max_workers, force, overlay, overlays, state)
+            durations[stage] = time.perf_counter() - start
+
+            if stage in TREE_CHANGING_STAGES:
+                clear_discovery_cache()
+
+    print('\n'.join(f"{stage}: {duration:.2f} s" for stage, duration in durations.items()))
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run stages of the deploy flow in a single process.')
+    parser.add_argument(
+        'stages',
+        nargs='*',
+        metavar='stage',
+        help=f"Stages to run, in order: {', '.join(STAGES)} (default: {' '.join(DEFAULT_STAGES)})",
+    )
+    parser.add_argument('--max-workers', type=int, default=4, help='Maximum number of items deployed at the same time')
+    parser.add_argument('--force', action='store_true', help='Deploy every item, even when its definition is unchanged')
+    parser.add_argument('--overlay', action='store_true', help='Render into a temporary overlay, leaving src untouched')
+    args = parser.parse_args()
+
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    run_stages(args.stages or list(DEFAULT_STAGES), max_workers=args.max_workers, force=args.force, overlay=args.overlay)
+
+
+if __name__ == '__main__':
+    # PF_TRACE=<directory> records a trace of the whole run, see scripts/tracing.py
+    tracing.enable()
+    main()
@@ -0,0 +1,258 @@
+"""
+Dependency-aware concurrent deploy scheduler.
+
+The item dependency graph is built from the local tree: lakehouses come before
+the pipelines, dataflows and notebooks that load them, semantic models before the
+reports bound to them in definition.pbir, and any item whose definition mentions
+the .platform logical ID of another item comes after it. Deploy tasks then run
+on a thread pool as soon as their dependencies are done, so the wall-clock time
+is set by the critical path instead of the sum of every step.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from scripts.discovery import discover_items, item_folder
+from scripts.pbir import dataset_name
+from scripts.tracing import span, traced
+
+
+# Item types taking part in a deploy, in the order they are deployed when sequential
+DEPLOY_ITEM_TYPES = ('Lakehouse', 'DataPipeline', 'Dataflow', 'Notebook', 'SemanticModel', 'Report')
+
+# Item types loading data into the workspace lakehouses
+LAKEHOUSE_CONSUMER_TYPES = ('DataPipeline', 'Dataflow', 'Notebook')
+
+# Logical ID of items never synced to a workspace
+EMPTY_LOGICAL_ID = '00000000-0000-0000-0000-000000000000'
+
+LOGICAL_ID_PATTERN = re.compile(r'[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}')
+
+# Definition files scanned for references, binary resources are left out
+REFERENCE_FILE_EXTENSIONS = ('.json', '.py', '.pq', '.tmdl', '.pbir', '.pbism', '.ipynb', '.sql')
+
+# A unit of work; config_access is 'read' or 'write', writers run alone, or None for
+# tasks that do not touch config.json, or take the lock themselves around the part that does
+Task = namedtuple('Task', ['name', 'action', 'dependencies', 'config_access'])
+
+
+def item_key(item) -> str:
+    """
+    Key of an item in the dependency graph, e.g. 'CopyData.DataPipeline'.
+    """
+    return f'{item.name}.{item.item_type}'
+
+
+def _read_logical_id(folder: str) -> str:
+    path = os.path.join(folder, '.platform')
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'r', encoding='utf-8') as file:
+        logical_id = json.load(file).get('config', {}).get('logicalId')
+    return None if logical_id == EMPTY_LOGICAL_ID else logical_id
+
+
+def _iter_definition_files(folder: str):
+    for directory, _, files in os.walk(folder):
+        for file_name in files:
+            if file_name != '.platform' and file_name.endswith(REFERENCE_FILE_EXTENSIONS):
+                yield os.path.join(directory, file_name)
+
+
+def _report_semantic_model(folder: str, semantic_model_ids: dict) -> str:
+    """
+    Resolve the semantic model a report is bound to from its definition.pbir.
+
+    Returns:
+        str: Name of the semantic model, or None when it cannot be resolved
+    """
+    path = os.path.join(folder, 'definition.pbir')
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'r', encoding='utf-8') as file:
+        return dataset_name(json.load(file), semantic_model_ids)
+
+
+@traced
+def build_dependency_graph(project_path: str, workspace_alias: str, semantic_model_ids: dict = None) -> tuple:
+    """
+    Build the item dependency graph of a workspace from the local tree.
+
+    Args:
+        project_path (str): Path of the project, e.g. 'src'
+        workspace_alias (str): Workspace folder under the project
+        semantic_model_ids (dict): Semantic model ID to name, from config, to resolve byConnection reports
+
+    Returns:
+        tuple: (items, graph) with the discovered items and item key to the set of keys it depends on
+    """
+    semantic_model_ids = semantic_model_ids or {}
+    items = discover_items(project_path, workspace_alias, item_types=DEPLOY_ITEM_TYPES)
+    folders = {item_key(item): item_folder(project_path, item) for item in items}
+    graph = {key: set() for key in folders}
+
+    lakehouses = [item_key(item) for item in items if item.item_type == 'Lakehouse']
+    for item in items:
+        if item.item_type in LAKEHOUSE_CONSUMER_TYPES:
+            graph[item_key(item)].update(lakehouses)
+
+    for item in items:
+        if item.item_type != 'Report':
+            continue
+        semantic_model = _report_semantic_model(folders[item_key(item)], semantic_model_ids)
+        if f'{semantic_model}.SemanticModel' in graph:
+            graph[item_key(item)].add(f'{semantic_model}.SemanticModel')
+
+    # Any other reference through the logical IDs of the .platform files
+    logical_ids = {}
+    for key, folder in folders.items():
+        logical_id = _read_logical_id(folder)
+        if logical_id:
+            logical_ids[logical_id.lower()] = key
+
+    if logical_ids:
+        for key, folder in folders.items():
+            for path in _iter_definition_files(folder):
+                with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+                    for match in LOGICAL_ID_PATTERN.finditer(file.read()):
+                        referenced = logical_ids.get(match.group().lower())
+                        if referenced and referenced != key:
+                            graph[key].add(referenced)
+
+    return items, graph
+
+
+def topological_order(graph: dict) -> list:
+    """
+    Order the keys of a dependency graph so that every key comes after its dependencies.
+
+    Raises:
+        ValueError: When the graph has a cycle
+    """
+    remaining = {key: set(dependencies) & graph.keys() for key, dependencies in graph.items()}
+    order = []
+    ready = sorted(key for key, dependencies in remaining.items() if not dependencies)
+    while ready:
+        key = ready.pop(0)
+        order.append(key)
+        del remaining[key]
+        for other, dependencies in remaining.items():
+            if key in dependencies:
+                dependencies.discard(key)
+                if not dependencies and other not in ready:
+                    ready.append(other)
+        ready.sort()
+
+    if remaining:
+        raise ValueError(f"Dependency cycle between {', '.join(sorted(remaining))}.")
+    return order
+
+
+class ReadWriteLock:
+    """
+    Lock shared by tasks reading config.json and held alone by tasks writing it,
+    as pyfabricops rewrites the whole file on export.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    def acquire(self, access: str):
+        with self._condition:
+            if access == 'write':
+                self._condition.wait_for(lambda: not self._writer and self._readers == 0)
+                self._writer = True
+            else:
+                self._condition.wait_for(lambda: not self._writer)
+                self._readers += 1
+
+    def release(self, access: str):
+        with self._condition:
+            if access == 'write':
+                self._writer = False
+            else:
+                self._readers -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def hold(self, access: str):
+        self.acquire(access)
+        try:
+            yield
+        finally:
+            self.release(access)
+
+
+def run_tasks(tasks: list, max_workers: int = 4, config_lock: ReadWriteLock = None) -> dict:
+    """
+    Run tasks concurrently, each as soon as all of its dependencies succeeded.
+
+    Tasks depending on a failed task are skipped; the others still run.
+
+    Args:
+        tasks (list): Task tuples; a task with action None only orders the others
+        max_workers (int): Maximum number of tasks running at the same time
+        config_lock (ReadWriteLock): Lock of config.json, for tasks taking it themselves
+
+    Returns:
+        dict: Task name to 'succeeded', 'failed' or 'skipped'
+    """
+    by_name = {task.name: task for task in tasks}
+    graph = {task.name: set(task.dependencies) & by_name.keys() for task in tasks}
+    topological_order(graph)
+
+    config_lock = config_lock or ReadWriteLock()
+    status = {}
+
+    def _run(task: Task):
+        if task.action is None:
+            return
+        if task.config_access is None:
+            with span(task.name, 'task'):
+                task.action()
+            return
+        with span(task.name, 'task') as span_args:
+            wait_start = time.perf_counter()
+            config_lock.acquire(task.config_access)
+            span_args['config_wait_s'] = round(time.perf_counter() - wait_start, 6)
+            try:
+                task.action()
+            finally:
+                config_lock.release(task.config_access)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while len(status) < len(tasks):
+            for name, dependencies in graph.items():
+                if name in status or name in running.values():
+                    continue
+                if any(status.get(dependency) in ('failed', 'skipped') for dependency in dependencies):
+                    status[name] = 'skipped'
+                    print(f"{name} skipped, a dependency failed.")
+                elif all(status.get(dependency) == 'succeeded' for dependency in dependencies):
+                    running[executor.submit(_run, by_name[name])] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except Exception as error:
+                    status[name] = 'failed'
+                    print(f"{name} failed: {error}")
+                else:
+                    status[name] = 'succeeded'
+
+    return status
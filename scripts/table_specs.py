@@ -0,0 +1,61 @@
+"""
+Table specs of the TransformAndLoad notebook, kept in pipeline_parameters.json only.
+
+In src the Table specs cell of the notebook holds a placeholder instead of a copy of the specs:
+
+    table_specs = json.loads(\"\"\"#{table_specs}#\"\"\")
+
+Wherever the placeholders of the notebooks are replaced with the variables of a
+branch (render, placeholders_to_parameters) the content of pipeline_parameters.json
+is embedded there, so the deployed notebook needs no file in the lakehouse. The
+placeholder is put back wherever variables are replaced with placeholders, e.g. in
+the notebooks exported after a deploy.
+"""
+import os
+import re
+
+from scripts.bootstrap import root_path
+
+
+SPEC_PATH = os.path.join(root_path, 'pipeline_parameters.json')
+
+PLACEHOLDER = '#{table_specs}#'
+
+# The literal of the table_specs assignment, group 1
+TABLE_SPECS_PATTERN = re.compile(r'^table_specs = json\.loads\("""(.*?)"""\)$', re.MULTILINE | re.DOTALL)
+
+
+def read_table_specs(spec_path: str = SPEC_PATH) -> str:
+    """
+    Content of pipeline_parameters.json, as embedded in the notebook.
+
+    Raises:
+        ValueError: When the content cannot be embedded in a triple-quoted string as is
+    """
+    with open(spec_path, 'r', encoding='utf-8') as file:
+        specs = file.read().strip()
+
+    if '"""' in specs or '\\' in specs:
+        raise ValueError(f"{spec_path} holds triple quotes or backslashes, it cannot be embedded in a notebook.")
+    return specs
+
+
+def embed_table_specs(content: str, spec_path: str = SPEC_PATH) -> str:
+    """
+    Replace the table_specs placeholder of a notebook with the specs of pipeline_parameters.json.
+    A notebook without the placeholder is returned unchanged.
+    """
+    match = TABLE_SPECS_PATTERN.search(content)
+    if match is None or match.group(1) != PLACEHOLDER:
+        return content
+    return f'{content[:match.start(1)]}\n{read_table_specs(spec_path)}\n{content[match.end(1):]}'
+
+
+def remove_table_specs(content: str) -> str:
+    """
+    Put the table_specs placeholder back in place of the specs embedded in a notebook.
+    """
+    match = TABLE_SPECS_PATTERN.search(content)
+    if match is None:
+        return content
+    return f'{content[:match.start(1)]}{PLACEHOLDER}{content[match.end(1):]}'
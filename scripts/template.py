@@ -0,0 +1,194 @@
+"""
+Compiled placeholder templates.
+
+An item file is scanned once into a Template: the literal text segments and,
+between them, the slots where a placeholder sits. Rendering a template for an
+environment is then a join of the segments with the values of that environment,
+so rendering the same file for several branches reads and scans it only once.
+
+The slot offsets found by a scan are cached on disk, keyed by the hash of the
+content, the kind of scan and TEMPLATE_VERSION, so a file unchanged since any
+earlier run is never parsed again. Only the offsets are stored: the segments are
+sliced from the content, which is read anyway to compute its hash. The cache
+lives in PF_TEMPLATE_CACHE (default .pf_cache/templates at the repository root,
+'off' disables it) and the least recently used entries are evicted beyond
+PF_TEMPLATE_CACHE_MAX_BYTES.
+
+Examples:
+    ```python
+    template = compile_placeholders(content)
+    rendered = render(template, {'CopyData_Copy_sink_workspace_id': '...'})
+    ```
+"""
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+from scripts import notebook
+from scripts.bootstrap import cache_path
+from scripts.config_session import atomic_write
+from scripts.tracing import span
+from scripts.utils import PLACEHOLDER_PATTERN, SubstitutionResult
+
+
+# Bump when a change to the scans below changes the slots found for the same content
+TEMPLATE_VERSION = 1
+
+CACHE_ENV = 'PF_TEMPLATE_CACHE'
+MAX_BYTES_ENV = 'PF_TEMPLATE_CACHE_MAX_BYTES'
+
+DEFAULT_CACHE_PATH = os.path.join(cache_path, 'templates')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# segments has one more entry than slots; slots are (placeholder name, original text) pairs
+Template = namedtuple('Template', ['segments', 'slots'])
+
+
+def _placeholder_spans(content: str) -> list:
+    return [[match.start(), match.end(), match.group(1)] for match in PLACEHOLDER_PATTERN.finditer(content)]
+
+
+def _notebook_spans(content: str) -> list:
+    spans = []
+    for assignment in notebook.parse_parameters(content):
+        match = PLACEHOLDER_PATTERN.fullmatch(assignment.value) if assignment.parameter_type == 'string' else None
+        if match is not None:
+            spans.append([assignment.start, assignment.end, match.group(1)])
+    return spans
+
+
+# Kind of scan to the function returning the [start, end, name] slots of a content
+SCANS = {
+    'placeholders': _placeholder_spans,
+    'notebook': _notebook_spans,
+}
+
+
+class TemplateCache:
+    """
+    On-disk cache of the slots of scanned contents, one JSON file per content,
+    bounded to max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # File name to (size, last use) of the entries, scanned on the first write
+        self._entries = None
+
+    def _key(self, kind: str, content: str) -> str:
+        digest = hashlib.sha256(f'{TEMPLATE_VERSION}:{kind}:'.encode('utf-8'))
+        digest.update(content.encode('utf-8'))
+        return f'{digest.hexdigest()}.json'
+
+    def spans(self, kind: str, content: str) -> list:
+        """
+        Get the slots of a content, scanning it only when it is not cached.
+        """
+        name = self._key(kind, content)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                spans = json.load(file)
+            # Refreshed so eviction drops the entries unused for longest
+            os.utime(path)
+            if self._entries is not None and name in self._entries:
+                self._entries[name] = (self._entries[name][0], time.time())
+            return spans
+        except (OSError, ValueError):
+            pass
+
+        with span('TemplateCache.scan', kind=kind, bytes=len(content)):
+            spans = SCANS[kind](content)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with atomic_write(path, encoding='utf-8') as file:
+                json.dump(spans, file, separators=(',', ':'))
+            self._record(name, os.path.getsize(path))
+        except OSError as error:
+            print(f"Template not cached in {self.directory}: {error}")
+        return spans
+
+    def _record(self, name: str, size: int):
+        if self._entries is None:
+            self._entries = {}
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    self._entries[entry.name] = (stat.st_size, stat.st_mtime)
+        self._entries[name] = (size, time.time())
+
+        total = sum(size for size, _ in self._entries.values())
+        for evicted in sorted(self._entries, key=lambda entry: self._entries[entry][1]):
+            if total <= self.max_bytes:
+                break
+            # The entry just written is kept, even alone beyond max_bytes
+            if evicted == name:
+                continue
+            total -= self._entries.pop(evicted)[0]
+            try:
+                os.remove(os.path.join(self.directory, evicted))
+            except OSError:
+                pass
+
+
+_cache = None
+
+
+def get_cache() -> TemplateCache:
+    """
+    The cache of the process, configured from PF_TEMPLATE_CACHE; None when disabled.
+    """
+    global _cache
+    directory = os.environ.get(CACHE_ENV, DEFAULT_CACHE_PATH)
+    if directory.lower() in ('', 'off', '0'):
+        return None
+    if _cache is None or _cache.directory != directory:
+        _cache = TemplateCache(directory, int(os.environ.get(MAX_BYTES_ENV) or DEFAULT_MAX_BYTES))
+    return _cache
+
+
+def _compile(kind: str, content: str) -> Template:
+    cache = get_cache()
+    spans = cache.spans(kind, content) if cache else SCANS[kind](content)
+
+    starts = [start for start, _, _ in spans] + [len(content)]
+    ends = [0] + [end for _, end, _ in spans]
+    segments = tuple(content[end:start] for end, start in zip(ends, starts))
+    slots = tuple((name, content[start:end]) for start, end, name in spans)
+    return Template(segments, slots)
+
+
+def compile_placeholders(content: str) -> Template:
+    """
+    Compile every #{name}# placeholder of a pipeline or dataflow file.
+    """
+    return _compile('placeholders', content)
+
+
+def compile_notebook(content: str) -> Template:
+    """
+    Compile the quoted placeholders assigned in the parameters cell of a notebook.
+    The slot covers the whole string literal, quotes included, as the value replacing it may not be a string.
+    """
+    return _compile('notebook', content)
+
+
+def render(template: Template, lookup: dict) -> SubstitutionResult:
+    """
+    Fill the slots of a template; slots without a value keep their original text.
+
+    Returns:
+        SubstitutionResult: The rendered content, the unknown placeholders and the lookup keys never used
+    """
+    parts = [None] * (2 * len(template.slots) + 1)
+    parts[::2] = template.segments
+    parts[1::2] = [lookup.get(name, original) for name, original in template.slots]
+
+    unknown = [name for name, _ in template.slots if name not in lookup]
+    used = {name for name, _ in template.slots}
+    missing = [name for name in lookup if name not in used]
+    return SubstitutionResult(''.join(parts), unknown, missing)
@@ -0,0 +1,377 @@
+"""
+Parser and parameter engine for the TMDL files of semantic models.
+
+Parameters live in definition/expressions.tmdl, either as parameter expressions
+(`expression Server = "..." meta [IsParameterQuery=true, ...]`) or as the literal
+arguments of Sql.Database in an M expression (Direct Lake models), named
+ServerEndpoint and DatabaseId as pyfabricops does. Partition `source` blocks of
+definition/tables/*.tmdl are scanned for Sql.Database literals and placeholders too.
+
+Every file is parsed once into parameters carrying the character offsets of their
+value, so extracting and replacing are one pass per file, and the semantic models
+of a workspace are processed across a process pool.
+"""
+import glob
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.config_session import ConfigSession
+from scripts.discovery import discover_items, item_folder
+from scripts.tracing import traced
+from scripts.utils import PLACEHOLDER_PATTERN, SubstitutionResult, _report_substitution, _splice
+
+
+# Files of a semantic model holding parameters, relative to the model folder
+EXPRESSIONS_FILE = os.path.join('definition', 'expressions.tmdl')
+TABLES_PATTERN = os.path.join('definition', 'tables', '*.tmdl')
+
+# Names given to the literal arguments of Sql.Database, as pyfabricops does
+SQL_DATABASE_PARAMETERS = ('ServerEndpoint', 'DatabaseId')
+
+EXPRESSION_PATTERN = re.compile(r"^(\t*)expression[ \t]+('(?:[^']|'')+'|[^\s=]+)[ \t]*=[ \t]*(.*?)\r?$", re.MULTILINE)
+SOURCE_PATTERN = re.compile(r'^(\t*)source[ \t]*=[ \t]*(.*?)\r?$', re.MULTILINE)
+
+# M text literal, "" escapes a quote
+STRING_PATTERN = re.compile(r'"((?:[^"]|"")*)"')
+
+# Parameter of a hash function, e.g. #date(2024, 1, 1)
+HASH_FUNCTION_PATTERN = re.compile(r'#\w+\([^)]*\)')
+
+SQL_DATABASE_PATTERN = re.compile(r'Sql\.Database[ \t]*\([ \t]*"((?:[^"]|"")*)"[ \t]*,[ \t]*"((?:[^"]|"")*)"')
+
+# A parameter value in a TMDL file; start and end delimit its text, inside the quotes when quoted
+Parameter = namedtuple('Parameter', ['name', 'value', 'quoted', 'start', 'end'])
+
+
+def _unquote_name(name: str) -> str:
+    if name.startswith("'") and name.endswith("'"):
+        return name[1:-1].replace("''", "'")
+    return name
+
+
+def _block_end(content: str, position: int, indent: int) -> int:
+    """
+    Offset where the lines starting at `position` stop being indented deeper than `indent` tabs.
+    Blank lines belong to the block.
+    """
+    for line in re.finditer(r'[^\n]*\n?', content[position:]):
+        text = line.group()
+        if not text:
+            break
+        stripped = text.strip()
+        if stripped and len(text) - len(text.lstrip('\t')) <= indent:
+            return position + line.start()
+    return len(content)
+
+
+def _parse_m(content: str, start: int, end: int) -> list:
+    """
+    Parameters in a block of M code: Sql.Database literals and any placeholder.
+    """
+    parameters = []
+    covered = set()
+    for match in SQL_DATABASE_PATTERN.finditer(content, start, end):
+        for group, default in enumerate(SQL_DATABASE_PARAMETERS, start=1):
+            value = match.group(group).replace('""', '"')
+            placeholder = PLACEHOLDER_PATTERN.fullmatch(value)
+            name = placeholder.group(1) if placeholder else default
+            parameters.append(Parameter(name, value, True, match.start(group), match.end(group)))
+            covered.add(match.start(group))
+
+    for match in PLACEHOLDER_PATTERN.finditer(content, start, end):
+        if match.start() not in covered:
+            parameters.append(Parameter(match.group(1), match.group(), False, match.start(), match.end()))
+
+    return parameters
+
+
+def parse_expressions(content: str) -> list:
+    """
+    Parse the parameters of an expressions.tmdl file.
+
+    Returns:
+        list: Parameter tuples in file order
+    """
+    parameters = []
+    for expression in EXPRESSION_PATTERN.finditer(content):
+        indent = len(expression.group(1))
+        name = _unquote_name(expression.group(2))
+        value_start, value_end = expression.span(3)
+
+        string = STRING_PATTERN.match(content, value_start, value_end)
+        hash_function = HASH_FUNCTION_PATTERN.match(content, value_start, value_end)
+        if string:
+            parameters.append(Parameter(name, string.group(1).replace('""', '"'), True, *string.span(1)))
+        elif hash_function:
+            parameters.append(Parameter(name, hash_function.group(), False, *hash_function.span()))
+        elif value_start == value_end:
+            # Multi-line expression, its M code is indented below the properties of the expression
+            parameters.extend(_parse_m(content, expression.end(), _block_end(content, expression.end(), indent + 1)))
+        else:
+            parameters.extend(_parse_m(content, value_start, value_end))
+
+    return sorted(parameters, key=lambda parameter: parameter.start)
+
+
+def parse_partition_sources(content: str) -> list:
+    """
+    Parse the parameters of the partition source blocks of a tables/*.tmdl file.
+
+    Returns:
+        list: Parameter tuples in file order
+    """
+    parameters = []
+    for source in SOURCE_PATTERN.finditer(content):
+        value_start, value_end = source.span(2)
+        if value_start == value_end:
+            value_start, value_end = source.end(), _block_end(content, source.end(), len(source.group(1)))
+        parameters.extend(_parse_m(content, value_start, value_end))
+
+    return sorted(parameters, key=lambda parameter: parameter.start)
+
+
+def _is_placeholder(parameter: Parameter) -> bool:
+    return PLACEHOLDER_PATTERN.fullmatch(parameter.value) is not None
+
+
+def _format_value(parameter: Parameter, value: str) -> str:
+    return value.replace('"', '""') if parameter.quoted else value
+
+
+def semantic_model_files(folder: str) -> list:
+    """
+    TMDL files of a semantic model that may hold parameters, with their parser.
+
+    Returns:
+        list: (path, parse function) pairs
+    """
+    files = []
+    expressions_path = os.path.join(folder, EXPRESSIONS_FILE)
+    if os.path.exists(expressions_path):
+        files.append((expressions_path, parse_expressions))
+    for path in sorted(glob.glob(os.path.join(folder, TABLES_PATTERN))):
+        files.append((path, parse_partition_sources))
+    return files
+
+
+def _read(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        return file.read()
+
+
+@traced
+def extract_semantic_model_parameters(folder: str) -> dict:
+    """
+    Extract the parameter values of a semantic model, placeholders left out.
+
+    Args:
+        folder (str): Path of the .SemanticModel folder
+
+    Returns:
+        dict: Parameter name to value
+    """
+    extracted = {}
+    for path, parse in semantic_model_files(folder):
+        for parameter in parse(_read(path)):
+            if _is_placeholder(parameter):
+                continue
+            if extracted.get(parameter.name, parameter.value) != parameter.value:
+                print(f"Parameter {parameter.name} has several values in {folder}, keeping {extracted[parameter.name]}.")
+                continue
+            extracted[parameter.name] = parameter.value
+    return extracted
+
+
+@traced
+def replace_semantic_model_placeholders_with_parameters(folder: str, parameters: dict) -> dict:
+    """
+    Replace the placeholders of a semantic model with parameter values.
+
+    Args:
+        folder (str): Path of the .SemanticModel folder
+        parameters (dict): Parameter name to value, from config
+
+    Returns:
+        dict: Path to new content, for every file holding placeholders
+    """
+    contents = {}
+    for path, parse in semantic_model_files(folder):
+        content = _read(path)
+        replacements = []
+        unknown = []
+        for parameter in parse(content):
+            placeholder = PLACEHOLDER_PATTERN.fullmatch(parameter.value)
+            if placeholder is None:
+                continue
+            if placeholder.group(1) in parameters:
+                value = _format_value(parameter, str(parameters[placeholder.group(1)]))
+                replacements.append((parameter.start, parameter.end, value))
+            else:
+                unknown.append(placeholder.group(1))
+
+        _report_substitution(path, SubstitutionResult(None, unknown, []), 'placeholders')
+        if replacements:
+            contents[path] = _splice(content, replacements)
+    return contents
+
+
+@traced
+def replace_semantic_model_parameters_with_placeholders(folder: str, parameters: dict) -> dict:
+    """
+    Replace the parameter values of a semantic model with #{name}# placeholders.
+    Only the parameters configured for the branch are replaced, other values
+    (e.g. a #date(...) parameter or a Sql.Database literal left out of config) are kept.
+
+    Args:
+        folder (str): Path of the .SemanticModel folder
+        parameters (dict): Parameter name to value, semantic_models.<name>.parameters of the branch
+
+    Returns:
+        dict: Path to new content, for every file holding parameter values
+    """
+    contents = {}
+    for path, parse in semantic_model_files(folder):
+        content = _read(path)
+        replacements = [
+            (parameter.start, parameter.end, f'#{{{parameter.name}}}#')
+            for parameter in parse(content)
+            if parameter.name in parameters and not _is_placeholder(parameter)
+        ]
+        if replacements:
+            contents[path] = _splice(content, replacements)
+    return contents
+
+
+def _process_model(action: str, folder: str, parameters: dict):
+    """
+    Run one extract/replace routine for a semantic model, in a worker process.
+    """
+    if action == 'extract':
+        return extract_semantic_model_parameters(folder)
+    if action == 'to_variables':
+        return replace_semantic_model_placeholders_with_parameters(folder, parameters)
+    return replace_semantic_model_parameters_with_placeholders(folder, parameters)
+
+
+def _run(action: str, folders: list, parameters: list, max_workers: int) -> list:
+    """
+    Run `action` for every semantic model, across a process pool when there is more than one.
+    """
+    if max_workers == 1 or len(folders) <= 1:
+        return [_process_model(action, folder, model_parameters) for folder, model_parameters in zip(folders, parameters)]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_process_model, [action] * len(folders), folders, parameters))
+
+
+def _write(contents: dict, message: str):
+    for path, content in contents.items():
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(content)
+        print(f"{message} in {path}.")
+
+
+@traced
+def extract_semantic_models_parameters(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+) -> list:
+    """
+    Extract the parameters of every semantic model and save them to config in one write,
+    under semantic_models.<name>.parameters.
+
+    Returns:
+        list: The discovered semantic models
+    """
+    items = discover_items(project_path, workspace_alias, item_types=('SemanticModel',))
+    folders = [item_folder(project_path, item) for item in items]
+
+    results = _run('extract', folders, [None] * len(folders), max_workers)
+
+    with ConfigSession(config_path) as config:
+        workspace = config.workspace(branch, workspace_alias)
+        for item, parameters in zip(items, results):
+            if not parameters:
+                print(f"No parameters found in {item.name}.SemanticModel.")
+                continue
+
+            workspace.set('semantic_models', item.name, 'parameters', value=parameters)
+            print(f"Parameters from {item.name}.SemanticModel extracted.")
+
+    return items
+
+
+@traced
+def replace_semantic_models_placeholders_with_parameters(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+) -> list:
+    """
+    Replace the placeholders of every semantic model with the parameters of the branch.
+
+    Returns:
+        list: The discovered semantic models
+    """
+    items = discover_items(project_path, workspace_alias, item_types=('SemanticModel',))
+
+    with ConfigSession(config_path) as config:
+        workspace = config.workspace(branch, workspace_alias)
+        handled = []
+        parameters = []
+        for item in items:
+            model_parameters = workspace.get('semantic_models', item.name, 'parameters')
+            if not model_parameters:
+                print(f"No parameters found for {item.name}.SemanticModel in {config_path}.")
+                continue
+            handled.append(item)
+            parameters.append(model_parameters)
+
+    results = _run('to_variables', [item_folder(project_path, item) for item in handled], parameters, max_workers)
+    for contents in results:
+        _write(contents, 'Placeholders replaced with parameters')
+
+    return items
+
+
+@traced
+def replace_semantic_models_parameters_with_placeholders(
+    project_path: str,
+    workspace_alias: str,
+    config_path: str,
+    branch: str,
+    max_workers: int = None,
+) -> list:
+    """
+    Replace the values of the parameters configured for the branch with placeholders,
+    in every semantic model.
+
+    Returns:
+        list: The discovered semantic models
+    """
+    items = discover_items(project_path, workspace_alias, item_types=('SemanticModel',))
+
+    with ConfigSession(config_path) as config:
+        workspace = config.workspace(branch, workspace_alias)
+        handled = []
+        parameters = []
+        for item in items:
+            model_parameters = workspace.get('semantic_models', item.name, 'parameters')
+            if not model_parameters:
+                print(f"No parameters found for {item.name}.SemanticModel in {config_path}.")
+                continue
+            handled.append(item)
+            parameters.append(model_parameters)
+
+    results = _run('to_placeholders', [item_folder(project_path, item) for item in handled], parameters, max_workers)
+    for contents in results:
+        _write(contents, 'Parameters replaced with placeholders')
+
+    return items
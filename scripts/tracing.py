@@ -0,0 +1,301 @@
+"""
+Opt-in tracing of the deploy scripts.
+
+Set PF_TRACE to a directory to record nested spans around each script stage,
+each traced scripts function, each pf.* call and each HTTP request sent through
+the sessions of scripts/http_session.py.
+When the script exits the spans are written to <PF_TRACE>/<stage>.json in the
+Chrome trace format (open it in chrome://tracing or https://ui.perfetto.dev)
+and the PF_TRACE_TOP (default 15) slowest span names are printed.
+
+When PF_TRACE is not set every helper here is a no-op.
+
+Examples:
+    ```
+    PF_TRACE=traces python -m scripts.deploy_project
+    ```
+"""
+import atexit
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+TRACE_ENV = 'PF_TRACE'
+TOP_ENV = 'PF_TRACE_TOP'
+
+# Process that owns the trace, worker processes inherit the environment but do not write it
+OWNER_ENV = 'PF_TRACE_OWNER'
+
+DEFAULT_TOP = 15
+
+# Longest argument value kept in a span
+MAX_ARG_LENGTH = 200
+
+# IDs are dropped from request span names, so calls to the same route add up in the summary
+ID_PATTERN = re.compile(r'[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}')
+
+
+class Tracer:
+    """
+    Collects complete ('X') events of the Chrome trace format, nested per thread.
+    """
+
+    def __init__(self, directory: str, stage: str):
+        self.directory = directory
+        self.stage = stage
+        self.pid = os.getpid()
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+
+    def _stack(self) -> list:
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name: str, category: str, args: dict):
+        stack = self._stack()
+        frame = {'args': dict(args), 'children': 0.0}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame['args']
+        except BaseException as error:
+            frame['args']['error'] = f'{type(error).__name__}: {error}'[:MAX_ARG_LENGTH]
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1]['children'] += duration
+
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (start - self.origin) * 1e6,
+                'dur': duration * 1e6,
+                'pid': self.pid,
+                'tid': threading.get_ident(),
+                'args': frame['args'],
+                # Not part of the format, used for the summary and dropped on write
+                'self': duration - frame['children'],
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def summary(self, top: int) -> list:
+        """
+        Aggregate the spans by name.
+
+        Returns:
+            list: (name, calls, total seconds, self seconds) by descending self time
+        """
+        totals = defaultdict(lambda: [0, 0.0, 0.0])
+        with self.lock:
+            for event in self.events:
+                entry = totals[event['name']]
+                entry[0] += 1
+                entry[1] += event['dur'] / 1e6
+                entry[2] += event['self']
+        rows = [(name, calls, total, own) for name, (calls, total, own) in totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)[:top]
+
+    def write(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{self.stage}.json')
+
+        with self.lock:
+            events = [{key: value for key, value in event.items() if key != 'self'} for event in self.events]
+        threads = {event['tid'] for event in events}
+        metadata = [
+            {'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.stage}},
+            *(
+                {'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': f'thread-{index}'}}
+                for index, tid in enumerate(sorted(threads))
+            ),
+        ]
+
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, file)
+        return path
+
+
+_tracer = None
+
+
+def _stage_name() -> str:
+    main = sys.modules.get('__main__')
+    spec = getattr(main, '__spec__', None)
+    if spec is not None and spec.name:
+        return spec.name.rpartition('.')[2]
+    return os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def enable(directory: str = None, stage: str = None) -> bool:
+    """
+    Start tracing when PF_TRACE (or `directory`) is set, once per process.
+
+    Returns:
+        bool: Whether tracing is on
+    """
+    global _tracer
+    if _tracer is not None:
+        return True
+
+    directory = directory or os.environ.get(TRACE_ENV)
+    if not directory:
+        return False
+
+    # Worker processes (e.g. the discovery process pool) must not overwrite the trace of their parent
+    owner = os.environ.get(OWNER_ENV)
+    if owner and owner != str(os.getpid()):
+        return False
+    os.environ[OWNER_ENV] = str(os.getpid())
+
+    _tracer = Tracer(directory, stage or _stage_name())
+
+    root = _tracer.span(_tracer.stage, 'stage', {'argv': ' '.join(sys.argv[1:])[:MAX_ARG_LENGTH]})
+    root.__enter__()
+    atexit.register(_finish, root)
+    return True
+
+
+def _finish(root):
+    root.__exit__(None, None, None)
+    path = _tracer.write()
+
+    top = int(os.environ.get(TOP_ENV) or DEFAULT_TOP)
+    print(f"\nTrace saved to {path}. Top {top} spans by self time:")
+    print(f"{'span':<60} {'calls':>6} {'total s':>9} {'self s':>9}")
+    for name, calls, total, own in _tracer.summary(top):
+        print(f"{name[:60]:<60} {calls:>6} {total:>9.3f} {own:>9.3f}")
+
+
+def _describe(value):
+    if isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value[:MAX_ARG_LENGTH]
+    return None
+
+
+def _call_args(args: tuple, kwargs: dict) -> dict:
+    """
+    Keep the simple arguments of a call, and the size of the file when one is a path.
+    """
+    described = {}
+    for index, value in enumerate(args):
+        if _describe(value) is not None:
+            described[f'arg{index}'] = _describe(value)
+    for key, value in kwargs.items():
+        if _describe(value) is not None:
+            described[key] = _describe(value)
+
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, str) and os.path.isfile(value):
+            described['bytes'] = os.path.getsize(value)
+            break
+    return described
+
+
+@contextmanager
+def span(name: str, category: str = 'scripts', **args):
+    """
+    Record a span around a block; yields a dict for extra arguments (e.g. byte counts).
+    """
+    if _tracer is None:
+        yield {}
+        return
+    with _tracer.span(name, category, args) as span_args:
+        yield span_args
+
+
+def traced(function=None, *, name: str = None, category: str = 'scripts'):
+    """
+    Decorator recording a span for every call of a function, with its simple arguments.
+    """
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.span(span_name, category, _call_args(args, kwargs)):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate(function) if function is not None else decorate
+
+
+def instrument(module: types.ModuleType):
+    """
+    Return `module` with every public function traced under its qualified name,
+    e.g. pf.deploy_notebook recorded as 'pf.deploy_notebook'.
+
+    The calls are recorded once tracing is on, even when it was enabled after the module was wrapped.
+    """
+    return _TracedModule(module)
+
+
+class _TracedModule:
+    def __init__(self, module: types.ModuleType):
+        self._module = module
+        self._functions = {}
+
+    def __getattr__(self, attribute: str):
+        value = getattr(self._module, attribute)
+        if attribute.startswith('_') or not callable(value) or isinstance(value, type):
+            return value
+        if attribute not in self._functions:
+            self._functions[attribute] = traced(value, name=f'pf.{attribute}', category='pf')
+        return self._functions[attribute]
+
+
+def instrument_session(session):
+    """
+    Record a span for every request sent with a requests session, e.g. the sessions
+    of scripts/http_session.py. Only this session is wrapped; unchanged when tracing is off.
+
+    The received size is read from Content-Length, so streamed responses are not loaded to measure them.
+    """
+    if _tracer is None:
+        return session
+
+    request = session.request
+
+    def _request(method, url, *args, **kwargs):
+        route = url.split('?', 1)[0]
+        name = f"HTTP {method.upper()} {ID_PATTERN.sub('{id}', route.split('://', 1)[-1])}"
+        with _tracer.span(name, 'http', {'url': route[:MAX_ARG_LENGTH]}) as span_args:
+            body = kwargs.get('data') or kwargs.get('json')
+            if isinstance(body, (bytes, str)):
+                span_args['bytes_sent'] = len(body)
+            elif body is not None:
+                span_args['bytes_sent'] = len(json.dumps(body))
+
+            response = request(method, url, *args, **kwargs)
+            span_args['status'] = response.status_code
+            length = response.headers.get('Content-Length')
+            if length and length.isdigit():
+                span_args['bytes_received'] = int(length)
+            return response
+
+    session.request = _request
+    return session
@@ -1,73 +1,243 @@
 import json
 import re
+from collections import namedtuple
+from contextlib import nullcontext
 
+from scripts import mashup, notebook
+from scripts.config_session import ConfigSession, atomic_write
+from scripts.json_stream import DEFAULT_CHUNK_SIZE, iter_json_events
+from scripts.table_specs import embed_table_specs, remove_table_specs
+from scripts.tracing import traced
+
+
+# Matches a #{name}# placeholder token and captures the placeholder name,
+# which may contain spaces as item, activity and query names can
+PLACEHOLDER_PATTERN = re.compile(r'#\{([^{}\n]+)\}#')
+
+SubstitutionResult = namedtuple('SubstitutionResult', ['content', 'unknown', 'missing'])
+
+
+def _substitute(content: str, pattern: re.Pattern, lookup: dict, key=None) -> SubstitutionResult:
+    """
+    Single-pass substitution engine shared by every artifact type.
+
+    The content is scanned once with `pattern` and every match is resolved with a
+    dictionary lookup, so the cost is linear in the size of the file regardless of
+    how many placeholders or values are being substituted.
+
+    Args:
+        content (str): Text to be scanned
+        pattern (re.Pattern): Compiled pattern locating the candidate tokens
+        lookup (dict): Mapping of token keys to their replacement text
+        key (callable): Builds the lookup key from a match, defaults to the first group
+
+    Returns:
+        SubstitutionResult: The substituted content, the keys matched by the pattern
+            but absent from the lookup (unknown) and the lookup keys never matched (missing)
+    """
+    if key is None:
+        key = lambda match: match.group(1)
+
+    unknown = []
+    used = set()
+
+    def _replace(match):
+        token = key(match)
+        if token in lookup:
+            used.add(token)
+            return lookup[token]
+        unknown.append(token)
+        return match.group(0)
+
+    content = pattern.sub(_replace, content)
+    missing = [token for token in lookup if token not in used]
+
+    return SubstitutionResult(content, unknown, missing)
+
+
+def _config_session(config_path: str, session: ConfigSession = None):
+    """
+    Use the session shared by the caller, or open one just for this call.
+    """
+    return nullcontext(session) if session is not None else ConfigSession(config_path)
+
+
+def _report_substitution(path: str, result: SubstitutionResult, direction: str):
+    """
+    Print the tokens that could not be resolved during a substitution.
+    """
+    if result.unknown:
+        print(f"Unknown {direction} in {path}: {', '.join(map(str, dict.fromkeys(result.unknown)))}")
+
+
+# Keys under typeProperties holding nested activities (ForEach, Until, IfCondition, Switch)
+DATA_PIPELINE_CONTAINER_KEYS = ('activities', 'ifTrueActivities', 'ifFalseActivities', 'defaultActivities')
+
+# Copy activity fields collected as variables, as key paths relative to the activity
+COPY_ACTIVITY_FIELDS = {
+    'source_database': ('typeProperties', 'source', 'datasetSettings', 'typeProperties', 'database'),
+    'source_connection': ('typeProperties', 'source', 'datasetSettings', 'externalReferences', 'connection'),
+    'sink_name': ('typeProperties', 'sink', 'datasetSettings', 'linkedService', 'name'),
+    'sink_workspace_id': ('typeProperties', 'sink', 'datasetSettings', 'linkedService', 'properties', 'typeProperties', 'workspaceId'),
+    'sink_artifact_id': ('typeProperties', 'sink', 'datasetSettings', 'linkedService', 'properties', 'typeProperties', 'artifactId'),
+}
+
+# Copy activity fields swapped for placeholders, sink_name is kept as is
+COPY_ACTIVITY_PLACEHOLDER_FIELDS = ('source_database', 'source_connection', 'sink_workspace_id', 'sink_artifact_id')
+
+
+def _compile_accessor(path: tuple) -> tuple:
+    """
+    Compile a key path into a getter and a setter, so each deep lookup is resolved once.
+
+    Args:
+        path (tuple): Keys and indexes leading to the value
+
+    Returns:
+        tuple: getter(obj) returning the value or None when the path is missing,
+            and setter(obj, value) assigning it
+    """
+    *parents, leaf = path
+
+    def _parent(obj):
+        for key in parents:
+            obj = obj[key]
+        return obj
+
+    def getter(obj):
+        try:
+            return _parent(obj)[leaf]
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    def setter(obj, value):
+        _parent(obj)[leaf] = value
+
+    return getter, setter
+
+
+COPY_ACTIVITY_ACCESSORS = {field: _compile_accessor(path) for field, path in COPY_ACTIVITY_FIELDS.items()}
+
+
+def _format_activity_path(path: tuple) -> str:
+    """
+    Format an activity key path as a JSON pointer, e.g. /properties/activities/0.
+    """
+    return ''.join(f'/{key}' for key in path)
+
+
+def _parse_activity_path(pointer: str) -> tuple:
+    """
+    Parse a JSON pointer produced by _format_activity_path back into a key path.
+    """
+    return tuple(int(key) if key.isdigit() else key for key in pointer.split('/')[1:])
+
+
+def _iter_data_pipeline_activities(content: dict):
+    """
+    Walk every activity of a data pipeline at any depth, in document order.
+
+    Nested activities are found under ForEach/Until (activities), IfCondition
+    (ifTrueActivities/ifFalseActivities) and Switch (cases[].activities/defaultActivities).
+    The walk uses an explicit stack, so deep orchestration pipelines do not hit the recursion limit.
+
+    Args:
+        content (dict): Parsed pipeline-content.json
+
+    Yields:
+        tuple: (path, names, activity) where path is the key path of the activity
+            and names the activity names from the top-level activity down to it
+    """
+    activities = content['properties'].get('activities', [])
+    stack = [(('properties', 'activities', index), (), activity) for index, activity in reversed(list(enumerate(activities)))]
+
+    while stack:
+        path, parent_names, activity = stack.pop()
+        names = parent_names + (activity['name'],)
+        yield path, names, activity
+
+        type_properties = activity.get('typeProperties', {})
+        children = []
+        for container_key in DATA_PIPELINE_CONTAINER_KEYS:
+            for index, child in enumerate(type_properties.get(container_key, [])):
+                children.append((path + ('typeProperties', container_key, index), names, child))
+        for case_index, case in enumerate(type_properties.get('cases', [])):
+            for index, child in enumerate(case.get('activities', [])):
+                children.append((path + ('typeProperties', 'cases', case_index, 'activities', index), names, child))
+
+        stack.extend(reversed(children))
+
+
+def _data_pipeline_variable_target(variable: dict) -> tuple:
+    """
+    Resolve the activity key path and placeholder prefix of a data pipeline variable.
+    Variables saved before nested pipelines were supported only carry the
+    activity/subactivity indexes and names, and are mapped to the same target.
+    """
+    if 'activity_path' in variable:
+        return _parse_activity_path(variable['activity_path']), '_'.join(variable['activity_names'])
+
+    path = (
+        'properties', 'activities', variable['activity_index'],
+        'typeProperties', 'activities', variable['subactivity_index'],
+    )
+    return path, f"{variable['activity_name']}_{variable['subactivity_name']}"
+
+
+@traced
 def _extract_data_pipeline_variables(path: str) -> list:
 
     with open(path, 'r') as f:
         content = json.load(f)
 
-    activities = content['properties']['activities'] 
-
     variables = []
 
-    for activity_index, activity in enumerate(activities):
-        activity_name = activity['name']
+    for activity_path, names, activity in _iter_data_pipeline_activities(content):
+        if activity.get('type') != 'Copy':
+            continue
 
-        subactivities = activity['typeProperties']['activities']
-        for subactivity_index, subactivity in enumerate(subactivities):
-            subactivity_name = subactivity['name']
-            properties = subactivity['typeProperties']
-            
-            source = properties['source']['datasetSettings']
-            source_database = source['typeProperties']['database']
-            source_connection = source['externalReferences']['connection']
-
-            sink = properties['sink']['datasetSettings']['linkedService']
-            sink_name = sink['name']
-            sink_properties = sink['properties']['typeProperties']
-            sink_workspace_id = sink_properties['workspaceId']
-            sink_artifact_id = sink_properties['artifactId']
+        fields = {}
+        for field, (getter, _) in COPY_ACTIVITY_ACCESSORS.items():
+            value = getter(activity)
+            if value is not None:
+                fields[field] = value
 
+        if fields:
             variables.append(
                 {
-                    'activity_index': activity_index,
-                    'activity_name': activity_name,
-                    'subactivity_index': subactivity_index,
-                    'subactivity_name': subactivity_name,
-                    'source_database': source_database,
-                    'source_connection': source_connection,
-                    'sink_name': sink_name,
-                    'sink_workspace_id': sink_workspace_id,
-                    'sink_artifact_id': sink_artifact_id
+                    'activity_path': _format_activity_path(activity_path),
+                    'activity_names': list(names),
+                    **fields,
                 }
             )
 
     return variables
 
 
+@traced
 def _replace_data_pipeline_variables_with_placeholders(path: str, variables: list) -> str:
 
     with open(path, 'r') as f:
         content = json.load(f)
 
+    # Use paths to find correct variable - Does not assume unique names
+    # This allows multiple activities with the same name at any depth
+    targets = {}
     for variable in variables:
-        # Use indexes to find correct variable - Does not assume unique names
-        # This allows multiple activities/subactivities with the same name
-        activity_idx = variable['activity_index']
-        subactivity_idx = variable['subactivity_index']
-        
+        activity_path, prefix = _data_pipeline_variable_target(variable)
+        targets[activity_path] = (prefix, variable)
+
+    for activity_path, _, activity in _iter_data_pipeline_activities(content):
+        if activity_path not in targets:
+            continue
+
+        prefix, variable = targets[activity_path]
+
         # Substitute just the values that need to be replaced with placeholders
-        # Database
-        content['properties']['activities'][activity_idx]['typeProperties']['activities'][subactivity_idx]['typeProperties']['source']['datasetSettings']['typeProperties']['database'] = f"#{{{variable['activity_name']}_{variable['subactivity_name']}_source_database}}#"
-        
-        # Connection  
-        content['properties']['activities'][activity_idx]['typeProperties']['activities'][subactivity_idx]['typeProperties']['source']['datasetSettings']['externalReferences']['connection'] = f"#{{{variable['activity_name']}_{variable['subactivity_name']}_source_connection}}#"
-        
-        # Workspace ID
-        content['properties']['activities'][activity_idx]['typeProperties']['activities'][subactivity_idx]['typeProperties']['sink']['datasetSettings']['linkedService']['properties']['typeProperties']['workspaceId'] = f"#{{{variable['activity_name']}_{variable['subactivity_name']}_sink_workspace_id}}#"
-        
-        # Artifact ID
-        content['properties']['activities'][activity_idx]['typeProperties']['activities'][subactivity_idx]['typeProperties']['sink']['datasetSettings']['linkedService']['properties']['typeProperties']['artifactId'] = f"#{{{variable['activity_name']}_{variable['subactivity_name']}_sink_artifact_id}}#"
+        for field in COPY_ACTIVITY_PLACEHOLDER_FIELDS:
+            if field in variable:
+                _, setter = COPY_ACTIVITY_ACCESSORS[field]
+                setter(activity, f"#{{{prefix}_{field}}}#")
 
     return json.dumps(content, indent=2)
 
@@ -79,33 +249,182 @@ def _create_data_pipeline_placeholder_mapping(variables: list) -> dict:
     placeholder_mapping = {}
     
     for variable in variables:
-        activity_name = variable['activity_name']
-        subactivity_name = variable['subactivity_name']
-        
+        _, prefix = _data_pipeline_variable_target(variable)
+
         # Create a unique placeholder for each variable
-        placeholder_mapping[f"{activity_name}_{subactivity_name}_source_database"] = variable['source_database']
-        placeholder_mapping[f"{activity_name}_{subactivity_name}_source_connection"] = variable['source_connection']
-        placeholder_mapping[f"{activity_name}_{subactivity_name}_sink_workspace_id"] = variable['sink_workspace_id']
-        placeholder_mapping[f"{activity_name}_{subactivity_name}_sink_artifact_id"] = variable['sink_artifact_id']
+        for field in COPY_ACTIVITY_PLACEHOLDER_FIELDS:
+            if field in variable:
+                placeholder_mapping[f"{prefix}_{field}"] = variable[field]
     
     return placeholder_mapping
 
 
+def _data_pipeline_placeholder_lookup(variables: list) -> dict:
+    """
+    Placeholder name to the text replacing it in a pipeline-content.json file.
+    """
+    mappings = _create_data_pipeline_placeholder_mapping(variables)
+
+    # Values land inside JSON strings, so they are escaped before substitution
+    return {placeholder: json.dumps(value)[1:-1] for placeholder, value in mappings.items()}
+
+
+@traced
 def _replace_data_pipeline_placeholders_with_variables(path: str, variables: list) -> str:
 
     with open(path, 'r') as f:
         content_str = f.read()
 
-    mappings = _create_data_pipeline_placeholder_mapping(variables)
+    lookup = _data_pipeline_placeholder_lookup(variables)
 
-    # Substitute each placeholder with the corresponding value
-    for placeholder, value in mappings.items():
-        placeholder_pattern = f"#{{{placeholder}}}#"
-        content_str = content_str.replace(placeholder_pattern, value)
-    
-    return content_str
+    result = _substitute(content_str, PLACEHOLDER_PATTERN, lookup)
+    _report_substitution(path, result, 'placeholders')
+
+    return result.content
+
+
+def _is_data_pipeline_activity_path(path: tuple) -> bool:
+    """
+    Check whether a key path points at an activity, at any nesting depth.
+    """
+    if path[:2] != ('properties', 'activities') or len(path) < 3 or not isinstance(path[2], int):
+        return False
+
+    rest = path[3:]
+    while rest:
+        if len(rest) >= 3 and rest[0] == 'typeProperties' and rest[1] in DATA_PIPELINE_CONTAINER_KEYS and isinstance(rest[2], int):
+            rest = rest[3:]
+        elif len(rest) >= 5 and rest[:2] == ('typeProperties', 'cases') and rest[3] == 'activities' and isinstance(rest[4], int):
+            rest = rest[5:]
+        else:
+            return False
+
+    return True
+
+
+@traced
+def _stream_data_pipeline_variables(path: str) -> list:
+    """
+    Streaming counterpart of _extract_data_pipeline_variables.
+
+    The file is parsed incrementally, keeping only the activities currently open,
+    so memory does not grow with the size of the pipeline.
+
+    Args:
+        path (str): Path to the pipeline-content.json file
+
+    Returns:
+        list: Variables in the same shape as _extract_data_pipeline_variables
+    """
+    fields_by_path = {field_path: field for field, field_path in COPY_ACTIVITY_FIELDS.items()}
+
+    open_activities = []
+    copy_activities = []
+
+    with open(path, 'r') as f:
+        for event, event_path, raw in iter_json_events(f):
+            if event == 'start_map' and _is_data_pipeline_activity_path(event_path):
+                parent = open_activities[-1] if open_activities else None
+                open_activities.append({'path': event_path, 'parent': parent, 'name': None, 'type': None, 'fields': {}})
+
+            elif event == 'scalar' and open_activities:
+                activity = open_activities[-1]
+                relative_path = event_path[len(activity['path']):]
+                if relative_path in (('name',), ('type',)):
+                    activity[relative_path[0]] = json.loads(raw)
+                elif relative_path in fields_by_path:
+                    activity['fields'][fields_by_path[relative_path]] = json.loads(raw)
+
+            elif event == 'end_map' and open_activities and event_path == open_activities[-1]['path']:
+                activity = open_activities.pop()
+                if activity['type'] == 'Copy' and activity['fields']:
+                    copy_activities.append(activity)
+
+    variables = []
+
+    # Names are resolved once parsing ends, as a parent name may follow its nested activities
+    for activity in copy_activities:
+        names = []
+        node = activity
+        while node is not None:
+            names.insert(0, node['name'])
+            node = node['parent']
+
+        variables.append(
+            {
+                'activity_path': _format_activity_path(activity['path']),
+                'activity_names': names,
+                **activity['fields'],
+            }
+        )
+
+    return variables
+
+
+@traced
+def _stream_data_pipeline_variables_with_placeholders(path: str, variables: list):
+    """
+    Streaming counterpart of _replace_data_pipeline_variables_with_placeholders.
+
+    Only the referenced scalar values are rewritten, every other byte of the
+    file, including its formatting, is copied through unchanged.
+
+    Args:
+        path (str): Path to the pipeline-content.json file, rewritten in place
+        variables (list): Variables from config
+    """
+    targets = {}
+    for variable in variables:
+        activity_path, prefix = _data_pipeline_variable_target(variable)
+        for field in COPY_ACTIVITY_PLACEHOLDER_FIELDS:
+            if field in variable:
+                targets[activity_path + COPY_ACTIVITY_FIELDS[field]] = json.dumps(f"#{{{prefix}_{field}}}#")
+
+    with open(path, 'r', newline='') as source, atomic_write(path) as target:
+        for event, event_path, raw in iter_json_events(source):
+            if event == 'scalar' and event_path in targets:
+                target.write(targets[event_path])
+            else:
+                target.write(raw)
+
+
+@traced
+def _stream_data_pipeline_placeholders_with_variables(path: str, variables: list):
+    """
+    Streaming counterpart of _replace_data_pipeline_placeholders_with_variables.
+    Placeholders never span lines, so the file is substituted in blocks of whole lines.
+
+    Args:
+        path (str): Path to the pipeline-content.json file, rewritten in place
+        variables (list): Variables from config
+    """
+    lookup = _data_pipeline_placeholder_lookup(variables)
 
+    unknown = []
 
+    def _flush(lines: list):
+        result = _substitute(''.join(lines), PLACEHOLDER_PATTERN, lookup)
+        unknown.extend(result.unknown)
+        target.write(result.content)
+        lines.clear()
+
+    # Each substitution walks the whole lookup to report missing keys, so lines are
+    # batched to keep the number of substitutions independent of the number of lines
+    with open(path, 'r', newline='') as source, atomic_write(path) as target:
+        block = []
+        size = 0
+        for line in source:
+            block.append(line)
+            size += len(line)
+            if size >= DEFAULT_CHUNK_SIZE:
+                _flush(block)
+                size = 0
+        _flush(block)
+
+    _report_substitution(path, SubstitutionResult(None, unknown, []), 'placeholders')
+
+
+@traced
 def export_data_pipeline_variables_to_config(
     project_path: str,
     workspace_alias: str, 
@@ -113,35 +432,33 @@ def export_data_pipeline_variables_to_config(
     data_pipeline_name: str,
     config_path: str, 
     branch: str,
+    streaming: bool = False,
+    session: ConfigSession = None,
 ):
     """
     Export the data pipeline variables to config  
+
+    With streaming=True the pipeline is parsed incrementally, for very large pipeline-content.json files.
+    Pass a ConfigSession as session to batch the config write with other exports.
     """
     data_pipeline_path = f'{project_path}/{workspace_path}/{data_pipeline_name}.DataPipeline/pipeline-content.json'
 
-    variables = _extract_data_pipeline_variables(data_pipeline_path) 
+    if streaming:
+        variables = _stream_data_pipeline_variables(data_pipeline_path)
+    else:
+        variables = _extract_data_pipeline_variables(data_pipeline_path) 
 
     if not variables:
         print(f"No variables found in {data_pipeline_name}.")
-        exit(0)
-
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-    
-    if 'data_pipelines' not in config[branch][workspace_alias]:
-        config[branch][workspace_alias]['data_pipelines'] = {}
-    if data_pipeline_name not in config[branch][workspace_alias]['data_pipelines']:
-        config[branch][workspace_alias]['data_pipelines'][data_pipeline_name] = {}
-    if 'variables' not in config[branch][workspace_alias]['data_pipelines'][data_pipeline_name]:
-        config[branch][workspace_alias]['data_pipelines'][data_pipeline_name]['variables'] = {}
-    config[branch][workspace_alias]['data_pipelines'][data_pipeline_name]['variables'] = variables
+        return
 
-    with open(config_path, 'w') as file:
-        json.dump(config, file, indent=4)
+    with _config_session(config_path, session) as config:
+        config.workspace(branch, workspace_alias).set('data_pipelines', data_pipeline_name, 'variables', value=variables)
 
     print(f"Variables from {data_pipeline_name} extracted and saved to {config_path}.") 
 
 
+@traced
 def replace_data_pipeline_variables_with_placeholders(
     project_path: str,
     workspace_alias: str, 
@@ -149,30 +466,33 @@ def replace_data_pipeline_variables_with_placeholders(
     data_pipeline_name: str,
     config_path: str, 
     branch: str,
+    streaming: bool = False,
+    session: ConfigSession = None,
 ):
 
     data_pipeline_path = f'{project_path}/{workspace_path}/{data_pipeline_name}.DataPipeline/pipeline-content.json'
 
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    variables = config[branch][workspace_alias]['data_pipelines'][data_pipeline_name]['variables']
-
-    print(variables) 
+    with _config_session(config_path, session) as config:
+        variables = config.workspace(branch, workspace_alias).get('data_pipelines', data_pipeline_name, 'variables')
 
     if not variables:
         print(f"No variables found for {data_pipeline_name} in {config_path}.")
-        exit(0)
+        return
 
-    modified_content = _replace_data_pipeline_variables_with_placeholders(data_pipeline_path, variables)
+    if streaming:
+        # Rewrites the file in place, leaving untouched bytes as they are
+        _stream_data_pipeline_variables_with_placeholders(data_pipeline_path, variables)
+    else:
+        modified_content = _replace_data_pipeline_variables_with_placeholders(data_pipeline_path, variables)
 
-    # Save the modified content back to the file
-    with open(data_pipeline_path, 'w') as file:
-        file.write(modified_content)
+        # Save the modified content back to the file
+        with open(data_pipeline_path, 'w') as file:
+            file.write(modified_content)
 
     print(f"Variables from {config_path} replaced in {data_pipeline_path} with placeholders.") 
 
 
+@traced
 def replace_data_pipeline_placeholders_with_variables(
     project_path: str,
     workspace_alias: str, 
@@ -180,29 +500,36 @@ def replace_data_pipeline_placeholders_with_variables(
     data_pipeline_name: str,
     config_path: str, 
     branch: str,
+    streaming: bool = False,
+    session: ConfigSession = None,
 ):
     data_pipeline_path = f'{project_path}/{workspace_path}/{data_pipeline_name}.DataPipeline/pipeline-content.json'
 
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    variables = config[branch][workspace_alias]['data_pipelines'][data_pipeline_name]['variables']
-
-    print(variables) 
+    with _config_session(config_path, session) as config:
+        variables = config.workspace(branch, workspace_alias).get('data_pipelines', data_pipeline_name, 'variables')
 
     if not variables:
         print(f"No variables found for {data_pipeline_name} in {config_path}.")
-        exit(0)
+        return
 
-    modified_content = _replace_data_pipeline_placeholders_with_variables(data_pipeline_path, variables)
+    if streaming:
+        # Rewrites the file in place, leaving untouched bytes as they are
+        _stream_data_pipeline_placeholders_with_variables(data_pipeline_path, variables)
+    else:
+        modified_content = _replace_data_pipeline_placeholders_with_variables(data_pipeline_path, variables)
 
-    # Save the modified content back to the file
-    with open(data_pipeline_path, 'w') as file:
-        file.write(modified_content)
+        # Save the modified content back to the file
+        with open(data_pipeline_path, 'w') as file:
+            file.write(modified_content)
 
     print(f"Placeholders from {config_path} replaced in {data_pipeline_path} with variables.") 
 
 
+# Destination IDs are GUIDs, anything else (e.g. a placeholder) is not a parameter
+DATAFLOW_GEN2_ID_VALUE_PATTERN = re.compile(r'[a-f0-9-]+')
+
+
+@traced
 def _extract_dataflow_gen2_variables(path: str) -> list:
     """
     Extract parameters from a Dataflow Gen2 mashup.pq file, identifying each destination separately.
@@ -217,56 +544,54 @@ def _extract_dataflow_gen2_variables(path: str) -> list:
         content = f.read() 
 
     parameters = []
-    
-    # Pattern to find DataDestination sections
-    # Look for shared QueryName_DataDestination = let
-    destination_pattern = r'shared\s+(\w+)_DataDestination\s*=\s*let(.*?)in\s*\w+;'
-    destination_matches = re.findall(destination_pattern, content, re.DOTALL)
-    
-    for query_name, destination_content in destination_matches:
+
+    # Destinations are the shared QueryName_DataDestination members
+    for query_name, member in mashup.index_destinations(mashup.parse_members(content)).items():
         param_dict = {
-            'destination_name': f"{query_name}_DataDestination",
+            'destination_name': member.name,
             'query_name': query_name
         }
-        
-        # Extract workspaceId
-        workspace_pattern = r'workspaceId\s*=\s*"([a-f0-9-]+)"'
-        workspace_match = re.search(workspace_pattern, destination_content)
-        if workspace_match:
-            param_dict['workspaceId'] = workspace_match.group(1)
-        
-        # Extract lakehouseId
-        lakehouse_pattern = r'lakehouseId\s*=\s*"([a-f0-9-]+)"'
-        lakehouse_match = re.search(lakehouse_pattern, destination_content)
-        if lakehouse_match:
-            param_dict['lakehouseId'] = lakehouse_match.group(1)
-            param_dict['destination_type'] = 'Lakehouse'
-        
-        # Extract warehouseId
-        warehouse_pattern = r'warehouseId\s*=\s*"([a-f0-9-]+)"'
-        warehouse_match = re.search(warehouse_pattern, destination_content)
-        if warehouse_match:
-            param_dict['warehouseId'] = warehouse_match.group(1)
-            param_dict['destination_type'] = 'Warehouse'
-        
-        # Extract semanticModelId (if present)
-        semantic_pattern = r'semanticModelId\s*=\s*"([a-f0-9-]+)"'
-        semantic_match = re.search(semantic_pattern, destination_content)
-        if semantic_match:
-            param_dict['semanticModelId'] = semantic_match.group(1)
-            param_dict['destination_type'] = 'SemanticModel'
-        
+
+        # The first occurrence of each ID kind wins, the destination type follows the registry order
+        fields = {}
+        for field in member.fields:
+            if DATAFLOW_GEN2_ID_VALUE_PATTERN.fullmatch(field.value):
+                fields.setdefault(field.kind, field.value)
+
+        for id_kind, destination_type in mashup.ID_KINDS.items():
+            if id_kind in fields:
+                param_dict[id_kind] = fields[id_kind]
+                if destination_type:
+                    param_dict['destination_type'] = destination_type
+
         # Only add if we found at least one ID parameter
-        if any(key.endswith('Id') for key in param_dict.keys()):
+        if fields:
             parameters.append(param_dict)
     
     return parameters
 
 
+def _splice(content: str, replacements: list) -> str:
+    """
+    Apply (start, end, text) replacements to content in a single pass.
+    Replacements must not overlap.
+    """
+    parts = []
+    position = 0
+    for start, end, text in sorted(replacements):
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts)
+
+
+@traced
 def _replace_dataflow_gen2_parameters_with_placeholders(path: str, parameters: list, dataflow_name: str) -> str:
     """
     Replace parameters with placeholders in a Dataflow Gen2 mashup.pq file.
-    Each destination gets unique placeholders based on its query name.
+    Each destination gets unique placeholders based on its query name, and only
+    the ID fields inside that destination are replaced.
     
     Args:
         path (str): Path to the mashup.pq file
@@ -278,38 +603,37 @@ def _replace_dataflow_gen2_parameters_with_placeholders(path: str, parameters: l
     """
     with open(path, 'r', encoding='utf-8') as f:
         content = f.read()
-    
-    # Replace each destination's parameters with unique placeholders
+
+    destinations = mashup.index_destinations(mashup.parse_members(content))
+
+    replacements = []
     for param_dict in parameters:
         query_name = param_dict['query_name']
-        
-        # Replace workspaceId
-        if 'workspaceId' in param_dict:
-            workspace_id = param_dict['workspaceId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_workspaceId}}#"
-            content = content.replace(f'workspaceId = "{workspace_id}"', f'workspaceId = "{placeholder}"')
-        
-        # Replace lakehouseId
-        if 'lakehouseId' in param_dict:
-            lakehouse_id = param_dict['lakehouseId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_lakehouseId}}#"
-            content = content.replace(f'lakehouseId = "{lakehouse_id}"', f'lakehouseId = "{placeholder}"')
-        
-        # Replace warehouseId
-        if 'warehouseId' in param_dict:
-            warehouse_id = param_dict['warehouseId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_warehouseId}}#"
-            content = content.replace(f'warehouseId = "{warehouse_id}"', f'warehouseId = "{placeholder}"')
-        
-        # Replace semanticModelId
-        if 'semanticModelId' in param_dict:
-            semantic_id = param_dict['semanticModelId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_semanticModelId}}#"
-            content = content.replace(f'semanticModelId = "{semantic_id}"', f'semanticModelId = "{placeholder}"')
-    
-    return content
+        if query_name not in destinations:
+            print(f"Destination {query_name}{mashup.DESTINATION_SUFFIX} not found in {path}.")
+            continue
+
+        for field in destinations[query_name].fields:
+            if param_dict.get(field.kind) == field.value:
+                placeholder = f"#{{{dataflow_name}_{query_name}_{field.kind}}}#"
+                replacements.append((field.start, field.end, placeholder))
+
+    return _splice(content, replacements)
+
+
+def _dataflow_gen2_placeholder_lookup(parameters: list, dataflow_name: str) -> dict:
+    """
+    Placeholder name to the ID replacing it in a mashup.pq file.
+    """
+    return {
+        f"{dataflow_name}_{param_dict['query_name']}_{id_kind}": param_dict[id_kind]
+        for param_dict in parameters
+        for id_kind in mashup.ID_KINDS
+        if id_kind in param_dict
+    }
 
 
+@traced
 def _replace_dataflow_gen2_placeholders_with_parameters(path: str, parameters: list, dataflow_name: str) -> str:
     """
     Replace placeholders with actual parameters in a Dataflow Gen2 mashup.pq file.
@@ -324,38 +648,16 @@ def _replace_dataflow_gen2_placeholders_with_parameters(path: str, parameters: l
     """
     with open(path, 'r', encoding='utf-8') as f:
         content = f.read()
-    
-    # Replace placeholders with actual values for each destination
-    for param_dict in parameters:
-        query_name = param_dict['query_name']
-        
-        # Replace workspaceId placeholder
-        if 'workspaceId' in param_dict:
-            workspace_id = param_dict['workspaceId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_workspaceId}}#"
-            content = content.replace(f'workspaceId = "{placeholder}"', f'workspaceId = "{workspace_id}"')
-        
-        # Replace lakehouseId placeholder
-        if 'lakehouseId' in param_dict:
-            lakehouse_id = param_dict['lakehouseId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_lakehouseId}}#"
-            content = content.replace(f'lakehouseId = "{placeholder}"', f'lakehouseId = "{lakehouse_id}"')
-        
-        # Replace warehouseId placeholder
-        if 'warehouseId' in param_dict:
-            warehouse_id = param_dict['warehouseId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_warehouseId}}#"
-            content = content.replace(f'warehouseId = "{placeholder}"', f'warehouseId = "{warehouse_id}"')
-        
-        # Replace semanticModelId placeholder
-        if 'semanticModelId' in param_dict:
-            semantic_id = param_dict['semanticModelId']
-            placeholder = f"#{{{dataflow_name}_{query_name}_semanticModelId}}#"
-            content = content.replace(f'semanticModelId = "{placeholder}"', f'semanticModelId = "{semantic_id}"')
-    
-    return content
 
+    lookup = _dataflow_gen2_placeholder_lookup(parameters, dataflow_name)
+
+    result = _substitute(content, PLACEHOLDER_PATTERN, lookup)
+    _report_substitution(path, result, 'placeholders')
 
+    return result.content
+
+
+@traced
 def export_dataflow_gen2_variables(
     project_path: str,
     workspace_alias: str, 
@@ -363,6 +665,7 @@ def export_dataflow_gen2_variables(
     dataflow_name: str,
     config_path: str, 
     branch: str,
+    session: ConfigSession = None,
 ):
     dataflow_path = f'{project_path}/{workspace_path}/{dataflow_name}.Dataflow/mashup.pq'
 
@@ -371,29 +674,16 @@ def export_dataflow_gen2_variables(
 
     if not current_parameters:
         print(f"No parameters found in {dataflow_path}.")
-        exit(0)
-
-    # Save the extracted parameters to config.json
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    # Add dataflow configuration if it doesn't exist
-    if 'dataflows' not in config[branch][workspace_alias]:
-        config[branch][workspace_alias]['dataflows'] = {}
+        return
 
-    if dataflow_name not in config[branch][workspace_alias]['dataflows']:
-        config[branch][workspace_alias]['dataflows'][dataflow_gen2_name] = {}
-
-    # Save the extracted parameters as variables
-    config[branch][workspace_alias]['dataflows'][dataflow_name]['variables'] = current_parameters
-
-    # Save updated config
-    with open(config_path, 'w') as file:
-        json.dump(config, file, indent=4)
+    # Save the extracted parameters as variables, creating the dataflow configuration if it doesn't exist
+    with _config_session(config_path, session) as config:
+        config.workspace(branch, workspace_alias).set('dataflows', dataflow_name, 'variables', value=current_parameters)
 
     print(f"Parameters saved to {config_path} under dataflows.{dataflow_name}.variables")
 
 
+@traced
 def replace_dataflow_placeholders_with_variables(
     project_path: str,
     workspace_alias: str, 
@@ -401,20 +691,16 @@ def replace_dataflow_placeholders_with_variables(
     dataflow_name: str,
     config_path: str, 
     branch: str,
+    session: ConfigSession = None,
 ):
     dataflow_path = f'{project_path}/{workspace_path}/{dataflow_name}.Dataflow/mashup.pq'
 
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    variables = config[branch][workspace_alias]['dataflows'][dataflow_name]['variables']
-
-    print("Variables from config:")
-    print(variables)
+    with _config_session(config_path, session) as config:
+        variables = config.workspace(branch, workspace_alias).get('dataflows', dataflow_name, 'variables')
 
     if not variables:
         print(f"No variables found for {dataflow_name} in {config_path}.")
-        exit(0)
+        return
 
     # Replace placeholders with actual values
     modified_content = _replace_dataflow_gen2_placeholders_with_parameters(dataflow_path, variables, dataflow_name)
@@ -426,6 +712,7 @@ def replace_dataflow_placeholders_with_variables(
     print(f"Placeholders replaced with variables from {config_path} in {dataflow_path}.")
 
 
+@traced
 def replace_dataflow_gen2_variables_with_placeholders(
     project_path: str,
     workspace_alias: str, 
@@ -433,17 +720,16 @@ def replace_dataflow_gen2_variables_with_placeholders(
     dataflow_name: str,
     config_path: str, 
     branch: str,
+    session: ConfigSession = None,
 ):
     dataflow_path = f'{project_path}/{workspace_path}/{dataflow_name}.Dataflow/mashup.pq'
 
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    variables = config[branch][workspace_alias]['dataflows'][dataflow_name]['variables']
+    with _config_session(config_path, session) as config:
+        variables = config.workspace(branch, workspace_alias).get('dataflows', dataflow_name, 'variables')
 
     if not variables:
         print(f"No parameters found in {dataflow_path}.")
-        exit(0)
+        return
 
     # Replace parameters with placeholders
     modified_content = _replace_dataflow_gen2_parameters_with_placeholders(dataflow_path, variables, dataflow_name)
@@ -455,9 +741,14 @@ def replace_dataflow_gen2_variables_with_placeholders(
     print(f"Parameters replaced with placeholders in {dataflow_path}.")
     
 
+@traced
 def _extract_parameters_notebook(path: str) -> list:
     """
     Extract parameters from a Fabric notebook-content.py file.
+
+    The PARAMETERS CELL is parsed with Python's ast, so only literal assignments
+    are parameters; values derived from other variables (f-strings with
+    replacement fields) and values already holding a placeholder are skipped.
     
     Args:
         path (str): Path to the notebook-content.py file
@@ -469,60 +760,31 @@ def _extract_parameters_notebook(path: str) -> list:
         content = f.read()
     
     parameters = []
-    
-    # Find the PARAMETERS CELL section
-    # Look for "# PARAMETERS CELL ********************" followed by the parameters
-    parameters_pattern = r'# PARAMETERS CELL \*+\s*\n(.*?)(?=# METADATA|# CELL|# MARKDOWN|$)'
-    parameters_match = re.search(parameters_pattern, content, re.DOTALL)
-    
-    if parameters_match:
-        parameters_content = parameters_match.group(1).strip()
-        
-        # Extract variable assignments
-        # Pattern to find variable = "value" or variable = f"value"
-        variable_patterns = [
-            r'(\w+)\s*=\s*"([^"]*)"',  # variable = "value"
-            r'(\w+)\s*=\s*f"([^"]*)"', # variable = f"value"
-            r'(\w+)\s*=\s*\'([^\']*)\'', # variable = 'value'
-            r'(\w+)\s*=\s*f\'([^\']*)\'' # variable = f'value'
-        ]
-        
-        for pattern in variable_patterns:
-            matches = re.findall(pattern, parameters_content)
-            for var_name, var_value in matches:
-                # Skip variables that are derived from other variables (contain f-string references)
-                if not re.search(r'\{[^}]+\}', var_value):
-                    parameters.append({
-                        'variable_name': var_name,
-                        'variable_value': var_value,
-                        'parameter_type': 'string'
-                    })
-        
-        # Also look for numeric and boolean assignments
-        numeric_pattern = r'(\w+)\s*=\s*(\d+(?:\.\d+)?)'
-        numeric_matches = re.findall(numeric_pattern, parameters_content)
-        for var_name, var_value in numeric_matches:
-            parameters.append({
-                'variable_name': var_name,
-                'variable_value': var_value,
-                'parameter_type': 'numeric'
-            })
-        
-        boolean_pattern = r'(\w+)\s*=\s*(True|False)'
-        boolean_matches = re.findall(boolean_pattern, parameters_content)
-        for var_name, var_value in boolean_matches:
-            parameters.append({
-                'variable_name': var_name,
-                'variable_value': var_value,
-                'parameter_type': 'boolean'
-            })
+
+    for assignment in notebook.parse_parameters(content):
+        if assignment.parameter_type == 'string':
+            if PLACEHOLDER_PATTERN.fullmatch(assignment.value):
+                continue
+            variable_value = assignment.value
+        else:
+            # Numbers and booleans are kept as written, e.g. '1.5' or 'True'
+            variable_value = assignment.text
+
+        parameters.append({
+            'variable_name': assignment.name,
+            'variable_value': variable_value,
+            'parameter_type': assignment.parameter_type
+        })
     
     return parameters
 
 
+@traced
 def _replace_notebook_parameters_with_placeholders(path: str, parameters: list, notebook_name: str) -> str:
     """
     Replace parameters with placeholders in a Fabric notebook-content.py file.
+    Only literals of the PARAMETERS CELL still holding the value from config are replaced,
+    and embedded table specs are replaced with their placeholder (see scripts/table_specs.py).
     
     Args:
         path (str): Path to the notebook-content.py file
@@ -534,41 +796,53 @@ def _replace_notebook_parameters_with_placeholders(path: str, parameters: list,
     """
     with open(path, 'r', encoding='utf-8') as f:
         content = f.read()
-    
-    # Replace each parameter with a placeholder
+
+    values = {param_dict['variable_name']: param_dict for param_dict in parameters}
+
+    replacements = []
+    for assignment in notebook.parse_parameters(content):
+        param_dict = values.get(assignment.name)
+        if param_dict is None:
+            continue
+
+        if param_dict['parameter_type'] == 'string':
+            matches = assignment.parameter_type == 'string' and assignment.value == param_dict['variable_value']
+        else:
+            matches = assignment.text == param_dict['variable_value']
+
+        if matches:
+            placeholder = f'"#{{{notebook_name}_{assignment.name}}}#"'
+            replacements.append((assignment.start, assignment.end, placeholder))
+
+    return remove_table_specs(_splice(content, replacements))
+
+
+def _notebook_placeholder_literals(parameters: list, notebook_name: str) -> dict:
+    """
+    Placeholder name to the Python literal replacing the quoted placeholder in a notebook-content.py file.
+    """
+    literals = {}
     for param_dict in parameters:
-        var_name = param_dict['variable_name']
         var_value = param_dict['variable_value']
-        param_type = param_dict['parameter_type']
-        
-        placeholder = f"#{{{notebook_name}_{var_name}}}#"
-        
-        # Create different replacement patterns based on parameter type
-        if param_type == 'string':
-            # Handle both regular strings and f-strings
-            old_patterns = [
-                f'{var_name} = "{var_value}"',
-                f'{var_name} = f"{var_value}"',
-                f'{var_name} = \'{var_value}\'',
-                f'{var_name} = f\'{var_value}\''
-            ]
-            new_value = f'{var_name} = "{placeholder}"'
-        elif param_type in ['numeric', 'boolean']:
-            old_patterns = [f'{var_name} = {var_value}']
-            new_value = f'{var_name} = "{placeholder}"'
-        
-        # Replace all matching patterns
-        for old_pattern in old_patterns:
-            if old_pattern in content:
-                content = content.replace(old_pattern, new_value)
-                break
-    
-    return content
 
+        # Restore original format based on parameter type
+        if param_dict['parameter_type'] == 'string':
+            literal = json.dumps(var_value, ensure_ascii=False)
+        elif param_dict['parameter_type'] in ['numeric', 'boolean']:
+            literal = var_value
+        else:
+            continue
+
+        literals[f"{notebook_name}_{param_dict['variable_name']}"] = literal
+
+    return literals
 
+
+@traced
 def _replace_notebook_placeholders_with_parameters(path: str, parameters: list, notebook_name: str) -> str:
     """
-    Replace placeholders with actual parameters in a Fabric notebook-content.py file.
+    Replace placeholders with actual parameters in a Fabric notebook-content.py file,
+    and embed the table specs of pipeline_parameters.json (see scripts/table_specs.py).
     
     Args:
         path (str): Path to the notebook-content.py file
@@ -580,29 +854,27 @@ def _replace_notebook_placeholders_with_parameters(path: str, parameters: list,
     """
     with open(path, 'r', encoding='utf-8') as f:
         content = f.read()
-    
-    # Replace placeholders with actual values
-    for param_dict in parameters:
-        var_name = param_dict['variable_name']
-        var_value = param_dict['variable_value']
-        param_type = param_dict['parameter_type']
-        
-        placeholder = f"#{{{notebook_name}_{var_name}}}#"
-        
-        # Restore original format based on parameter type
-        if param_type == 'string':
-            new_value = f'{var_name} = "{var_value}"'
-        elif param_type in ['numeric', 'boolean']:
-            new_value = f'{var_name} = {var_value}'
-        
-        # Replace placeholder with original value
-        old_pattern = f'{var_name} = "{placeholder}"'
-        if old_pattern in content:
-            content = content.replace(old_pattern, new_value)
-    
-    return content
 
+    literals = _notebook_placeholder_literals(parameters, notebook_name)
+
+    replacements = []
+    unknown = []
+    for assignment in notebook.parse_parameters(content):
+        match = PLACEHOLDER_PATTERN.fullmatch(assignment.value) if assignment.parameter_type == 'string' else None
+        if match is None:
+            continue
+
+        if match.group(1) in literals:
+            replacements.append((assignment.start, assignment.end, literals[match.group(1)]))
+        else:
+            unknown.append(match.group(1))
+
+    _report_substitution(path, SubstitutionResult(None, unknown, []), 'placeholders')
+
+    return embed_table_specs(_splice(content, replacements))
 
+
+@traced
 def export_notebook_variables(
     project_path: str,
     workspace_alias: str, 
@@ -610,6 +882,7 @@ def export_notebook_variables(
     notebook_name: str,
     config_path: str, 
     branch: str,
+    session: ConfigSession = None,
 ):
     notebook_path = f'{project_path}/{workspace_path}/{notebook_name}.Notebook/notebook-content.py'
 
@@ -618,29 +891,16 @@ def export_notebook_variables(
 
     if not current_parameters:
         print(f"No parameters found in {notebook_path}.")
-        exit(0)
-
-    # Save the extracted parameters to config.json
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    # Add notebook configuration if it doesn't exist
-    if 'notebooks' not in config[branch][workspace_alias]:
-        config[branch][workspace_alias]['notebooks'] = {}
-
-    if notebook_name not in config[branch][workspace_alias]['notebooks']:
-        config[branch][workspace_alias]['notebooks'][notebook_name] = {}
+        return
 
-    # Save the extracted parameters as variables
-    config[branch][workspace_alias]['notebooks'][notebook_name]['variables'] = current_parameters
-
-    # Save updated config
-    with open(config_path, 'w') as file:
-        json.dump(config, file, indent=4)
+    # Save the extracted parameters as variables, creating the notebook configuration if it doesn't exist
+    with _config_session(config_path, session) as config:
+        config.workspace(branch, workspace_alias).set('notebooks', notebook_name, 'variables', value=current_parameters)
 
     print(f"Parameters saved to {config_path} under notebooks.{notebook_name}.variables")
 
 
+@traced
 def replace_notebook_placeholders_with_variables(
     project_path: str,
     workspace_alias: str, 
@@ -648,19 +908,18 @@ def replace_notebook_placeholders_with_variables(
     notebook_name: str,
     config_path: str, 
     branch: str,
+    session: ConfigSession = None,
 ):
     notebook_path = f'{project_path}/{workspace_path}/{notebook_name}.Notebook/notebook-content.py'
 
     # Load parameters from config
     print("Loading parameters from config...")
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    variables = config[branch][workspace_alias]['notebooks'][notebook_name]['variables']
+    with _config_session(config_path, session) as config:
+        variables = config.workspace(branch, workspace_alias).get('notebooks', notebook_name, 'variables')
 
     if not variables:
         print(f"No variables found for {notebook_name} in {config_path}.")
-        exit(0)
+        return
 
     # Replace placeholders with actual values
     print("\nReplacing placeholders with actual values...")
@@ -673,6 +932,7 @@ def replace_notebook_placeholders_with_variables(
     print(f"✓ Placeholders replaced with variables from {config_path} in {notebook_path}.")
 
 
+@traced
 def replace_notebook_variables_with_placeholders(
     project_path: str,
     workspace_alias: str, 
@@ -680,20 +940,19 @@ def replace_notebook_variables_with_placeholders(
     notebook_name: str,
     config_path: str, 
     branch: str,
+    session: ConfigSession = None,
 ):
     notebook_path = f'{project_path}/{workspace_path}/{notebook_name}.Notebook/notebook-content.py'
 
     # Retrieve variables from config
-    with open(config_path, 'r') as file:
-        config = json.load(file)
-
-    notebook_variables = config[branch][workspace_alias]['notebooks'][notebook_name]['variables']
+    with _config_session(config_path, session) as config:
+        notebook_variables = config.workspace(branch, workspace_alias).get('notebooks', notebook_name, 'variables')
 
     print("Current variables extracted from notebook:")
 
     if not notebook_variables:
         print(f"No variables found for {notebook_name} in {config_path}.")
-        exit(0)
+        return
 
     # Replace variables with placeholders
     print("\nReplacing variables with placeholders...")
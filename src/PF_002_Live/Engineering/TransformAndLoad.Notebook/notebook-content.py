@@ -22,9 +22,11 @@
 
 workspace_name = "#{TransformAndLoad_workspace_name}#"
 lakehouse_name = "#{TransformAndLoad_lakehouse_name}#"
+load_mode = "#{TransformAndLoad_load_mode}#"  # "incremental" or "full" to rebuild every table
+broadcast_threshold_mb = "#{TransformAndLoad_broadcast_threshold_mb}#"  # lookups up to this cached size are broadcast
 lakehouse_abfss = f"abfss://{workspace_name}@onelake.dfs.fabric.microsoft.com/{lakehouse_name}.Lakehouse"
 files_path = f"{lakehouse_abfss}/Files/Raw"
-tables_path = f"{lakehouse_abfss}/Tables" 
+tables_path = f"{lakehouse_abfss}/Tables"
 
 
 # METADATA ********************
@@ -52,82 +54,140 @@ from pyspark.sql.functions import *
 
 # MARKDOWN ********************
 
-# ## FactInternetSales
+# ## Incremental load
+#
+# The watermark of every table is kept in the `LoadControl` table. In `incremental` mode a table with a watermark column only reads the source rows from its last watermark on, a table without one reads its whole source, and every table is merged on its business key, only changed rows being updated. In `full` mode, or when a table does not exist yet, it is rebuilt from the whole source.
 
 # CELL ********************
 
-# Read
-sales_path = f"{files_path}/dbo.FactInternetSales.parquet"
-df_sales = spark.read.load(sales_path, format="parquet")
-# display(df_sales) 
-
-# Select columns
-df_sales = df_sales.select(
-    'ProductKey', 
-    'OrderDateKey', 
-    'DueDateKey', 
-    'ShipDateKey', 
-    'CustomerKey', 
-    'SalesOrderNumber', 
-    'OrderQuantity', 
-    'UnitPrice', 
-    'UnitPriceDiscountPct', 
-    'ProductStandardCost'
-)
-# display(df_sales) 
-
-# Write to tables
-df_sales.write.format("delta") \
-          .mode("overwrite") \
-          .save(f"{tables_path}/FactInternetSales") 
+from delta.tables import DeltaTable
 
+control_path = f"{tables_path}/LoadControl"
 
-# METADATA ********************
 
-# META {
-# META   "language": "python",
-# META   "language_group": "synapse_pyspark"
-# META }
+def is_incremental(table_name, table_load_mode="incremental", partition_by=None):
+    table_path = f"{tables_path}/{table_name}"
+    if load_mode != "incremental" or table_load_mode != "incremental" or not DeltaTable.isDeltaTable(spark, table_path):
+        return False
 
-# MARKDOWN ********************
+    # A MERGE cannot change the partitioning of a table, it is rebuilt instead
+    partition_columns = DeltaTable.forPath(spark, table_path).detail().first()["partitionColumns"]
+    if list(partition_columns) != list(partition_by or []):
+        print(f"{table_name} is partitioned by {list(partition_columns)}, not {partition_by or []}, it is rebuilt.")
+        return False
+    return True
 
-# ## DimCustomer
 
-# CELL ********************
+def sql_literal(value):
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "\\'") + "'"
 
-# Read
-customer_path = f"{files_path}/dbo.DimCustomer.parquet"
-df_customer = spark.read.load(customer_path, format="parquet")
-# display(df_customer)
-
-# Select
-df_customer = df_customer.select(
-    "CustomerKey",
-    "GeographyKey",
-    "CustomerAlternateKey",
-    "FirstName",
-    "MiddleName",
-    "LastName",
-    "BirthDate",
-    "Gender",
-    "MaritalStatus",
-    "TotalChildren",
-    "EnglishEducation",
-    "EnglishOccupation",
-    "HouseOwnerFlag",
-    "NumberCarsOwned"
-)
-# display(df_customer)
-
-# Clean
-df_customer = df_customer \
-    .withColumn("FullName", concat_ws(" ", col("FirstName"), col("MiddleName"), col("LastName"))) \
-    .drop("FirstName", "MiddleName", "LastName") \
-    .withColumnsRenamed({
-        "EnglishEducation":"Education",
-        "EnglishOccupation": "Occupation"
-    })
-# display(df_customer) 
+
+def partition_filter(bounds, alias=None):
+    """
+    SQL predicate restricting the partition columns to their (min, max) bounds.
+    """
+    prefix = f"{alias}." if alias else ""
+    return " AND ".join(
+        f"{prefix}`{column}` BETWEEN {sql_literal(low)} AND {sql_literal(high)}"
+        for column, (low, high) in bounds.items()
+    )
+
+
+def read_watermarks():
+    if not DeltaTable.isDeltaTable(spark, control_path):
+        return {}
+    rows = spark.read.format("delta").load(control_path).select("TableName", "WatermarkValue").collect()
+    return {row["TableName"]: row["WatermarkValue"] for row in rows}
+
+
+def save_watermarks(control_rows):
+    """
+    Record the loads of a run in the control table, in one write as tables are loaded at the same time.
+    """
+    if not control_rows:
+        return
+
+    df_control = spark.createDataFrame(
+        control_rows,
+        "TableName string, WatermarkColumn string, WatermarkValue string, RowsLoaded long"
+    ).withColumn("LoadedAt", current_timestamp())
+
+    if not DeltaTable.isDeltaTable(spark, control_path):
+        df_control.write.format("delta").save(control_path)
+        return
+
+    DeltaTable.forPath(spark, control_path).alias("t") \
+        .merge(df_control.alias("s"), "t.TableName = s.TableName") \
+        .whenMatchedUpdateAll() \
+        .whenNotMatchedInsertAll() \
+        .execute()
+
+
+def read_new_rows(df, watermark_column, watermark):
+    """
+    Filter a source on the watermark of a table, right after reading it so the filter is pushed down to the parquet scan.
+    Rows at the last watermark are read again: the MERGE is idempotent and picks up rows arriving late for that value.
+    """
+    if not watermark_column or watermark is None:
+        return df
+    return df.filter(col(watermark_column) >= lit(watermark).cast(df.schema[watermark_column].dataType))
+
+
+# Table name to the partition bounds of the rows merged into it, None when it was rebuilt
+loaded_partitions = {}
+
+
+def load_table(df, table_name, keys, watermark_column=None, table_load_mode="incremental", partition_by=None):
+    """
+    Overwrite a Delta table on a full load, else MERGE the rows into it on its business key.
+
+    Returns the control row of the load, None when there was nothing to load.
+    """
+    table_path = f"{tables_path}/{table_name}"
+    partition_by = partition_by or []
+    incremental = is_incremental(table_name, table_load_mode, partition_by)
+
+    stats = None
+    if watermark_column or (incremental and partition_by):
+        aggregates = [count(lit(1)).alias("rows")]
+        if watermark_column:
+            aggregates.append(max(watermark_column).cast("string").alias("watermark"))
+        for column in partition_by:
+            aggregates += [min(column).alias(f"min_{column}"), max(column).alias(f"max_{column}")]
+        stats = df.agg(*aggregates).first()
+    rows_loaded = stats["rows"] if stats else None
+    watermark = stats["watermark"] if stats and watermark_column else None
+
+    if incremental and rows_loaded == 0:
+        print(f"No new rows for {table_name}.")
+        return None
+
+    if incremental:
+        # The partition columns follow from the key: matching them, bounded to the values of the new rows,
+        # restricts the MERGE to the partitions it can touch
+        bounds = {column: (stats[f"min_{column}"], stats[f"max_{column}"]) for column in partition_by}
+        condition = " AND ".join(f"t.`{key}` = s.`{key}`" for key in keys + partition_by)
+        if bounds:
+            condition += " AND " + partition_filter(bounds, "t")
+        changed = " OR ".join(f"NOT (t.`{column}` <=> s.`{column}`)" for column in df.columns if column not in keys)
+        DeltaTable.forPath(spark, table_path).alias("t") \
+            .merge(df.alias("s"), condition) \
+            .whenMatchedUpdateAll(condition=changed or None) \
+            .whenNotMatchedInsertAll() \
+            .execute()
+        loaded_partitions[table_name] = bounds
+    else:
+        df.write.format("delta") \
+                  .mode("overwrite") \
+                  .option("overwriteSchema", "true") \
+                  .partitionBy(*partition_by) \
+                  .save(table_path)
+        loaded_partitions[table_name] = None
+
+    print(f"{table_name} loaded ({'merge' if incremental else 'full'}).")
+    return (table_name, watermark_column, watermark, rows_loaded)
 
 # METADATA ********************
 
@@ -136,26 +196,42 @@ df_customer = df_customer \
 # META   "language_group": "synapse_pyspark"
 # META }
 
+# MARKDOWN ********************
+
+# ## Table specs
+#
+# The tables are those of `pipeline_parameters.json` at the root of the repository, embedded below when the notebook is rendered for a workspace (see `scripts/table_specs.py`) so it needs no file in the lakehouse; their `source` and `destination` are the tables the CopyData pipeline copies to `Files/Raw` (its `database_tables` parameter). `tests/test_table_specs.py` checks the three stay the same. An entry with a `transform` section is loaded to a Delta table:
+#
+# - `target`: Delta table name, defaults to the source table
+# - `columns`: source columns kept, every column when left out
+# - `derived`: new column name to its Spark SQL expression
+# - `drop`: columns dropped once the derived columns are computed
+# - `lookups`: left joins, in order, each `{"table", "on", "columns"}` and optionally `"broadcast"` to force or prevent a broadcast join; the join key is dropped after the join
+# - `renames`: old column name to new name, applied after the lookups
+# - `keys`: business key the MERGE matches on
+# - `watermark`: column of the source filtered on the last watermark, optional. Without it an `incremental` load still reads the whole source every run and MERGEs all of it, only the changed rows being rewritten: this is the case of `DimCustomer` and `DimProduct`, whose sources have no modified date or other change column
+# - `load_mode`: `incremental` or `full` to always rebuild the table
+# - `partition_by`: columns the Delta table is partitioned by, e.g. a derived year; they must follow from `keys`
+#
+# A `maintenance` section sets the upkeep of the table once loaded:
+#
+# - `optimize_write`, `vorder`: table properties for the files written from then on
+# - `zorder`: columns files are clustered by when compacted, e.g. join keys; compaction only when left out
+# - `vacuum_retention_hours`: files no longer referenced and older than this are removed, no vacuum when left out
+#
+# Entries without `transform` are only read as lookups of other tables.
+
 # CELL ********************
 
-# Read Geography to join with Customers
-geography_path = f"{files_path}/dbo.DimGeography.parquet"
-df_geography = spark.read.load(geography_path, format="parquet")
-# display(df_geography)
+import json
 
-# Select
-df_geography = df_geography.select(
-    "GeographyKey", 
-    "City",
-    "EnglishCountryRegionName"
-)
-# display(df_geography)
+table_specs = json.loads("""#{table_specs}#""")
 
-# Clean
-df_geography = df_geography \
-    .withColumnRenamed("EnglishCountryRegionName", "CountryRegion") 
-# display(df_geography)
+source_paths = {spec["source"]["table"]: f"{files_path}/{spec['destination']['filename']}" for spec in table_specs}
+load_specs = [spec for spec in table_specs if "transform" in spec]
 
+for spec in load_specs:
+    print(f"{spec['source']['table']} -> {spec['transform'].get('target', spec['source']['table'])}")
 
 # METADATA ********************
 
@@ -164,90 +240,107 @@ df_geography = df_geography \
 # META   "language_group": "synapse_pyspark"
 # META }
 
+# MARKDOWN ********************
+
+# ## Transform
+#
+# Every source is read once, pruned to the columns needed by all the tables using it, so a lookup shared by several tables is scanned once.
+#
+# Lookup tables are cached in memory and their cached size decides the join: up to `broadcast_threshold_mb` the lookup is broadcast to every executor and the table is joined without a shuffle.
+
 # CELL ********************
 
-# Join Geography on Customer
-df_customer = df_customer.join(
-    df_geography,
-    on="GeographyKey",  
-    how="left"          
-).drop("GeographyKey") 
-# display(df_customer) 
+def target_name(spec):
+    return spec["transform"].get("target", spec["source"]["table"])
 
-# Write to tables
-df_customer.write.format("delta") \
-          .mode("overwrite") \
-          .save(f"{tables_path}/DimCustomer")  
 
-# METADATA ********************
+def plan_reads(load_specs):
+    """
+    Source table to the columns read from it, None for every column.
+    """
+    plan = {}
 
-# META {
-# META   "language": "python",
-# META   "language_group": "synapse_pyspark"
-# META }
+    def need(table, columns):
+        if table in plan and plan[table] is None:
+            return
+        plan[table] = None if columns is None else list(dict.fromkeys((plan.get(table) or []) + columns))
 
-# MARKDOWN ********************
+    for spec in load_specs:
+        transform = spec["transform"]
+        need(spec["source"]["table"], transform.get("columns"))
+        for lookup in transform.get("lookups", []):
+            need(lookup["table"], [lookup["on"]] + lookup["columns"])
+    return plan
 
-# ## DimProduct
 
-# CELL ********************
+def read_sources(plan):
+    frames = {}
+    for table, columns in plan.items():
+        df = spark.read.load(source_paths[table], format="parquet")
+        frames[table] = df if columns is None else df.select(*columns)
+    return frames
 
-# Read
-product_path = f"{files_path}/dbo.DimProduct.parquet"
-df_product = spark.read.load(product_path, format="parquet")
-# display(df_product)
-
-# Select
-df_product = df_product.select(
-    "ProductKey", 
-    "ProductSubcategoryKey",
-    "EnglishProductName",
-    "Color",
-    "Size",
-    "ModelName",
-    "LargePhoto",
-    "EnglishDescription"
-)
-# display(df_product) 
 
-# METADATA ********************
+def cached_size(df):
+    """
+    Size in bytes of a cached DataFrame, from the statistics of its in-memory relation.
+    """
+    return int(df._jdf.queryExecution().optimizedPlan().stats().sizeInBytes().toString())
 
-# META {
-# META   "language": "python",
-# META   "language_group": "synapse_pyspark"
-# META }
 
-# CELL ********************
+def cache_lookups(load_specs, frames):
+    """
+    Cache every lookup table once for all the tables joining it.
 
-# Read Category
-product_category_path = f"{files_path}/dbo.DimProductCategory.parquet"
-df_product_category = spark.read.load(product_category_path, format="parquet")
-# display(df_product_category)
+    Returns lookup table name to (DataFrame, whether joins broadcast it).
+    """
+    tables = dict.fromkeys(lookup["table"] for spec in load_specs for lookup in spec["transform"].get("lookups", []))
 
-# Select
-df_product_category = df_product_category.select(
-    "ProductCategoryKey",
-    "EnglishProductCategoryName"
-)
-# display(df_product_category) 
+    lookups = {}
+    for table in tables:
+        df = frames[table].cache()
+        rows = df.count()
+        size = cached_size(df)
+        lookups[table] = (df, size <= broadcast_threshold_mb * 1024 * 1024)
+        print(f"{table}: {rows} rows, {size / 1024 / 1024:.1f} MB cached, {'broadcast' if lookups[table][1] else 'shuffle'} join.")
+    return lookups
 
-# METADATA ********************
 
-# META {
-# META   "language": "python",
-# META   "language_group": "synapse_pyspark"
-# META }
+def transform_table(spec, frames, lookups, watermarks):
+    transform = spec["transform"]
+    watermark_column = transform.get("watermark")
 
-# CELL ********************
+    df = read_new_rows(frames[spec["source"]["table"]], watermark_column, watermarks.get(target_name(spec)))
+
+    if transform.get("columns"):
+        df = df.select(*transform["columns"])
+    for column, expression in transform.get("derived", {}).items():
+        df = df.withColumn(column, expr(expression))
+    if transform.get("drop"):
+        df = df.drop(*transform["drop"])
+
+    for lookup in transform.get("lookups", []):
+        df_lookup, small = lookups[lookup["table"]]
+        df_lookup = df_lookup.select(lookup["on"], *lookup["columns"])
+        if lookup.get("broadcast", small):
+            df_lookup = broadcast(df_lookup)
+        df = df.join(df_lookup, on=lookup["on"], how="left").drop(lookup["on"])
+
+    if transform.get("renames"):
+        df = df.withColumnsRenamed(transform["renames"])
+    return df
 
-# Read Subcategory
-product_subcategory_path = f"{files_path}/dbo.DimProductSubcategory.parquet"
-df_product_subcategory = spark.read.load(product_subcategory_path, format="parquet")
-# display(df_product_subcategory)
 
-# Select
-df_product_subcategory = df_product_subcategory.select("ProductSubcategoryKey", "EnglishProductSubcategoryName", "ProductCategoryKey") 
-# display(df_product_subcategory) 
+frames = read_sources(plan_reads(load_specs))
+lookups = cache_lookups(load_specs, frames)
+watermarks = read_watermarks() if load_mode == "incremental" else {}
+
+transformed = {}
+for spec in load_specs:
+    transform = spec["transform"]
+    incremental = is_incremental(target_name(spec), transform.get("load_mode", "incremental"), transform.get("partition_by"))
+    transformed[target_name(spec)] = transform_table(spec, frames, lookups, watermarks if incremental else {})
+    # display(transformed[target_name(spec)])
 
 # METADATA ********************
 
@@ -256,40 +349,38 @@ df_product_subcategory = df_product_subcategory.select("ProductSubcategoryKey",
 # META   "language_group": "synapse_pyspark"
 # META }
 
+# MARKDOWN ********************
+
+# ## Load
+#
+# The tables are written at the same time, each by its own Spark job, and the control table once they are all loaded.
+
 # CELL ********************
 
-# Join subcategory on products
-df_product = df_product.join(
-    df_product_subcategory,
-    on="ProductSubcategoryKey",
-    how="left"
-).drop("ProductSubcategoryKey")
-# display(df_product)
-
-# Join category on products
-df_product = df_product.join(
-    df_product_category,
-    on="ProductCategoryKey",
-    how="left"
-).drop("ProductCategoryKey")
-# display(df_product)
-
-# Clean
-df_product = df_product \
-    .withColumnsRenamed(
-        {
-            "EnglishProductName" : "ProductName",
-            "EnglishDescription": "Description",
-            "EnglishProductSubcategoryName": "ProductSubcategoyName",
-            "EnglishProductCategoryName": "ProductCategoryName" 
-        }
+from concurrent.futures import ThreadPoolExecutor
+
+max_parallel_loads = 4
+
+
+def load(spec):
+    transform = spec["transform"]
+    return load_table(
+        transformed[target_name(spec)],
+        target_name(spec),
+        transform["keys"],
+        transform.get("watermark"),
+        transform.get("load_mode", "incremental"),
+        transform.get("partition_by")
     )
-# display(df_product) 
 
-# Write
-df_product.write.format("delta") \
-          .mode("overwrite") \
-          .save(f"{tables_path}/DimProduct")   
+
+with ThreadPoolExecutor(max_workers=max_parallel_loads) as executor:
+    control_rows = [row for row in executor.map(load, load_specs) if row is not None]
+
+save_watermarks(control_rows)
+
+for df_lookup, _ in lookups.values():
+    df_lookup.unpersist()
 
 # METADATA ********************
 
@@ -300,27 +391,55 @@ df_product.write.format("delta") \
 
 # MARKDOWN ********************
 
-# ## DimDate
+# ## Maintenance
+#
+# Every table loaded by this run is compacted, Z-ordered and vacuumed after the load as its `maintenance` section says. A table merged into only has the partitions of its new rows compacted. File counts and sizes are logged before and after.
 
 # CELL ********************
 
-# Read
-date_path = f"{files_path}/dbo.DimDate.parquet"
-df_date = spark.read.load(date_path, format="parquet")
-# display(df_date)
-
-# Select
-df_date = df_date.drop("SpanishDayNameOfWeek", "FrenchDayNameOfWeek", "SpanishMonthName", "FrenchMonthName")
-# display(df_date)
+def table_files(table_path):
+    detail = DeltaTable.forPath(spark, table_path).detail().first()
+    return detail["numFiles"], detail["sizeInBytes"]
+
+
+def maintain_table(table_name, settings):
+    table_path = f"{tables_path}/{table_name}"
+    files_before, bytes_before = table_files(table_path)
+
+    properties = {}
+    if settings.get("optimize_write"):
+        properties["delta.autoOptimize.optimizeWrite"] = "true"
+    if settings.get("vorder"):
+        properties["delta.parquet.vorder.enabled"] = "true"
+    if properties:
+        assignments = ", ".join(f"'{name}' = '{value}'" for name, value in properties.items())
+        spark.sql(f"ALTER TABLE delta.`{table_path}` SET TBLPROPERTIES ({assignments})")
+
+    optimize = DeltaTable.forPath(spark, table_path).optimize()
+    if loaded_partitions.get(table_name):
+        optimize = optimize.where(partition_filter(loaded_partitions[table_name]))
+    if settings.get("zorder"):
+        optimize.executeZOrderBy(*settings["zorder"])
+    else:
+        optimize.executeCompaction()
+
+    if settings.get("vacuum_retention_hours") is not None:
+        DeltaTable.forPath(spark, table_path).vacuum(settings["vacuum_retention_hours"])
+
+    files_after, bytes_after = table_files(table_path)
+    print(
+        f"{table_name}: {files_before} files ({bytes_before / 1024 / 1024:.1f} MB) -> "
+        f"{files_after} files ({bytes_after / 1024 / 1024:.1f} MB)"
+    )
+    return (table_name, files_before, bytes_before, files_after, bytes_after)
 
-# Clean
-df_date = df_date.withColumnsRenamed({"EnglishDayNameOfWeek":"DayNameOfWeek", "EnglishMonthName": "MonthName"})
-# display(df_date) 
 
-# Write
-df_date.write.format("delta") \
-          .mode("overwrite") \
-          .save(f"{tables_path}/DimDate")   
+loaded_tables = {row[0] for row in control_rows}
+maintenance_rows = [
+    maintain_table(target_name(spec), spec["maintenance"])
+    for spec in load_specs
+    if "maintenance" in spec and target_name(spec) in loaded_tables
+]
 
 # METADATA ********************
 
@@ -0,0 +1,14 @@
+import pytest
+
+from scripts import template
+
+
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path, monkeypatch):
+    """
+    Keep the template cache of every test out of the repository's .pf_cache.
+    """
+    directory = tmp_path / 'templates'
+    monkeypatch.setenv(template.CACHE_ENV, str(directory))
+    monkeypatch.setattr(template, '_cache', None)
+    return directory
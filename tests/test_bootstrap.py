@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+from scripts import bootstrap
+
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    """
+    A checkout on the dev branch, with its own git directory and branches.json.
+    """
+    git_dir = tmp_path / '.git'
+    git_dir.mkdir()
+    (git_dir / 'HEAD').write_text('ref: refs/heads/dev\n')
+    branches = tmp_path / 'branches.json'
+    branches.write_text(json.dumps({'main': '', 'dev': '-DEV'}))
+
+    monkeypatch.setattr(bootstrap, 'root_path', str(tmp_path))
+    monkeypatch.setattr(bootstrap, 'branches_path', str(branches))
+    return tmp_path
+
+
+def test_resolve_branch_is_cached(checkout):
+    resolved = bootstrap._resolve_branch()
+    assert (resolved['branch'], resolved['workspace_suffix']) == ('dev', '-DEV')
+
+    with open(checkout / '.git' / bootstrap.BOOTSTRAP_CACHE_FILE) as file:
+        assert json.load(file) == resolved
+    assert bootstrap._resolve_branch() == resolved
+
+
+def test_cache_follows_branches_json(checkout):
+    bootstrap._resolve_branch()
+
+    branches = checkout / 'branches.json'
+    branches.write_text(json.dumps({'main': '', 'dev': '-DEVELOPMENT'}))
+    stat = os.stat(branches)
+    os.utime(branches, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert bootstrap._resolve_branch()['workspace_suffix'] == '-DEVELOPMENT'
+
+
+def test_cache_follows_head(checkout):
+    bootstrap._resolve_branch()
+    (checkout / '.git' / 'HEAD').write_text('ref: refs/heads/main\n')
+
+    resolved = bootstrap._resolve_branch()
+    assert (resolved['branch'], resolved['workspace_suffix']) == ('main', '')
+
+
+def test_unknown_branch(checkout):
+    pyfabricops = pytest.importorskip('pyfabricops')
+    (checkout / '.git' / 'HEAD').write_text('ref: refs/heads/feature\n')
+
+    with pytest.raises(pyfabricops.ResourceNotFoundError):
+        bootstrap._resolve_branch()
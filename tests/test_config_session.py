@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from scripts.config_session import ConfigSession, atomic_write
+
+
+CONFIG = {
+    'dev': {
+        'PF_002_Live': {
+            'workspace_config': {'workspace_id': 'w1'},
+            'notebooks': {'TransformAndLoad': {'variables': [{'variable_name': 'load_mode'}]}},
+        },
+    },
+}
+
+
+def _write(path, config):
+    path.write_text(json.dumps(config, indent=4))
+    return str(path)
+
+
+def test_merge_applies_only_what_changed(tmp_path):
+    path = _write(tmp_path / 'config.json', CONFIG)
+    base = json.loads(json.dumps(CONFIG))
+    changed = json.loads(json.dumps(CONFIG))
+    changed['dev']['PF_002_Live']['notebooks']['TransformAndLoad']['id'] = 'n1'
+    changed['dev']['PF_002_Live']['data_pipelines'] = {'CopyData': {'id': 'p1'}}
+
+    # Written to config.json meanwhile, e.g. by an export, and left alone by the merge
+    current = json.loads(json.dumps(CONFIG))
+    current['dev']['PF_002_Live']['workspace_config']['workspace_id'] = 'w2'
+    _write(tmp_path / 'config.json', current)
+
+    with ConfigSession(path) as session:
+        session.merge(base, changed)
+        assert session.dirty == {('dev', 'PF_002_Live', 'notebooks'), ('dev', 'PF_002_Live', 'data_pipelines')}
+
+    with open(path) as file:
+        workspace = json.load(file)['dev']['PF_002_Live']
+    assert workspace['workspace_config'] == {'workspace_id': 'w2'}
+    assert workspace['notebooks']['TransformAndLoad'] == {'variables': [{'variable_name': 'load_mode'}], 'id': 'n1'}
+    assert workspace['data_pipelines'] == {'CopyData': {'id': 'p1'}}
+
+
+def test_atomic_write_keeps_the_file_on_error(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{"a": 1}')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as file:
+            file.write('{"a": ')
+            raise RuntimeError('interrupted')
+
+    assert path.read_text() == '{"a": 1}'
+    assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_flush_writes_dirty_sections_only(tmp_path, capsys):
+    path = _write(tmp_path / 'config.json', CONFIG)
+    mtime = os.stat(path).st_mtime_ns
+
+    with ConfigSession(path) as session:
+        workspace = session.workspace('dev', 'PF_002_Live')
+        assert workspace.get('workspace_config', 'workspace_id') == 'w1'
+        assert workspace.get('notebooks', 'Missing', 'variables') is None
+        # The same value again changes nothing
+        workspace.set('workspace_config', 'workspace_id', value='w1')
+        assert not session.dirty
+    assert os.stat(path).st_mtime_ns == mtime
+    assert 'Config saved' not in capsys.readouterr().out
+
+    with ConfigSession(path) as session:
+        session.workspace('dev', 'PF_002_Live').set('data_pipelines', 'CopyData', 'variables', value=[{'a': 1}])
+    assert f"Config saved to {path} (dev.PF_002_Live.data_pipelines)." in capsys.readouterr().out
+
+    with open(path) as file:
+        assert json.load(file)['dev']['PF_002_Live']['data_pipelines'] == {'CopyData': {'variables': [{'a': 1}]}}
+
+
+def test_failed_session_is_not_saved(tmp_path):
+    path = _write(tmp_path / 'config.json', CONFIG)
+    content = open(path).read()
+
+    with pytest.raises(RuntimeError):
+        with ConfigSession(path) as session:
+            session.workspace('dev', 'PF_002_Live').set('workspace_config', 'workspace_id', value='w2')
+            raise RuntimeError('export failed')
+
+    assert open(path).read() == content
+    # The parsed config the failed session changed is not handed to the next one
+    with ConfigSession(path) as session:
+        assert session.workspace('dev', 'PF_002_Live').get('workspace_config', 'workspace_id') == 'w1'
+
+
+def test_config_is_parsed_again_after_another_writer(tmp_path):
+    path = _write(tmp_path / 'config.json', CONFIG)
+    with ConfigSession(path) as session:
+        first = session.config
+    with ConfigSession(path) as session:
+        assert session.config is first
+
+    # As pyfabricops does, rewriting the whole file
+    changed = json.loads(json.dumps(CONFIG))
+    changed['dev']['PF_002_Live']['workspace_config']['workspace_id'] = 'w2-longer'
+    _write(tmp_path / 'config.json', changed)
+    with ConfigSession(path) as session:
+        assert session.workspace('dev', 'PF_002_Live').get('workspace_config', 'workspace_id') == 'w2-longer'
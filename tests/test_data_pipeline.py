@@ -0,0 +1,112 @@
+import json
+
+from scripts import utils
+
+
+def _copy(name: str, database: str) -> dict:
+    return {
+        'name': name,
+        'type': 'Copy',
+        'typeProperties': {
+            'source': {
+                'datasetSettings': {
+                    'typeProperties': {'database': database},
+                    'externalReferences': {'connection': f'{database}-connection'},
+                },
+            },
+            'sink': {
+                'datasetSettings': {
+                    'linkedService': {
+                        'name': 'MainStorage',
+                        'properties': {'typeProperties': {'workspaceId': 'w1', 'artifactId': f'{database}-lakehouse'}},
+                    },
+                },
+            },
+        },
+    }
+
+
+PIPELINE = {
+    'properties': {
+        'activities': [
+            _copy('Top', 'top'),
+            {
+                'name': 'Loop',
+                'type': 'ForEach',
+                'typeProperties': {
+                    'activities': [
+                        {
+                            'name': 'Check',
+                            'type': 'IfCondition',
+                            'typeProperties': {
+                                'ifTrueActivities': [_copy('Inner', 'inner')],
+                                'ifFalseActivities': [{'name': 'Skip', 'type': 'Wait'}],
+                            },
+                        },
+                        _copy('Plain', 'plain'),
+                    ],
+                },
+            },
+            {
+                'name': 'Route',
+                'type': 'Switch',
+                'typeProperties': {
+                    'cases': [{'value': 'a', 'activities': [_copy('CaseA', 'case_a')]}],
+                    'defaultActivities': [_copy('Default', 'default')],
+                },
+            },
+        ],
+    },
+}
+
+
+def _write(tmp_path, content: dict) -> str:
+    path = tmp_path / 'pipeline-content.json'
+    path.write_text(json.dumps(content, indent=2))
+    return str(path)
+
+
+def test_walker_visits_every_depth_in_order(tmp_path):
+    variables = utils._extract_data_pipeline_variables(_write(tmp_path, PIPELINE))
+
+    assert [(variable['activity_path'], variable['activity_names']) for variable in variables] == [
+        ('/properties/activities/0', ['Top']),
+        ('/properties/activities/1/typeProperties/activities/0/typeProperties/ifTrueActivities/0', ['Loop', 'Check', 'Inner']),
+        ('/properties/activities/1/typeProperties/activities/1', ['Loop', 'Plain']),
+        ('/properties/activities/2/typeProperties/defaultActivities/0', ['Route', 'Default']),
+        ('/properties/activities/2/typeProperties/cases/0/activities/0', ['Route', 'CaseA']),
+    ]
+    assert variables[1]['source_database'] == 'inner'
+    assert variables[1]['sink_artifact_id'] == 'inner-lakehouse'
+    assert all(utils._is_data_pipeline_activity_path(utils._parse_activity_path(variable['activity_path'])) for variable in variables)
+
+
+def test_round_trip(tmp_path):
+    path = _write(tmp_path, PIPELINE)
+    variables = utils._extract_data_pipeline_variables(path)
+
+    placeholders = utils._replace_data_pipeline_variables_with_placeholders(path, variables)
+    inner = json.loads(placeholders)['properties']['activities'][1]['typeProperties']['activities'][0]['typeProperties']['ifTrueActivities'][0]
+    assert inner['typeProperties']['source']['datasetSettings']['typeProperties']['database'] == '#{Loop_Check_Inner_source_database}#'
+    # The sink name is kept as is
+    assert inner['typeProperties']['sink']['datasetSettings']['linkedService']['name'] == 'MainStorage'
+
+    path = _write(tmp_path, json.loads(placeholders))
+    assert json.loads(utils._replace_data_pipeline_placeholders_with_variables(path, variables)) == PIPELINE
+
+
+def test_legacy_variables_map_to_the_same_placeholders(tmp_path):
+    path = _write(tmp_path, PIPELINE)
+    [variable] = [
+        variable for variable in utils._extract_data_pipeline_variables(path) if variable['activity_names'] == ['Loop', 'Plain']
+    ]
+    fields = {key: value for key, value in variable.items() if key not in ('activity_path', 'activity_names')}
+    # As saved to config.json before nested activities were supported
+    legacy = {'activity_index': 1, 'activity_name': 'Loop', 'subactivity_index': 1, 'subactivity_name': 'Plain', **fields}
+
+    assert utils._data_pipeline_variable_target(legacy) == utils._data_pipeline_variable_target(variable)
+    assert (
+        utils._replace_data_pipeline_variables_with_placeholders(path, [legacy])
+        == utils._replace_data_pipeline_variables_with_placeholders(path, [variable])
+    )
+    assert utils._create_data_pipeline_placeholder_mapping([legacy])['Loop_Plain_source_database'] == 'plain'
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from scripts import discovery, utils
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+WORKSPACE_ALIAS = 'PF_002_Live'
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('')
+
+
+@pytest.fixture(autouse=True)
+def discovery_cache():
+    discovery.clear_discovery_cache()
+    yield
+    discovery.clear_discovery_cache()
+
+
+def test_discover_items(tmp_path):
+    workspace = tmp_path / 'src' / WORKSPACE_ALIAS
+    _touch(workspace / 'Engineering' / 'Load.Notebook' / 'notebook-content.py')
+    _touch(workspace / 'Engineering' / 'Nested' / 'Copy.DataPipeline' / 'pipeline-content.json')
+    _touch(workspace / 'Flows' / 'Sales.Dataflow' / 'mashup.pq')
+    _touch(workspace / 'PowerBI' / 'Sales.SemanticModel' / 'definition.pbism')
+    # Not synced yet, without its parameters file
+    (workspace / 'Engineering' / 'Empty.Notebook').mkdir()
+    _touch(workspace / 'PowerBI' / 'Sales.Report' / 'definition.pbir')
+    project_path = str(tmp_path / 'src')
+
+    items = discovery.discover_items(project_path, WORKSPACE_ALIAS)
+    assert [(item.item_type, item.name, item.workspace_path) for item in items] == [
+        ('Notebook', 'Load', 'PF_002_Live/Engineering'),
+        ('DataPipeline', 'Copy', 'PF_002_Live/Engineering/Nested'),
+        ('Dataflow', 'Sales', 'PF_002_Live/Flows'),
+        ('SemanticModel', 'Sales', 'PF_002_Live/PowerBI'),
+    ]
+    assert items[0].path == os.path.join(project_path, 'PF_002_Live', 'Engineering', 'Load.Notebook', 'notebook-content.py')
+    assert items[3].path is None
+
+    # Cached until cleared
+    _touch(workspace / 'Engineering' / 'Other.Notebook' / 'notebook-content.py')
+    assert discovery.discover_items(project_path, WORKSPACE_ALIAS) == items
+    discovery.clear_discovery_cache()
+    assert len(discovery.discover_items(project_path, WORKSPACE_ALIAS, item_types=('Notebook',))) == 2
+
+
+def _export(project_path: str, config_path: str, max_workers: int) -> dict:
+    with open(config_path, 'w') as file:
+        json.dump({'dev': {WORKSPACE_ALIAS: {}}}, file)
+    discovery.export_all_variables(project_path, WORKSPACE_ALIAS, config_path, 'dev', max_workers=max_workers)
+    with open(config_path) as file:
+        return json.load(file)['dev'][WORKSPACE_ALIAS]
+
+
+def test_export_all_variables_merges_in_one_write(tmp_path, capsys):
+    project_path = tmp_path / 'src'
+    shutil.copytree(os.path.join(ROOT_PATH, 'src', WORKSPACE_ALIAS), project_path / WORKSPACE_ALIAS)
+    config_path = str(project_path / 'config.json')
+    shutil.copy(os.path.join(ROOT_PATH, 'src', 'config.json'), config_path)
+    with open(config_path) as file:
+        workspace = json.load(file)['dev'][WORKSPACE_ALIAS]
+
+    discovery.replace_all_placeholders_with_variables(str(project_path), WORKSPACE_ALIAS, config_path, 'dev', max_workers=1)
+    capsys.readouterr()
+
+    # Extracted again from the items holding the dev values, into an empty section
+    exported = _export(str(project_path), config_path, max_workers=1)
+    assert capsys.readouterr().out.count('Config saved') == 1
+    assert _export(str(project_path), config_path, max_workers=2) == exported
+
+    assert exported.keys() == {'data_pipelines', 'notebooks'}
+    assert (
+        utils._create_data_pipeline_placeholder_mapping(exported['data_pipelines']['CopyData']['variables'])
+        == utils._create_data_pipeline_placeholder_mapping(workspace['data_pipelines']['CopyData']['variables'])
+    )
+    assert exported['notebooks']['TransformAndLoad']['variables'] == workspace['notebooks']['TransformAndLoad']['variables']
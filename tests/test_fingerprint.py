@@ -0,0 +1,50 @@
+import json
+
+from scripts.fingerprint import fingerprint_item
+
+
+PIPELINE = {'properties': {'activities': [{'name': 'Copy', 'type': 'Copy'}], 'parameters': {'tables': []}}}
+
+
+def _item(tmp_path, name: str, pipeline: str, notebook: bytes = b'x = 1\ny = 2\n') -> str:
+    folder = tmp_path / name
+    folder.mkdir()
+    (folder / 'pipeline-content.json').write_text(pipeline)
+    (folder / 'notebook-content.py').write_bytes(notebook)
+    (folder / '.platform').write_text('{"config": {"logicalId": "1"}, "metadata": {"type": "DataPipeline"}}')
+    return str(folder)
+
+
+def test_formatting_does_not_change_the_fingerprint(tmp_path):
+    compact = _item(tmp_path, 'compact', json.dumps(PIPELINE, separators=(',', ':')))
+    reordered = json.dumps({'properties': {'parameters': {'tables': []}, 'activities': [{'type': 'Copy', 'name': 'Copy'}]}}, indent=4)
+    formatted = _item(tmp_path, 'formatted', reordered, notebook=b'x = 1\r\ny = 2\r\n')
+
+    assert fingerprint_item(compact) == fingerprint_item(formatted)
+
+
+def test_content_and_files_change_the_fingerprint(tmp_path):
+    original = fingerprint_item(_item(tmp_path, 'original', json.dumps(PIPELINE)))
+
+    changed = json.loads(json.dumps(PIPELINE))
+    changed['properties']['activities'][0]['name'] = 'CopyAll'
+    assert fingerprint_item(_item(tmp_path, 'changed', json.dumps(changed))) != original
+
+    # Only keys are reordered, the order of a JSON array is part of the definition
+    reordered = json.loads(json.dumps(PIPELINE))
+    reordered['properties']['activities'].insert(0, {'name': 'Wait', 'type': 'Wait'})
+    appended = json.loads(json.dumps(PIPELINE))
+    appended['properties']['activities'].append({'name': 'Wait', 'type': 'Wait'})
+    assert fingerprint_item(_item(tmp_path, 'first', json.dumps(reordered))) != fingerprint_item(_item(tmp_path, 'last', json.dumps(appended)))
+
+    assert fingerprint_item(_item(tmp_path, 'notebook', json.dumps(PIPELINE), notebook=b'y = 2\nx = 1\n')) != original
+
+    folder = _item(tmp_path, 'added', json.dumps(PIPELINE))
+    (tmp_path / 'added' / 'extra.json').write_text('{}')
+    assert fingerprint_item(folder) != original
+
+
+def test_invalid_json_is_hashed_as_text(tmp_path):
+    folder = _item(tmp_path, 'invalid', '{"properties": ')
+    assert fingerprint_item(folder) == fingerprint_item(folder)
+    assert fingerprint_item(folder) != fingerprint_item(_item(tmp_path, 'other', '{"properties": }'))
@@ -0,0 +1,77 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scripts import http_session, tracing
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=secret; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def shared():
+    yield http_session.share_session()
+    http_session.restore_requests()
+
+
+def test_restore_puts_back_the_requests_functions():
+    request, api_request = requests.request, requests.api.request
+    http_session.share_session()
+    assert requests.request is not request
+
+    http_session.restore_requests()
+    assert (requests.request, requests.api.request) == (request, api_request)
+    http_session.restore_requests()
+
+
+def test_one_session_per_thread(shared):
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(http_session._thread_session()))
+    thread.start()
+    thread.join()
+
+    assert http_session._thread_session() is shared
+    assert sessions[0] is not shared
+    assert sessions[0].get_adapter('https://') is shared.get_adapter('https://')
+
+
+def test_cookies_are_not_kept(server, shared):
+    assert requests.get(f'{server}/first').text == ''
+    assert requests.get(f'{server}/second').text == ''
+    assert not shared.cookies
+
+
+def test_session_is_traced_once_tracing_is_on(server, shared, tmp_path, monkeypatch):
+    # Opened before tracing was enabled, as on import of pf
+    tracer = tracing.Tracer(str(tmp_path), 'test')
+    monkeypatch.setattr(tracing, '_tracer', tracer)
+
+    requests.get(f'{server}/first')
+    requests.get(f'{server}/second')
+    assert [event['name'] for event in tracer.events] == [
+        f"HTTP GET {server.split('://')[1]}/first", f"HTTP GET {server.split('://')[1]}/second",
+    ]
@@ -0,0 +1,94 @@
+import copy
+import functools
+import io
+import json
+import os
+
+import pytest
+
+from scripts import utils
+from scripts.json_stream import iter_json_events
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PIPELINE_PATH = os.path.join(ROOT_PATH, 'src', 'PF_002_Live', 'Engineering', 'CopyData.DataPipeline', 'pipeline-content.json')
+
+DOCUMENT = '{"a": 12.5, "b": [-0.25E-3, 1e+10, 7, true, false, null], "c": {"d\\"e": "x\\\\y", "f": -1.5e-7}}\n'
+
+
+def _events(text: str, chunk_size: int) -> list:
+    return list(iter_json_events(io.StringIO(text), chunk_size=chunk_size))
+
+
+def test_events_do_not_depend_on_chunk_size():
+    expected = _events(DOCUMENT, len(DOCUMENT) + 1)
+    assert ''.join(raw for _, _, raw in expected) == DOCUMENT
+
+    for chunk_size in range(1, len(DOCUMENT) + 1):
+        assert _events(DOCUMENT, chunk_size) == expected, chunk_size
+
+
+def test_invalid_number_still_fails():
+    for chunk_size in (1, 2, 3, 64):
+        with pytest.raises(ValueError):
+            _events('{"a": 12.}', chunk_size)
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    """
+    The CopyData pipeline with numbers, whose fraction and exponent fall on every chunk boundary.
+    """
+    with open(PIPELINE_PATH, 'r') as file:
+        content = json.load(file)
+    activity = content['properties']['activities'][0]['typeProperties']['activities'][0]
+    activity['typeProperties']['v'] = 12.5
+    activity['typeProperties']['w'] = -1.25e+10
+
+    path = tmp_path / 'pipeline-content.json'
+    path.write_text(json.dumps(content, indent=2))
+    return str(path), content
+
+
+def test_streaming_matches_non_streaming_at_every_chunk_size(pipeline, monkeypatch):
+    path, content = pipeline
+    expected_variables = utils._extract_data_pipeline_variables(path)
+    expected_placeholders = json.loads(utils._replace_data_pipeline_variables_with_placeholders(path, expected_variables))
+    original = open(path, 'r').read()
+
+    for chunk_size in range(1, len(original) + 1):
+        monkeypatch.setattr(utils, 'iter_json_events', functools.partial(iter_json_events, chunk_size=chunk_size))
+
+        assert utils._stream_data_pipeline_variables(path) == expected_variables, chunk_size
+
+        utils._stream_data_pipeline_variables_with_placeholders(path, copy.deepcopy(expected_variables))
+        with open(path, 'r') as file:
+            assert json.load(file) == expected_placeholders, chunk_size
+
+        with open(path, 'w') as file:
+            file.write(original)
+
+
+def test_streaming_restore_substitutes_blocks_of_lines(pipeline, monkeypatch):
+    path, _ = pipeline
+    variables = utils._extract_data_pipeline_variables(path)
+    original = open(path, 'r').read()
+    placeholders = utils._replace_data_pipeline_variables_with_placeholders(path, variables)
+    with open(path, 'w') as file:
+        file.write(placeholders)
+    expected = utils._replace_data_pipeline_placeholders_with_variables(path, variables)
+    assert expected == original
+
+    # Each substitution lists the lookup keys it did not use, one per line made the restore quadratic
+    calls = []
+    substitute = utils._substitute
+
+    def counting_substitute(*args, **kwargs):
+        calls.append(args[0].count('\n'))
+        return substitute(*args, **kwargs)
+
+    monkeypatch.setattr(utils, '_substitute', counting_substitute)
+    utils._stream_data_pipeline_placeholders_with_variables(path, variables)
+
+    assert open(path, 'r').read() == expected
+    assert len(calls) == 1 and calls[0] == original.count('\n')
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from scripts import discovery
+from scripts.manifest import MANIFEST_VERSION, Manifest, hash_bytes, hash_variables
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+WORKSPACE_ALIAS = 'PF_002_Live'
+
+
+def test_hash_variables_ignores_key_order():
+    assert hash_variables({'a': 1, 'b': [1, 2]}) == hash_variables({'b': [1, 2], 'a': 1})
+    assert hash_variables({'a': 1}) != hash_variables({'a': 2})
+
+
+def test_record_save_and_reload(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    manifest = Manifest(path)
+    assert manifest.items == {}
+
+    manifest.record('a/notebook-content.py', 'to_variables', 'c1', 'v1')
+    assert manifest.changed
+    assert manifest.is_current('a/notebook-content.py', 'to_variables', 'c1', 'v1')
+    assert not manifest.is_current('a/notebook-content.py', 'to_variables', 'c2', 'v1')
+    assert not manifest.is_current('a/notebook-content.py', 'to_variables', 'c1', 'v2')
+    assert not manifest.is_current('a/notebook-content.py', 'to_placeholders', 'c1', 'v1')
+
+    manifest.save()
+    assert not manifest.changed
+
+    reloaded = Manifest(path)
+    assert reloaded.items == manifest.items
+    assert reloaded.is_current('a/notebook-content.py', 'to_variables', 'c1', 'v1')
+
+    # Recording the same state again leaves the file alone
+    reloaded.record('a/notebook-content.py', 'to_variables', 'c1', 'v1')
+    assert not reloaded.changed
+    mtime = os.stat(path).st_mtime_ns
+    reloaded.save()
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_other_version_is_ignored(tmp_path):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps({
+        'version': MANIFEST_VERSION + 1,
+        'items': {'a': {'to_variables': {'content': 'c', 'variables': 'v'}}},
+    }))
+
+    assert Manifest(str(path)).items == {}
+
+
+@pytest.fixture
+def project(tmp_path):
+    """
+    A copy of src/ and its config.json, so the round trip can rewrite the items.
+    """
+    project_path = tmp_path / 'src'
+    shutil.copytree(os.path.join(ROOT_PATH, 'src', WORKSPACE_ALIAS), project_path / WORKSPACE_ALIAS)
+    shutil.copy(os.path.join(ROOT_PATH, 'src', 'config.json'), project_path / 'config.json')
+    discovery.clear_discovery_cache()
+    yield str(project_path)
+    discovery.clear_discovery_cache()
+
+
+def _snapshot(items: list) -> dict:
+    snapshot = {}
+    for item in items:
+        if item.path:
+            with open(item.path, 'rb') as file:
+                snapshot[item.path] = file.read()
+    return snapshot
+
+
+def test_round_trip_restores_items(project, capsys):
+    config_path = os.path.join(project, 'config.json')
+    manifest_path = os.path.join(project, 'manifest.json')
+    arguments = dict(
+        project_path=project,
+        workspace_alias=WORKSPACE_ALIAS,
+        config_path=config_path,
+        branch='dev',
+        max_workers=1,
+        manifest_path=manifest_path,
+    )
+
+    items = discovery.discover_items(project, WORKSPACE_ALIAS)
+    original = _snapshot(items)
+    assert original
+
+    discovery.replace_all_placeholders_with_variables(**arguments)
+    with_variables = _snapshot(items)
+    assert with_variables != original
+
+    manifest = Manifest(manifest_path)
+    for path, content in with_variables.items():
+        assert manifest.items[path.replace(os.sep, '/')]['to_variables']['content'] == hash_bytes(content)
+
+    # A second run finds every item current and writes nothing
+    capsys.readouterr()
+    discovery.replace_all_placeholders_with_variables(**arguments)
+    assert 'replaced' not in capsys.readouterr().out
+    assert _snapshot(items) == with_variables
+
+    discovery.replace_all_variables_with_placeholders(**arguments)
+    assert _snapshot(items) == original
+
+
+def test_crlf_item_without_changes_is_left_alone(project, capsys):
+    items = discovery.discover_items(project, WORKSPACE_ALIAS, item_types=('Notebook',))
+    path = items[0].path
+    with open(path, 'rb') as file:
+        content = file.read().replace(b'\r\n', b'\n').replace(b'\n', b'\r\n')
+    with open(path, 'wb') as file:
+        file.write(content)
+
+    # The items already hold placeholders, so the rewrite gives the same text with other line endings
+    discovery.replace_all_variables_with_placeholders(
+        project_path=project,
+        workspace_alias=WORKSPACE_ALIAS,
+        config_path=os.path.join(project, 'config.json'),
+        branch='dev',
+        max_workers=1,
+        manifest_path=os.path.join(project, 'manifest.json'),
+    )
+    assert f"{path} is unchanged." in capsys.readouterr().out
+    with open(path, 'rb') as file:
+        assert file.read() == content
@@ -0,0 +1,82 @@
+from scripts import mashup, utils
+
+
+WORKSPACE_ID = '0f3b7e0a-1111-4a4a-9c9c-2b2b2b2b2b2b'
+LAKEHOUSE_ID = '5d1c2e3f-2222-4b4b-8d8d-3c3c3c3c3c3c'
+WAREHOUSE_ID = '7a8b9c0d-3333-4c4c-7e7e-4d4d4d4d4d4d'
+
+MASHUP = f'''[StagingDefinition = [Kind = "FastCopy"]]
+section Section1;
+// workspaceId = "not-a-field" inside a comment
+shared Sales = let
+  Source = Sql.Database("server.database.windows.net", "Sales;db"),
+  Text = "a ""quoted"" ; string with workspaceId = ""x"" and a /* fake comment",
+  Navigation = Source{{[Schema = "dbo", Item = "Sales"]}}[Data]
+in
+  Navigation;
+shared Sales_DataDestination = let
+  /* lakehouseId = "commented-out" */
+  Pattern = Lakehouse.Contents([CreateNavigationProperties = false, EnableFolding = false]),
+  Navigation_1 = Pattern{{[workspaceId = "{WORKSPACE_ID}"]}}[Data],
+  Navigation_2 = Navigation_1{{[lakehouseId = "{LAKEHOUSE_ID}"]}}[Data],
+  TableNavigation = Navigation_2{{[Id = "Sales", ItemKind = "Table"]}}?[Data]?
+in
+  TableNavigation;
+shared #"Orders 2024" = let
+  Source = #table({{"Id"}}, {{{{1}}}})
+in
+  Source;
+shared #"Orders 2024_DataDestination" = let
+  Pattern = Fabric.Warehouse([CreateNavigationProperties = false]),
+  Navigation_1 = Pattern{{[workspaceId = "{WORKSPACE_ID}"]}}[Data],
+  Navigation_2 = Navigation_1{{[warehouseId = "{WAREHOUSE_ID}"]}}[Data]
+in
+  Navigation_2;
+'''
+
+
+def _write(tmp_path, content):
+    path = tmp_path / 'mashup.pq'
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
+
+
+def test_parse_members_skips_comments_and_strings():
+    destinations = mashup.index_destinations(mashup.parse_members(MASHUP))
+
+    assert sorted(destinations) == ['Orders 2024', 'Sales']
+    sales_fields = [(field.kind, field.value) for field in destinations['Sales'].fields]
+    assert sales_fields == [('workspaceId', WORKSPACE_ID), ('lakehouseId', LAKEHOUSE_ID)]
+    for field in destinations['Sales'].fields:
+        assert MASHUP[field.start:field.end] == field.value
+
+
+def test_round_trip_is_byte_identical(tmp_path):
+    path = _write(tmp_path, MASHUP)
+
+    variables = utils._extract_dataflow_gen2_variables(path)
+    assert variables == [
+        {
+            'destination_name': 'Sales_DataDestination',
+            'query_name': 'Sales',
+            'workspaceId': WORKSPACE_ID,
+            'lakehouseId': LAKEHOUSE_ID,
+            'destination_type': 'Lakehouse',
+        },
+        {
+            'destination_name': 'Orders 2024_DataDestination',
+            'query_name': 'Orders 2024',
+            'workspaceId': WORKSPACE_ID,
+            'warehouseId': WAREHOUSE_ID,
+            'destination_type': 'Warehouse',
+        },
+    ]
+
+    placeholders = utils._replace_dataflow_gen2_parameters_with_placeholders(path, variables, 'Flow')
+    assert WORKSPACE_ID not in placeholders
+    assert '#{Flow_Sales_lakehouseId}#' in placeholders
+    assert '#{Flow_Orders 2024_warehouseId}#' in placeholders
+
+    path = _write(tmp_path, placeholders)
+    assert utils._extract_dataflow_gen2_variables(path) == []
+    assert utils._replace_dataflow_gen2_placeholders_with_parameters(path, variables, 'Flow') == MASHUP
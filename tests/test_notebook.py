@@ -0,0 +1,96 @@
+from scripts import notebook, utils
+
+
+NOTEBOOK = '''# Fabric notebook source
+
+# MARKDOWN ********************
+
+# ## Parameters
+
+# PARAMETERS CELL ********************
+
+workspace_name = "Café-DEV"  # é before and after a literal shifts ast byte offsets
+lakehouse_name = "Main \\\\ \\"Storage\\""
+batch_size = 500
+threshold = -1.5
+enabled = True
+label = f"plain"
+lakehouse_path = f"abfss://{workspace_name}@onelake.dfs.fabric.microsoft.com/{lakehouse_name}.Lakehouse"
+total = batch_size * 2
+
+# METADATA ********************
+
+# META {
+# META   "language": "python"
+# META }
+
+# CELL ********************
+
+not_a_parameter = "value"
+'''
+
+
+def _write(tmp_path, content):
+    path = tmp_path / 'notebook-content.py'
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
+
+
+def test_parse_parameters_keeps_literals_only():
+    assignments = notebook.parse_parameters(NOTEBOOK)
+
+    assert [(a.name, a.value, a.parameter_type) for a in assignments] == [
+        ('workspace_name', 'Café-DEV', 'string'),
+        ('lakehouse_name', 'Main \\ "Storage"', 'string'),
+        ('batch_size', 500, 'numeric'),
+        ('threshold', -1.5, 'numeric'),
+        ('enabled', True, 'boolean'),
+        ('label', 'plain', 'string'),
+    ]
+    for assignment in assignments:
+        assert NOTEBOOK[assignment.start:assignment.end] == assignment.text
+
+
+def test_no_parameters_cell():
+    assert notebook.parse_parameters('# Fabric notebook source\n\n# CELL ********************\n\nx = 1\n') == []
+
+
+def test_round_trip_is_byte_identical(tmp_path):
+    path = _write(tmp_path, NOTEBOOK)
+
+    variables = utils._extract_parameters_notebook(path)
+    assert [variable['variable_name'] for variable in variables] == [
+        'workspace_name', 'lakehouse_name', 'batch_size', 'threshold', 'enabled', 'label'
+    ]
+
+    placeholders = utils._replace_notebook_parameters_with_placeholders(path, variables, 'Nb')
+    assert 'workspace_name = "#{Nb_workspace_name}#"' in placeholders
+    assert 'batch_size = "#{Nb_batch_size}#"' in placeholders
+    assert 'label = "#{Nb_label}#"' in placeholders
+    assert 'not_a_parameter = "value"' in placeholders
+
+    path = _write(tmp_path, placeholders)
+    assert utils._extract_parameters_notebook(path) == []
+    # An f-string without replacement field is restored as the plain string it is
+    restored = NOTEBOOK.replace('f"plain"', '"plain"')
+    assert utils._replace_notebook_placeholders_with_parameters(path, variables, 'Nb') == restored
+
+
+def test_invalid_cell_is_parsed_line_by_line(capsys):
+    content = NOTEBOOK.replace(
+        'batch_size = 500\n',
+        '%pip install semantic-link\n!ls /lakehouse/default/Files\nbatch_size = 500\nif enabled:\n',
+    )
+    assignments = notebook.parse_parameters(content)
+
+    assert 'parsing it line by line' in capsys.readouterr().out
+    assert [(a.name, a.value) for a in assignments] == [
+        ('workspace_name', 'Café-DEV'),
+        ('lakehouse_name', 'Main \\ "Storage"'),
+        ('batch_size', 500),
+        ('threshold', -1.5),
+        ('enabled', True),
+        ('label', 'plain'),
+    ]
+    for assignment in assignments:
+        assert content[assignment.start:assignment.end] == assignment.text
@@ -0,0 +1,66 @@
+import json
+import os
+
+from scripts.pbir import DEFINITION_FILE, bind_definition, dataset_name, find_part, load_reports, package_report, parse_part
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+POWERBI_PATH = os.path.join(ROOT_PATH, 'src', 'PF_002_Live', 'PowerBI')
+MODEL_ID = '59f7a86f-a9ba-41ae-8f04-a2b6e8b7a432'
+
+
+def _definition(folder: str) -> dict:
+    parts = load_reports([folder])[folder]
+    return parse_part(find_part(parts, DEFINITION_FILE))
+
+
+def test_bind_by_path_keeps_schema():
+    definition = _definition(os.path.join(POWERBI_PATH, 'Import', 'CustomerAnalysis.Report'))
+    bound = json.loads(bind_definition(definition, 'PF_002_Live-DEV', 'CustomerAnalysis', MODEL_ID))
+
+    assert bound['$schema'] == definition['$schema']
+    assert bound['version'] == definition['version']
+    assert bound['datasetReference'] == {
+        'byConnection': {
+            'connectionString': (
+                'Data Source=powerbi://api.powerbi.com/v1.0/myorg/PF_002_Live-DEV;initial catalog=CustomerAnalysis;'
+                f'integrated security=ClaimsToken;semanticmodelid={MODEL_ID}'
+            ),
+            'pbiServiceModelId': None,
+            'pbiModelVirtualServerName': 'sobe_wowvirtualserver',
+            'pbiModelDatabaseName': MODEL_ID,
+            'name': 'EntityDataSource',
+            'connectionType': 'pbiServiceXmlaStyleLive',
+        },
+    }
+    assert dataset_name(bound) == 'CustomerAnalysis'
+
+
+def test_bind_by_connection_keeps_its_properties():
+    definition = _definition(os.path.join(POWERBI_PATH, 'Direct', 'SalesPerformance.Report'))
+    bound = json.loads(bind_definition(definition, 'PF_002_Live', 'SalesPerformance', MODEL_ID))
+
+    assert bound['$schema'] == definition['$schema']
+    by_connection = bound['datasetReference']['byConnection']
+    assert by_connection == {
+        **definition['datasetReference']['byConnection'],
+        'connectionString': (
+            'Data Source=powerbi://api.powerbi.com/v1.0/myorg/PF_002_Live;initial catalog=SalesPerformance;'
+            f'access mode=readonly;integrated security=ClaimsToken;semanticmodelid={MODEL_ID}'
+        ),
+        'pbiModelDatabaseName': MODEL_ID,
+    }
+    assert dataset_name(bound) == 'SalesPerformance'
+    # The parsed part is cached and shared, binding must not modify it
+    assert definition['datasetReference']['byConnection']['pbiModelDatabaseName'] != MODEL_ID
+
+
+def test_package_report_swaps_only_the_definition():
+    folder = os.path.join(POWERBI_PATH, 'Import', 'CustomerAnalysis.Report')
+    parts = load_reports([folder])[folder]
+    packaged = package_report(parts, b'{}')
+
+    payloads = {part['path']: part['payload'] for part in packaged['parts']}
+    assert payloads.keys() == {part.path for part in parts}
+    assert payloads[DEFINITION_FILE] == 'e30='
+    assert all(payloads[part.path] == part.payload for part in parts if part.path != DEFINITION_FILE)
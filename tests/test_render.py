@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from scripts import discovery
+from scripts.render import _hash_files, render_environments, render_overlay, write_back_overlay
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+WORKSPACE_ALIAS = 'PF_002_Live'
+NOTEBOOK_PATH = os.path.join(WORKSPACE_ALIAS, 'Engineering', 'TransformAndLoad.Notebook', 'notebook-content.py')
+EXPORTED_PATH = os.path.join(WORKSPACE_ALIAS, 'Engineering', 'Exported.Notebook', 'notebook-content.py')
+
+
+@pytest.fixture
+def project(tmp_path):
+    project_path = tmp_path / 'src'
+    shutil.copytree(os.path.join(ROOT_PATH, 'src', WORKSPACE_ALIAS), project_path / WORKSPACE_ALIAS)
+    shutil.copy(os.path.join(ROOT_PATH, 'src', 'config.json'), project_path / 'config.json')
+    discovery.clear_discovery_cache()
+    yield str(project_path)
+    discovery.clear_discovery_cache()
+
+
+def _read(*parts) -> bytes:
+    with open(os.path.join(*parts), 'rb') as file:
+        return file.read()
+
+
+def test_overlay_leaves_src_untouched(project):
+    original = _read(project, NOTEBOOK_PATH)
+
+    with render_overlay(project, WORKSPACE_ALIAS, os.path.join(project, 'config.json'), 'dev', max_workers=1) as overlay_path:
+        assert _read(overlay_path, NOTEBOOK_PATH) != original
+        # The table specs are embedded in the rendered notebook only
+        assert b'"DimCustomer"' in _read(overlay_path, NOTEBOOK_PATH)
+        assert b'"DimCustomer"' not in original
+        assert write_back_overlay(overlay_path, project, WORKSPACE_ALIAS) == []
+
+    assert not os.path.exists(overlay_path)
+    assert _read(project, NOTEBOOK_PATH) == original
+
+
+def test_write_back_copies_exported_files(project):
+    with render_overlay(project, WORKSPACE_ALIAS, os.path.join(project, 'config.json'), 'dev', max_workers=1) as overlay_path:
+        # What an export from the workspace would do: rewrite an item and add another
+        with open(os.path.join(overlay_path, NOTEBOOK_PATH), 'ab') as file:
+            file.write(b'\n# exported\n')
+        os.makedirs(os.path.dirname(os.path.join(overlay_path, EXPORTED_PATH)))
+        with open(os.path.join(overlay_path, EXPORTED_PATH), 'wb') as file:
+            file.write(b'# Fabric notebook source\n')
+
+        copied = write_back_overlay(overlay_path, project, WORKSPACE_ALIAS)
+        assert copied == sorted([NOTEBOOK_PATH, EXPORTED_PATH])
+        for relative_path in copied:
+            assert _read(project, relative_path) == _read(overlay_path, relative_path)
+
+
+def test_write_back_leaves_files_deleted_from_the_overlay(project):
+    with render_overlay(project, WORKSPACE_ALIAS, os.path.join(project, 'config.json'), 'dev', max_workers=1) as overlay_path:
+        os.remove(os.path.join(overlay_path, NOTEBOOK_PATH))
+        assert write_back_overlay(overlay_path, project, WORKSPACE_ALIAS) == []
+
+    assert os.path.exists(os.path.join(project, NOTEBOOK_PATH))
+
+
+def test_render_environments_matches_the_overlay(project, tmp_path, capsys):
+    config_path = os.path.join(project, 'config.json')
+    branches_path = tmp_path / 'branches.json'
+    branches_path.write_text(json.dumps({'main': '-PRD', 'dev': '-DEV', 'staging': '-STG'}))
+    output_path = str(tmp_path / 'rendered')
+
+    rendered = render_environments(project, WORKSPACE_ALIAS, config_path, str(branches_path), output_path=output_path)
+
+    assert sorted(rendered) == ['dev', 'main']
+    assert f'No {WORKSPACE_ALIAS} configuration for staging' in capsys.readouterr().out
+    assert rendered['dev'][NOTEBOOK_PATH] != rendered['main'][NOTEBOOK_PATH]
+
+    for branch in ('dev', 'main'):
+        with render_overlay(project, WORKSPACE_ALIAS, config_path, branch, max_workers=1) as overlay_path:
+            for relative_path, content in rendered[branch].items():
+                assert _read(overlay_path, relative_path) == content.encode('utf-8')
+            # Semantic models included, the rendered tree is the overlay of the branch
+            assert _hash_files(os.path.join(output_path, branch), WORKSPACE_ALIAS) == _hash_files(overlay_path, WORKSPACE_ALIAS)
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+import pytest
+
+from scripts import discovery
+from scripts.scheduler import ReadWriteLock, Task, build_dependency_graph, run_tasks, topological_order
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Long enough for a blocked task to show, short enough for the suite
+TIMEOUT = 5
+
+
+def test_topological_order():
+    graph = {'report': {'model'}, 'model': {'lakehouse'}, 'notebook': {'lakehouse', 'elsewhere'}, 'lakehouse': set()}
+    assert topological_order(graph) == ['lakehouse', 'model', 'notebook', 'report']
+
+    with pytest.raises(ValueError, match='a, b'):
+        topological_order({'a': {'b'}, 'b': {'a'}, 'c': set()})
+
+
+def test_dependent_tasks_start_once_their_dependencies_are_done():
+    events = []
+
+    def action(name):
+        def run():
+            events.append(('start', name))
+            time.sleep(0.01)
+            events.append(('end', name))
+        return run
+
+    tasks = [
+        Task('report', action('report'), {'model'}, 'read'),
+        Task('model', action('model'), {'lakehouse'}, 'read'),
+        Task('lakehouse', None, set(), 'read'),
+        Task('notebook', action('notebook'), {'lakehouse'}, 'read'),
+    ]
+    status = run_tasks(tasks, max_workers=4)
+
+    assert status == dict.fromkeys(['lakehouse', 'model', 'notebook', 'report'], 'succeeded')
+    assert events.index(('end', 'model')) < events.index(('start', 'report'))
+
+
+def test_readers_share_the_lock_and_writers_run_alone():
+    readers = threading.Barrier(2, timeout=TIMEOUT)
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def track(name, wait=None):
+        def run():
+            with lock:
+                running.append(name)
+                if len(running) > 1 and 'write' in running:
+                    overlaps.append(tuple(running))
+            if wait:
+                wait()
+            time.sleep(0.01)
+            with lock:
+                running.remove(name)
+        return run
+
+    tasks = [
+        # Both readers must be inside the lock at once to pass the barrier
+        Task('read-1', track('read-1', readers.wait), set(), 'read'),
+        Task('read-2', track('read-2', readers.wait), set(), 'read'),
+        Task('write', track('write'), set(), 'write'),
+        Task('read-3', track('read-3'), set(), 'read'),
+    ]
+    status = run_tasks(tasks, max_workers=4)
+
+    assert set(status.values()) == {'succeeded'}
+    assert overlaps == []
+
+
+def test_tasks_without_config_access_do_not_wait_for_writers():
+    lock = ReadWriteLock()
+    released = threading.Event()
+
+    def write():
+        # Holds the config lock until the other task ran
+        assert released.wait(TIMEOUT)
+
+    status = run_tasks(
+        [Task('write', write, set(), 'write'), Task('upload', released.set, set(), None)],
+        max_workers=2,
+        config_lock=lock,
+    )
+    assert status == {'write': 'succeeded', 'upload': 'succeeded'}
+
+
+def test_failure_skips_dependents_only(capsys):
+    def fail():
+        raise RuntimeError('upload refused')
+
+    tasks = [
+        Task('model', fail, set(), 'read'),
+        Task('report', lambda: None, {'model'}, 'read'),
+        Task('dashboard', lambda: None, {'report'}, 'read'),
+        Task('notebook', lambda: None, set(), 'read'),
+    ]
+    status = run_tasks(tasks, max_workers=2)
+
+    assert status == {'model': 'failed', 'report': 'skipped', 'dashboard': 'skipped', 'notebook': 'succeeded'}
+    assert 'model failed: upload refused' in capsys.readouterr().out
+
+
+def test_dependency_graph_of_the_project():
+    discovery.clear_discovery_cache()
+    _, graph = build_dependency_graph(os.path.join(ROOT_PATH, 'src'), 'PF_002_Live')
+
+    assert 'MainStorage.Lakehouse' in graph['CopyData.DataPipeline']
+    assert 'MainStorage.Lakehouse' in graph['TransformAndLoad.Notebook']
+    assert 'CustomerAnalysis.SemanticModel' in graph['CustomerAnalysis.Report']
+    assert graph['MainStorage.Lakehouse'] == set()
+    topological_order(graph)
@@ -0,0 +1,74 @@
+import json
+import re
+
+from scripts import mashup, utils
+from scripts.utils import PLACEHOLDER_PATTERN, _substitute
+
+
+KQL_DATABASE_ID = '9e8d7c6b-4444-4d4d-6f6f-5e5e5e5e5e5e'
+
+MASHUP = f'''section Section1;
+shared Events = let
+  Source = #table({{"Id"}}, {{{{1}}}})
+in
+  Source;
+shared Events_DataDestination = let
+  Pattern = Kusto.Contents([CreateNavigationProperties = false]),
+  Navigation_1 = Pattern{{[kqlDatabaseId = "{KQL_DATABASE_ID}"]}}[Data]
+in
+  Navigation_1;
+'''
+
+
+def test_substitute_scans_once():
+    result = _substitute(
+        'a #{first}# b #{second}# c #{first}# d #{unknown}#',
+        PLACEHOLDER_PATTERN,
+        {'first': '#{second}#', 'second': '2', 'unused': 'x'},
+    )
+
+    # Replacement text is never scanned again, even when it looks like a placeholder
+    assert result.content == 'a #{second}# b 2 c #{second}# d #{unknown}#'
+    assert result.unknown == ['unknown']
+    assert result.missing == ['unused']
+
+
+def test_substitute_with_key():
+    result = _substitute('x=1 y=2', re.compile(r'(\w)=(\d)'), {'x1': 'X'}, key=lambda match: match.group(1) + match.group(2))
+    assert result.content == 'X y=2'
+    assert result.unknown == ['y2']
+
+
+def test_data_pipeline_values_are_escaped(tmp_path):
+    path = tmp_path / 'pipeline-content.json'
+    path.write_text('{"database": "#{Copy_Table_source_database}#"}')
+    variables = [{
+        'activity_path': '/properties/activities/0/typeProperties/activities/0',
+        'activity_names': ['Copy', 'Table'],
+        'source_database': 'Sales "2024" \\ archive',
+    }]
+
+    content = utils._replace_data_pipeline_placeholders_with_variables(str(path), variables)
+    assert json.loads(content) == {'database': 'Sales "2024" \\ archive'}
+
+
+def test_registered_id_kind_is_substituted(tmp_path, monkeypatch):
+    monkeypatch.setattr(mashup, 'ID_KINDS', dict(mashup.ID_KINDS))
+    mashup.register_id_kind('kqlDatabaseId', 'KQLDatabase')
+
+    path = tmp_path / 'mashup.pq'
+    path.write_bytes(MASHUP.encode('utf-8'))
+
+    variables = utils._extract_dataflow_gen2_variables(str(path))
+    assert variables == [{
+        'destination_name': 'Events_DataDestination',
+        'query_name': 'Events',
+        'kqlDatabaseId': KQL_DATABASE_ID,
+        'destination_type': 'KQLDatabase',
+    }]
+
+    placeholders = utils._replace_dataflow_gen2_parameters_with_placeholders(str(path), variables, 'Flow')
+    assert '[kqlDatabaseId = "#{Flow_Events_kqlDatabaseId}#"]' in placeholders
+
+    path.write_bytes(placeholders.encode('utf-8'))
+    assert utils._replace_dataflow_gen2_placeholders_with_parameters(str(path), variables, 'Flow') == MASHUP
@@ -0,0 +1,35 @@
+import json
+import os
+
+from scripts.table_specs import PLACEHOLDER, SPEC_PATH, TABLE_SPECS_PATTERN, embed_table_specs, remove_table_specs
+
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ENGINEERING_PATH = os.path.join(ROOT_PATH, 'src', 'PF_002_Live', 'Engineering')
+NOTEBOOK_PATH = os.path.join(ENGINEERING_PATH, 'TransformAndLoad.Notebook', 'notebook-content.py')
+PIPELINE_PATH = os.path.join(ENGINEERING_PATH, 'CopyData.DataPipeline', 'pipeline-content.json')
+
+
+def _load(path: str):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def test_notebook_embeds_the_specs_once_rendered():
+    with open(NOTEBOOK_PATH, 'r', encoding='utf-8') as file:
+        content = file.read()
+    assert TABLE_SPECS_PATTERN.search(content).group(1) == PLACEHOLDER
+
+    rendered = embed_table_specs(content)
+    assert json.loads(TABLE_SPECS_PATTERN.search(rendered).group(1)) == _load(SPEC_PATH)
+    assert remove_table_specs(rendered) == content
+
+    # Already embedded specs are left as they are, e.g. in an exported notebook
+    assert embed_table_specs(rendered) == rendered
+
+
+def test_pipeline_copies_the_spec_tables():
+    tables = _load(PIPELINE_PATH)['properties']['parameters']['database_tables']['defaultValue']
+    specs = [{'source': spec['source'], 'destination': spec['destination']} for spec in _load(SPEC_PATH)]
+
+    assert tables == specs
@@ -0,0 +1,79 @@
+import os
+
+from scripts import template
+from scripts.template import TemplateCache, compile_notebook, compile_placeholders, render
+
+
+PIPELINE = '{"workspaceId": "#{CopyData_sink_workspace_id}#", "name": "#{CopyData_sink_name}#", "other": "#{unknown}#"}'
+
+NOTEBOOK = '''# PARAMETERS CELL ********************
+
+workspace_name = "#{workspace_name}#"
+load_mode = "#{load_mode}#"
+untouched = "plain"
+
+# METADATA ********************
+'''
+
+
+def test_render_fills_slots_and_reports_names():
+    compiled = compile_placeholders(PIPELINE)
+    assert [name for name, _ in compiled.slots] == ['CopyData_sink_workspace_id', 'CopyData_sink_name', 'unknown']
+
+    result = render(compiled, {'CopyData_sink_workspace_id': 'abc', 'CopyData_sink_name': 'Sales', 'unused': 'x'})
+    assert result.content == '{"workspaceId": "abc", "name": "Sales", "other": "#{unknown}#"}'
+    assert result.unknown == ['unknown']
+    assert result.missing == ['unused']
+
+    # Without values the template renders back to the original content
+    assert render(compiled, {}).content == PIPELINE
+
+
+def test_notebook_slots_cover_the_literal():
+    compiled = compile_notebook(NOTEBOOK)
+    assert compiled.slots == (('workspace_name', '"#{workspace_name}#"'), ('load_mode', '"#{load_mode}#"'))
+
+    result = render(compiled, {'workspace_name': '"PF_002_Live-DEV"', 'load_mode': '"incremental"'})
+    assert 'workspace_name = "PF_002_Live-DEV"\nload_mode = "incremental"\nuntouched = "plain"' in result.content
+
+
+def test_cached_spans_are_reused(cache_directory, monkeypatch):
+    compiled = compile_placeholders(PIPELINE)
+    assert len(os.listdir(cache_directory)) == 1
+
+    def scan(content):
+        raise AssertionError('cached content scanned again')
+
+    monkeypatch.setitem(template.SCANS, 'placeholders', scan)
+    assert compile_placeholders(PIPELINE) == compiled
+
+
+def test_record_evicts_least_recently_used(tmp_path):
+    directory = tmp_path / 'cache'
+    cache = TemplateCache(str(directory), max_bytes=10 ** 6)
+    contents = [f'"#{{name_{index}}}#"' for index in range(4)]
+    names = [cache._key('placeholders', content) for content in contents[:3]]
+    for content in contents[:3]:
+        cache.spans('placeholders', content)
+
+    # Entries found on disk are ordered by mtime; the first one is then used again
+    for index, name in enumerate(names):
+        os.utime(directory / name, (1000 + index, 1000 + index))
+    cache = TemplateCache(str(directory), max_bytes=10 ** 6)
+    cache.spans('placeholders', contents[3])
+    cache.spans('placeholders', contents[0])
+
+    size = os.path.getsize(directory / names[0])
+    cache.max_bytes = 2 * size
+    cache._record(cache._key('placeholders', contents[3]), size)
+
+    assert sorted(os.listdir(directory)) == sorted([names[0], cache._key('placeholders', contents[3])])
+
+
+def test_record_keeps_entry_larger_than_limit(tmp_path):
+    directory = tmp_path / 'cache'
+    cache = TemplateCache(str(directory), max_bytes=1)
+    cache.spans('placeholders', PIPELINE)
+    cache.spans('placeholders', NOTEBOOK)
+
+    assert os.listdir(directory) == [cache._key('placeholders', NOTEBOOK)]
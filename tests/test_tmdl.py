@@ -0,0 +1,119 @@
+import os
+
+from scripts import tmdl
+
+
+SERVER = 'abc-def.datawarehouse.fabric.microsoft.com'
+DATABASE_ID = 'cbd913c1-6b0e-4767-87ca-057ed9ab5948'
+
+EXPRESSIONS = f'''expression 'Server Name' = "{SERVER}" meta [IsParameterQuery=true, Type="Text", IsParameterQueryRequired=false]
+\tlineageTag: 8df9127a-4bf1-4e24-b281-2e728f1f25a4
+
+expression 'It''s a label' = "say ""hi""" meta [IsParameterQuery=true, Type="Text", IsParameterQueryRequired=false]
+\tlineageTag: abd9019d-dbaa-411b-a4f1-00bd6ad5c16a
+
+expression StartDate = #date(2024, 1, 1) meta [IsParameterQuery=true, Type="Date", IsParameterQueryRequired=true]
+\tlineageTag: 096575a2-6929-4f3f-93df-b4696cd7f465
+
+expression DatabaseQuery =
+\t\tlet
+\t\t    database = Sql.Database("{SERVER}", "{DATABASE_ID}")
+\t\tin
+\t\t    database
+\tlineageTag: 196575a2-6929-4f3f-93df-b4696cd7f465
+
+\tannotation PBI_IncludeFutureArtifacts = False
+
+'''
+
+TABLE = f'''table Sales
+\tlineageTag: 2df9127a-4bf1-4e24-b281-2e728f1f25a4
+
+\tpartition Sales = m
+\t\tmode: import
+\t\tsource =
+\t\t\t\tlet
+\t\t\t\t    Source = Sql.Database("{SERVER}", "Sales ""2024"""),
+\t\t\t\t    Filtered = Table.SelectRows(Source, each [Region] = "#{{Region}}#")
+\t\t\t\tin
+\t\t\t\t    Filtered
+
+\tpartition Inline = m
+\t\tmode: import
+\t\tsource = Sql.Database("#{{ServerEndpoint}}#", "#{{DatabaseId}}#")
+
+'''
+
+
+def _names(parameters: list) -> list:
+    return [(parameter.name, parameter.value, parameter.quoted) for parameter in parameters]
+
+
+def test_parse_expressions():
+    parameters = tmdl.parse_expressions(EXPRESSIONS)
+    assert _names(parameters) == [
+        ('Server Name', SERVER, True),
+        ("It's a label", 'say "hi"', True),
+        ('StartDate', '#date(2024, 1, 1)', False),
+        ('ServerEndpoint', SERVER, True),
+        ('DatabaseId', DATABASE_ID, True),
+    ]
+    # Offsets delimit the text of the value, inside the quotes and with "" escapes as written
+    assert [EXPRESSIONS[parameter.start:parameter.end] for parameter in parameters] == [
+        SERVER, 'say ""hi""', '#date(2024, 1, 1)', SERVER, DATABASE_ID,
+    ]
+
+
+def test_parse_partition_sources():
+    parameters = tmdl.parse_partition_sources(TABLE)
+    assert _names(parameters) == [
+        ('ServerEndpoint', SERVER, True),
+        ('DatabaseId', 'Sales "2024"', True),
+        ('Region', '#{Region}#', False),
+        ('ServerEndpoint', '#{ServerEndpoint}#', True),
+        ('DatabaseId', '#{DatabaseId}#', True),
+    ]
+    assert TABLE[parameters[1].start:parameters[1].end] == 'Sales ""2024""'
+
+
+def _model(tmp_path, expressions: str, table: str) -> str:
+    folder = tmp_path / 'Sales.SemanticModel'
+    (folder / 'definition' / 'tables').mkdir(parents=True)
+    (folder / 'definition' / 'expressions.tmdl').write_bytes(expressions.encode('utf-8'))
+    (folder / 'definition' / 'tables' / 'Sales.tmdl').write_bytes(table.encode('utf-8'))
+    return str(folder)
+
+
+def _apply(contents: dict):
+    for path, content in contents.items():
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(content)
+
+
+def test_only_configured_parameters_become_placeholders(tmp_path):
+    folder = _model(tmp_path, EXPRESSIONS, TABLE)
+    parameters = {'Server Name': SERVER, 'ServerEndpoint': SERVER}
+
+    contents = tmdl.replace_semantic_model_parameters_with_placeholders(folder, parameters)
+    expressions = contents[os.path.join(folder, tmdl.EXPRESSIONS_FILE)]
+    assert "expression 'Server Name' = \"#{Server Name}#\"" in expressions
+    assert '#date(2024, 1, 1)' in expressions
+    assert 'say ""hi""' in expressions
+    assert f'Sql.Database("#{{ServerEndpoint}}#", "{DATABASE_ID}")' in expressions
+
+    table = contents[os.path.join(folder, 'definition', 'tables', 'Sales.tmdl')]
+    assert 'Sql.Database("#{ServerEndpoint}#", "Sales ""2024""")' in table
+
+
+def test_round_trip_restores_files(tmp_path):
+    # Without the inline partition, whose placeholders would get values on the way back
+    folder = _model(tmp_path, EXPRESSIONS, TABLE.partition('\tpartition Inline')[0])
+    paths = [path for path, _ in tmdl.semantic_model_files(folder)]
+    original = {path: open(path, 'rb').read() for path in paths}
+    parameters = {'Server Name': SERVER, "It's a label": 'say "hi"', 'ServerEndpoint': SERVER}
+
+    _apply(tmdl.replace_semantic_model_parameters_with_placeholders(folder, parameters))
+    assert {path: open(path, 'rb').read() for path in paths} != original
+
+    _apply(tmdl.replace_semantic_model_placeholders_with_parameters(folder, parameters))
+    assert {path: open(path, 'rb').read() for path in paths} == original
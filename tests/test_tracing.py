@@ -0,0 +1,78 @@
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from scripts import tracing
+
+
+BODY = b'{"value": []}'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    tracer = tracing.Tracer(str(tmp_path), 'test')
+    monkeypatch.setattr(tracing, '_tracer', tracer)
+    return tracer
+
+
+def test_instrument_session_is_a_no_op_when_off(monkeypatch):
+    monkeypatch.setattr(tracing, '_tracer', None)
+    session = requests.Session()
+    assert tracing.instrument_session(session) is session
+    assert 'request' not in vars(session)
+
+
+def test_instrument_session_wraps_only_that_session(server, tracer):
+    request = requests.sessions.Session.request
+    session = tracing.instrument_session(requests.Session())
+    assert requests.sessions.Session.request is request
+
+    response = session.get(f'{server}/v1/workspaces/0f3b7e0a-1111-4a4a-9c9c-2b2b2b2b2b2b/items', stream=True)
+    # The size comes from the headers, the streamed body is left unread
+    assert not response._content_consumed
+    assert response.content == BODY
+
+    requests.Session().get(f'{server}/other')
+
+    [event] = tracer.events
+    assert event['name'] == f"HTTP GET {server.split('://')[1]}/v1/workspaces/{{id}}/items"
+    assert event['args']['status'] == 200
+    assert event['args']['bytes_received'] == len(BODY)
+
+
+def test_instrument_records_once_tracing_is_on(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, '_tracer', None)
+    module = tracing.instrument(types.SimpleNamespace(deploy_notebook=lambda name: name.upper()))
+    assert module.deploy_notebook('a') == 'A'
+
+    # The module is wrapped on import of pf, tracing is enabled later by the entry point
+    tracer = tracing.Tracer(str(tmp_path), 'test')
+    monkeypatch.setattr(tracing, '_tracer', tracer)
+    assert module.deploy_notebook('b') == 'B'
+
+    [event] = tracer.events
+    assert event['name'] == 'pf.deploy_notebook'
@@ -0,0 +1,230 @@
+import ast
+import os
+import re
+
+import pytest
+
+from scripts.bootstrap import root_path
+from scripts.notebook import CELL_MARKER_PATTERN
+
+
+NOTEBOOK_PATH = os.path.join(root_path, 'src', 'PF_002_Live', 'Engineering', 'TransformAndLoad.Notebook', 'notebook-content.py')
+
+# Top-level statements kept from a cell: its functions and the values they use, not the statements loading tables
+LITERALS = (ast.Constant, ast.JoinedStr, ast.Dict, ast.List)
+
+
+def _cells() -> dict:
+    """
+    Code cells of the notebook by the heading of the markdown cell before them.
+    """
+    with open(NOTEBOOK_PATH, 'r', encoding='utf-8') as file:
+        content = file.read()
+
+    markers = list(CELL_MARKER_PATTERN.finditer(content))
+    cells = {}
+    title = None
+    for index, marker in enumerate(markers):
+        end = markers[index + 1].start() if index + 1 < len(markers) else len(content)
+        body = content[marker.end():end]
+        if marker.group(1) == 'MARKDOWN':
+            heading = re.search(r'^# #+ (.+)$', body, re.MULTILINE)
+            title = heading.group(1).strip() if heading else title
+        elif marker.group(1) == 'CELL':
+            cells[title] = body
+    return cells
+
+
+def _definitions(namespace: dict, *titles: str, imports: bool = False) -> dict:
+    """
+    Run the definitions of notebook cells in a namespace, with their imports when Spark is there.
+    """
+    cells = _cells()
+    for title in titles:
+        module = ast.parse(cells[title])
+        module.body = [
+            node for node in module.body
+            if isinstance(node, ast.FunctionDef)
+            or (imports and isinstance(node, (ast.Import, ast.ImportFrom)))
+            or (isinstance(node, ast.Assign) and isinstance(node.value, LITERALS))
+        ]
+        exec(compile(module, NOTEBOOK_PATH, 'exec'), namespace)
+    return namespace
+
+
+@pytest.fixture(scope='module')
+def spark():
+    pytest.importorskip('pyspark')
+    pytest.importorskip('delta')
+    from benchmarks.transform_benchmark import create_session
+
+    session = create_session('local[2]', '1g', 4)
+    yield session
+    session.stop()
+
+
+@pytest.fixture
+def notebook(spark, tmp_path):
+    namespace = {'spark': spark, 'tables_path': str(tmp_path / 'Tables'), 'load_mode': 'incremental'}
+    return _definitions(namespace, 'Imports', 'Incremental load', imports=True)
+
+
+def test_partition_filter_quotes_values():
+    namespace = _definitions({'tables_path': 'Tables'}, 'Incremental load')
+    bounds = {'OrderDateKey': (20240101, 20240131), 'Region': ("O'Hare", 'West')}
+
+    assert namespace['partition_filter'](bounds, 't') == (
+        "t.`OrderDateKey` BETWEEN 20240101 AND 20240131 AND t.`Region` BETWEEN 'O\\'Hare' AND 'West'"
+    )
+    assert namespace['partition_filter']({'Year': (2024, 2024)}) == '`Year` BETWEEN 2024 AND 2024'
+
+
+SCHEMA = 'OrderDateKey int, SalesOrderNumber string, Amount double'
+
+
+def _table(spark, notebook, table_name):
+    return sorted(tuple(row) for row in spark.read.format('delta').load(f"{notebook['tables_path']}/{table_name}").collect())
+
+
+def test_incremental_load_merges_new_rows(spark, notebook):
+    first = spark.createDataFrame([(20240101, 'SO1', 10.0), (20240102, 'SO2', 20.0)], SCHEMA)
+    control_row = notebook['load_table'](first, 'FactSales', ['SalesOrderNumber'], 'OrderDateKey')
+    assert control_row == ('FactSales', 'OrderDateKey', '20240102', 2)
+    assert notebook['loaded_partitions'] == {'FactSales': None}
+
+    notebook['save_watermarks']([control_row])
+    watermarks = notebook['read_watermarks']()
+    assert watermarks == {'FactSales': '20240102'}
+
+    # Rows at the watermark are read again, SO2 is unchanged and only SO3 is new
+    source = spark.createDataFrame([(20240101, 'SO1', 99.0), (20240102, 'SO2', 20.0), (20240103, 'SO3', 30.0)], SCHEMA)
+    new_rows = notebook['read_new_rows'](source, 'OrderDateKey', watermarks['FactSales'])
+    control_row = notebook['load_table'](new_rows, 'FactSales', ['SalesOrderNumber'], 'OrderDateKey')
+    assert control_row == ('FactSales', 'OrderDateKey', '20240103', 2)
+
+    assert _table(spark, notebook, 'FactSales') == [(20240101, 'SO1', 10.0), (20240102, 'SO2', 20.0), (20240103, 'SO3', 30.0)]
+    merge = notebook['DeltaTable'].forPath(spark, f"{notebook['tables_path']}/FactSales").history(1).first()
+    assert merge['operation'] == 'MERGE'
+    assert merge['operationMetrics']['numTargetRowsUpdated'] == '0'
+    assert merge['operationMetrics']['numTargetRowsInserted'] == '1'
+
+    notebook['save_watermarks']([control_row])
+    assert notebook['read_watermarks']() == {'FactSales': '20240103'}
+
+    # Nothing past the watermark, nothing to load
+    empty = notebook['read_new_rows'](source, 'OrderDateKey', '20240104')
+    assert notebook['load_table'](empty, 'FactSales', ['SalesOrderNumber'], 'OrderDateKey') is None
+
+
+def test_full_load_rebuilds_table(spark, notebook):
+    rows = spark.createDataFrame([(20240101, 'SO1', 10.0), (20240102, 'SO2', 20.0)], SCHEMA)
+    notebook['load_table'](rows, 'FactSales', ['SalesOrderNumber'], 'OrderDateKey')
+
+    notebook['load_mode'] = 'full'
+    rebuilt = spark.createDataFrame([(20240103, 'SO3', 30.0)], SCHEMA)
+    assert notebook['load_table'](rebuilt, 'FactSales', ['SalesOrderNumber'], 'OrderDateKey') == (
+        'FactSales', 'OrderDateKey', '20240103', 1
+    )
+    assert _table(spark, notebook, 'FactSales') == [(20240103, 'SO3', 30.0)]
+
+
+LOAD_SPECS = [
+    {
+        'source': {'table': 'FactInternetSales'},
+        'transform': {
+            'target': 'FactSales',
+            'columns': ['OrderDateKey', 'SalesOrderNumber', 'CustomerKey', 'SalesAmount'],
+            'lookups': [{'table': 'DimCustomer', 'on': 'CustomerKey', 'columns': ['CustomerName']}],
+            'renames': {'SalesAmount': 'Amount'},
+        },
+    },
+    {
+        'source': {'table': 'DimCustomer'},
+        'transform': {},
+    },
+    {
+        'source': {'table': 'FactResellerSales'},
+        'transform': {
+            'columns': ['OrderDateKey', 'CustomerKey'],
+            'lookups': [{'table': 'DimCustomer', 'on': 'CustomerKey', 'columns': ['Region']}],
+        },
+    },
+]
+
+
+def test_plan_reads_prunes_columns():
+    namespace = _definitions({}, 'Transform')
+
+    assert namespace['plan_reads'](LOAD_SPECS) == {
+        'FactInternetSales': ['OrderDateKey', 'SalesOrderNumber', 'CustomerKey', 'SalesAmount'],
+        # Read whole by its own load, which wins over the columns of the lookups
+        'DimCustomer': None,
+        'FactResellerSales': ['OrderDateKey', 'CustomerKey'],
+    }
+    assert namespace['plan_reads'](LOAD_SPECS[2:] + LOAD_SPECS[:1]) == {
+        'FactResellerSales': ['OrderDateKey', 'CustomerKey'],
+        'DimCustomer': ['CustomerKey', 'Region', 'CustomerName'],
+        'FactInternetSales': ['OrderDateKey', 'SalesOrderNumber', 'CustomerKey', 'SalesAmount'],
+    }
+    assert [namespace['target_name'](spec) for spec in LOAD_SPECS] == ['FactSales', 'DimCustomer', 'FactResellerSales']
+
+
+@pytest.mark.parametrize('threshold, broadcast', [(10, True), (0, False)])
+def test_lookups_are_cached_once(spark, notebook, threshold, broadcast):
+    _definitions(notebook, 'Transform', imports=True)
+    notebook['broadcast_threshold_mb'] = threshold
+    frames = {
+        'FactInternetSales': spark.createDataFrame(
+            [(20240101, 'SO1', 1, 10.0), (20240102, 'SO2', 2, 20.0)],
+            'OrderDateKey int, SalesOrderNumber string, CustomerKey int, SalesAmount double',
+        ),
+        'DimCustomer': spark.createDataFrame([(1, 'Ann', 'West'), (2, 'Bob', 'East')], 'CustomerKey int, CustomerName string, Region string'),
+    }
+
+    lookups = notebook['cache_lookups'](LOAD_SPECS[:1], frames)
+    assert list(lookups) == ['DimCustomer']
+    df_lookup, small = lookups['DimCustomer']
+    assert df_lookup.is_cached
+    assert small is broadcast
+
+    df = notebook['transform_table'](LOAD_SPECS[0], frames, lookups, {})
+    assert df.columns == ['OrderDateKey', 'SalesOrderNumber', 'Amount', 'CustomerName']
+    assert sorted(tuple(row) for row in df.collect()) == [(20240101, 'SO1', 10.0, 'Ann'), (20240102, 'SO2', 20.0, 'Bob')]
+    plan = df._jdf.queryExecution().optimizedPlan().toString()
+    assert ('broadcast' in plan) is broadcast
+
+
+def _append_files(spark, notebook, rows, partition_by=()):
+    # One write per row, one file each
+    for row in rows:
+        spark.createDataFrame([row], SCHEMA).coalesce(1).write.format('delta').mode('append') \
+            .partitionBy(*partition_by).save(f"{notebook['tables_path']}/FactSales")
+
+
+def test_maintenance_compacts_and_sets_properties(spark, notebook):
+    _definitions(notebook, 'Maintenance', imports=True)
+    _append_files(spark, notebook, [(20240101, 'SO1', 10.0), (20240101, 'SO2', 20.0), (20240102, 'SO3', 30.0)])
+    spark.conf.set('spark.databricks.delta.retentionDurationCheck.enabled', 'false')
+
+    settings = {'optimize_write': True, 'vorder': True, 'vacuum_retention_hours': 0}
+    table_name, files_before, _, files_after, _ = notebook['maintain_table']('FactSales', settings)
+    assert (table_name, files_before, files_after) == ('FactSales', 3, 1)
+
+    table_path = f"{notebook['tables_path']}/FactSales"
+    properties = notebook['DeltaTable'].forPath(spark, table_path).detail().first()['properties']
+    assert properties['delta.autoOptimize.optimizeWrite'] == 'true'
+    assert properties['delta.parquet.vorder.enabled'] == 'true'
+    # Vacuumed: only the compacted file is left
+    parquet = [name for _, _, names in os.walk(table_path) for name in names if name.endswith('.parquet')]
+    assert len(parquet) == 1
+    assert len(_table(spark, notebook, 'FactSales')) == 3
+
+
+def test_maintenance_compacts_merged_partitions_only(spark, notebook):
+    _definitions(notebook, 'Maintenance', imports=True)
+    rows = [(20240101, 'SO1', 10.0), (20240101, 'SO2', 20.0), (20240102, 'SO3', 30.0), (20240102, 'SO4', 40.0)]
+    _append_files(spark, notebook, rows, ['OrderDateKey'])
+    notebook['loaded_partitions']['FactSales'] = {'OrderDateKey': (20240102, 20240102)}
+
+    _, files_before, _, files_after, _ = notebook['maintain_table']('FactSales', {})
+    assert (files_before, files_after) == (4, 3)